@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MovimientoInventario, StockInventario
+from .models import DisponibilidadPlato, MovimientoInventario, StockInventario
 
 
 @admin.register(MovimientoInventario)
@@ -21,3 +21,11 @@ class StockInventarioAdmin(admin.ModelAdmin):
         return obj.necesita_reposicion()
     necesita_reposicion.boolean = True
     necesita_reposicion.short_description = 'Necesita Reposición'
+
+
+@admin.register(DisponibilidadPlato)
+class DisponibilidadPlatoAdmin(admin.ModelAdmin):
+    list_display = ('plato', 'porciones', 'fecha_actualizacion')
+    list_select_related = ('plato',)
+    search_fields = ('plato__nombre',)
+    readonly_fields = ('plato', 'porciones', 'fecha_actualizacion')
@@ -0,0 +1,68 @@
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Case, When, Value, DecimalField
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from menu.models import PlatoIngrediente
+from .disponibilidad import marcar_disponibilidad
+from .models import MovimientoInventario, StockInventario
+
+
+def descontar_ingredientes_pedido(pedido, usuario=None):
+    """Descuenta del inventario los ingredientes de todos los items de un pedido.
+
+    El costo en consultas es constante sin importar el tamaño del pedido:
+    una consulta para las recetas, una para los stocks faltantes, un
+    bulk_create de movimientos y un único UPDATE para los stocks. El índice
+    de disponibilidad de los platos afectados se recalcula al confirmar.
+    Devuelve un diccionario {ingrediente_id: cantidad_descontada}.
+    """
+    lineas = PlatoIngrediente.objects.filter(
+        plato__itempedido__pedido=pedido
+    ).values_list(
+        'ingrediente_id', 'cantidad', 'plato__itempedido__cantidad', 'plato__nombre'
+    )
+
+    movimientos = []
+    requerido = defaultdict(Decimal)
+    for ingrediente_id, cantidad_receta, cantidad_item, nombre_plato in lineas:
+        cantidad_necesaria = cantidad_receta * Decimal(cantidad_item)
+        requerido[ingrediente_id] += cantidad_necesaria
+        movimientos.append(MovimientoInventario(
+            ingrediente_id=ingrediente_id,
+            tipo_movimiento='salida',
+            cantidad=cantidad_necesaria,
+            motivo=f'Pedido #{pedido.id} - {nombre_plato}',
+            usuario=usuario,
+        ))
+
+    if not requerido:
+        return {}
+
+    campo_cantidad = DecimalField(max_digits=10, decimal_places=2)
+    with transaction.atomic():
+        # Crear los stocks que aún no existen (equivale al get_or_create anterior)
+        StockInventario.objects.bulk_create(
+            [StockInventario(ingrediente_id=ingrediente_id) for ingrediente_id in requerido],
+            ignore_conflicts=True,
+        )
+        MovimientoInventario.objects.bulk_create(movimientos)
+
+        # Un solo UPDATE atómico; el stock nunca queda por debajo de cero
+        descuento = Case(
+            *[When(ingrediente_id=ingrediente_id, then=Value(cantidad, output_field=campo_cantidad))
+              for ingrediente_id, cantidad in requerido.items()],
+            default=Value(Decimal('0.00'), output_field=campo_cantidad),
+            output_field=campo_cantidad,
+        )
+        StockInventario.objects.filter(ingrediente_id__in=requerido.keys()).update(
+            cantidad_actual=Greatest(
+                F('cantidad_actual') - descuento,
+                Value(Decimal('0.00'), output_field=campo_cantidad),
+                output_field=campo_cantidad,
+            ),
+            fecha_actualizacion=timezone.now(),
+        )
+        marcar_disponibilidad(ingrediente_ids=requerido.keys())
+    return dict(requerido)
@@ -0,0 +1,116 @@
+import threading
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Min, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.utils import timezone
+from menu.models import Plato, PlatoIngrediente
+from .models import DisponibilidadPlato
+
+
+def _centavos(expresion):
+    return Cast(Round(expresion * 100), IntegerField())
+
+
+def calcular_porciones(lineas):
+    """{plato_id: porciones} de las líneas de receta, en una consulta agrupada por plato.
+
+    Cada plato queda con el mínimo de stock // cantidad entre sus ingredientes;
+    un ingrediente sin stock registrado cuenta como cero. La división se hace
+    en centavos enteros, así SQLite (que divide en coma flotante) y PostgreSQL
+    dan exactamente el mismo resultado que Decimal.
+    """
+    alcanza = Case(
+        When(cantidad__gt=0, then=_centavos(Coalesce(F('ingrediente__stock__cantidad_actual'), Value(0))) / _centavos(F('cantidad'))),
+        default=Value(0), output_field=IntegerField(),
+    )
+    filas = lineas.order_by().values('plato_id').annotate(porciones=Min(alcanza)).values_list('plato_id', 'porciones')
+    return {plato_id: max(int(porciones), 0) for plato_id, porciones in filas}
+
+
+def _lineas(ingrediente_ids=None, plato_ids=None):
+    lineas = PlatoIngrediente.objects.all()
+    if ingrediente_ids is not None or plato_ids is not None:
+        # Todas las líneas de los platos que usan esos ingredientes, en una consulta
+        afectados = Q(plato_id__in=plato_ids or ())
+        if ingrediente_ids:
+            afectados |= Q(plato__in=PlatoIngrediente.objects.filter(
+                ingrediente_id__in=ingrediente_ids
+            ).values('plato_id'))
+        lineas = lineas.filter(afectados)
+    return lineas
+
+
+def actualizar_disponibilidad(ingrediente_ids=None, plato_ids=None):
+    """Recalcula el índice de los platos afectados (o de todos si no se indica nada).
+
+    Solo escribe las filas que cambiaron y borra las de platos que ya no tienen
+    receta. Si algún plato se agotó o volvió a tener stock invalida el menú en
+    caché. Devuelve cuántas filas escribió.
+    """
+    completo = ingrediente_ids is None and plato_ids is None
+    porciones = calcular_porciones(_lineas(ingrediente_ids, plato_ids))
+
+    existentes = DisponibilidadPlato.objects.all()
+    if not completo:
+        existentes = existentes.filter(plato_id__in=set(porciones) | set(plato_ids or ()))
+    anteriores = dict(existentes.values_list('plato_id', 'porciones'))
+
+    cambios = [
+        DisponibilidadPlato(plato_id=plato_id, porciones=cantidad)
+        for plato_id, cantidad in porciones.items()
+        if anteriores.get(plato_id) != cantidad
+    ]
+    sin_receta = set(anteriores) - set(porciones)
+    if cambios:
+        DisponibilidadPlato.objects.bulk_create(
+            cambios, update_conflicts=True, unique_fields=['plato'],
+            update_fields=['porciones', 'fecha_actualizacion'],
+        )
+    if sin_receta:
+        DisponibilidadPlato.objects.filter(plato_id__in=sin_receta).delete()
+        # Sin fila de disponibilidad la sincronización de tablets solo ve la fecha del plato
+        Plato.objects.filter(id__in=sin_receta).update(fecha_actualizacion=timezone.now())
+
+    agotados_antes = {plato_id for plato_id, cantidad in anteriores.items() if cantidad == 0}
+    agotados = {plato_id for plato_id, cantidad in porciones.items() if cantidad == 0}
+    if agotados != agotados_antes:
+        from menu.fragmentos import invalidar_menu_al_confirmar
+        invalidar_menu_al_confirmar()
+    return len(cambios) + len(sin_receta)
+
+
+_pendientes = threading.local()
+
+
+def marcar_disponibilidad(ingrediente_ids=(), plato_ids=()):
+    """Anota ingredientes o platos cuyo índice hay que recalcular al confirmar la transacción.
+
+    Un checkout o una carga de stock con muchas filas recalcula una sola vez,
+    y solo si la transacción se guardó.
+    """
+    if not hasattr(_pendientes, 'ingredientes'):
+        _pendientes.ingredientes, _pendientes.platos = set(), set()
+    _pendientes.ingredientes.update(ingrediente_ids)
+    _pendientes.platos.update(plato_ids)
+    transaction.on_commit(_actualizar_pendientes, robust=True)
+
+
+def _actualizar_pendientes():
+    ingredientes, platos = _pendientes.ingredientes, _pendientes.platos
+    if not (ingredientes or platos):
+        return
+    _pendientes.ingredientes, _pendientes.platos = set(), set()
+    actualizar_disponibilidad(ingrediente_ids=ingredientes, plato_ids=platos)
+
+
+def con_stock(queryset):
+    """Filtra platos que alcanzan para al menos una porción; los que no tienen receta no se limitan"""
+    return queryset.filter(Q(disponibilidad__isnull=True) | Q(disponibilidad__porciones__gt=0))
+
+
+def porciones_disponibles(plato):
+    """Porciones que alcanzan según el índice, o None si el plato no lleva ingredientes"""
+    try:
+        return plato.disponibilidad.porciones
+    except DisponibilidadPlato.DoesNotExist:
+        return None
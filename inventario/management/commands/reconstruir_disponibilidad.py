@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from inventario.disponibilidad import actualizar_disponibilidad
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las porciones disponibles de todos los platos según el stock actual'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            cambiadas = actualizar_disponibilidad()
+        self.stdout.write(self.style.SUCCESS(f'Índice de disponibilidad recalculado: {cambiadas} platos cambiaron'))
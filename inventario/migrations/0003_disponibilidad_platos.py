@@ -0,0 +1,52 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, F, IntegerField, Min, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def llenar_disponibilidad(apps, schema_editor):
+    """Porciones de cada plato con receta: mínimo de stock // cantidad, en centavos enteros"""
+    alias = schema_editor.connection.alias
+    PlatoIngrediente = apps.get_model('menu', 'PlatoIngrediente')
+    DisponibilidadPlato = apps.get_model('inventario', 'DisponibilidadPlato')
+
+    def centavos(expresion):
+        return Cast(Round(expresion * 100), IntegerField())
+
+    alcanza = Case(
+        When(cantidad__gt=0, then=centavos(Coalesce(F('ingrediente__stock__cantidad_actual'), Value(0))) / centavos(F('cantidad'))),
+        default=Value(0), output_field=IntegerField(),
+    )
+    filas = PlatoIngrediente.objects.using(alias).order_by().values('plato_id').annotate(
+        porciones=Min(alcanza)
+    ).values_list('plato_id', 'porciones')
+    DisponibilidadPlato.objects.using(alias).bulk_create(
+        [DisponibilidadPlato(plato_id=plato_id, porciones=max(int(porciones), 0)) for plato_id, porciones in filas],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0002_initial'),
+        ('menu', '0004_categoria_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibilidadPlato',
+            fields=[
+                ('plato', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='disponibilidad', serialize=False, to='menu.plato')),
+                ('porciones', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Disponibilidad de Plato',
+                'verbose_name_plural': 'Disponibilidad de Platos',
+            },
+        ),
+        migrations.RunPython(llenar_disponibilidad, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-from menu.models import Ingrediente
+from menu.models import Ingrediente, Plato
 
 
 class MovimientoInventario(models.Model):
@@ -61,3 +61,17 @@ class StockInventario(models.Model):
     def necesita_reposicion(self):
         """Verifica si el stock está por debajo del mínimo"""
         return self.cantidad_actual <= self.cantidad_minima
+
+
+class DisponibilidadPlato(models.Model):
+    """Porciones de cada plato que alcanzan con el stock actual (índice precalculado)"""
+    plato = models.OneToOneField(Plato, on_delete=models.CASCADE, primary_key=True, related_name='disponibilidad')
+    porciones = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Disponibilidad de Plato'
+        verbose_name_plural = 'Disponibilidad de Platos'
+
+    def __str__(self):
+        return f"{self.plato.nombre} - {self.porciones} porciones"
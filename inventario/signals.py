@@ -0,0 +1,21 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from menu.models import PlatoIngrediente
+from .disponibilidad import marcar_disponibilidad
+from .models import StockInventario
+
+
+# El índice de disponibilidad se recalcula al confirmar la transacción. Los
+# UPDATE en bloque no disparan señales: quien los haga llama a
+# marcar_disponibilidad (ver descuentos.py) o corre `reconstruir_disponibilidad`.
+
+@receiver(post_save, sender=StockInventario)
+@receiver(post_delete, sender=StockInventario)
+def stock_cambiado(sender, instance, **kwargs):
+    marcar_disponibilidad(ingrediente_ids=[instance.ingrediente_id])
+
+
+@receiver(post_save, sender=PlatoIngrediente)
+@receiver(post_delete, sender=PlatoIngrediente)
+def receta_cambiada(sender, instance, **kwargs):
+    marcar_disponibilidad(plato_ids=[instance.plato_id])
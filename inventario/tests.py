@@ -1,3 +1,140 @@
+from decimal import Decimal
+from django.db import connection
+from django.urls import reverse
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from menu.models import Categoria, Ingrediente, Plato, PlatoIngrediente
+from pedidos.models import Pedido, ItemPedido
+from usuarios.models import Usuario
+from .descuentos import descontar_ingredientes_pedido
+from .disponibilidad import actualizar_disponibilidad, calcular_porciones
+from .models import DisponibilidadPlato, MovimientoInventario, StockInventario
 
-# Create your tests here.
+
+class DescuentoInventarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        cls.categoria = Categoria.objects.create(nombre='Principales')
+        cls.ingredientes = [
+            Ingrediente.objects.create(nombre=f'Ingrediente {i}') for i in range(8)
+        ]
+        for ingrediente in cls.ingredientes:
+            StockInventario.objects.create(ingrediente=ingrediente, cantidad_actual=Decimal('100.00'))
+
+    def _crear_pedido(self, num_items):
+        pedido = Pedido.objects.create(cliente=self.cliente)
+        for i in range(num_items):
+            plato = Plato.objects.create(
+                nombre=f'Plato {pedido.id}-{i}', descripcion='-', categoria=self.categoria, precio=Decimal('10.00')
+            )
+            for ingrediente in self.ingredientes:
+                PlatoIngrediente.objects.create(plato=plato, ingrediente=ingrediente, cantidad=Decimal('0.50'))
+            ItemPedido.objects.create(pedido=pedido, plato=plato, cantidad=2, precio_unitario=plato.precio)
+        return pedido
+
+    def test_descuenta_stock_y_registra_movimientos(self):
+        pedido = self._crear_pedido(3)
+        descontar_ingredientes_pedido(pedido, usuario=self.cliente)
+
+        for stock in StockInventario.objects.all():
+            # 3 platos x 2 unidades x 0.50
+            self.assertEqual(stock.cantidad_actual, Decimal('97.00'))
+        self.assertEqual(MovimientoInventario.objects.filter(tipo_movimiento='salida').count(), 3 * 8)
+
+    def test_stock_no_queda_negativo_y_se_crea_si_falta(self):
+        StockInventario.objects.filter(ingrediente=self.ingredientes[0]).update(cantidad_actual=Decimal('1.00'))
+        StockInventario.objects.filter(ingrediente=self.ingredientes[1]).delete()
+        pedido = self._crear_pedido(2)
+        descontar_ingredientes_pedido(pedido)
+
+        self.assertEqual(StockInventario.objects.get(ingrediente=self.ingredientes[0]).cantidad_actual, Decimal('0.00'))
+        self.assertEqual(StockInventario.objects.get(ingrediente=self.ingredientes[1]).cantidad_actual, Decimal('0.00'))
+
+    def test_numero_de_consultas_constante(self):
+        """Benchmark: el número de consultas no crece con el tamaño del pedido"""
+        consultas = {}
+        for num_items in (1, 10, 20):
+            pedido = self._crear_pedido(num_items)
+            with CaptureQueriesContext(connection) as ctx:
+                descontar_ingredientes_pedido(pedido)
+            consultas[num_items] = len(ctx.captured_queries)
+        self.assertEqual(len(set(consultas.values())), 1, consultas)
+        self.assertLessEqual(consultas[20], 7)
+
+
+
+class DisponibilidadPlatoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.categoria = Categoria.objects.create(nombre='Principales')
+        cls.arroz = Ingrediente.objects.create(nombre='Arroz')
+        cls.pollo = Ingrediente.objects.create(nombre='Pollo')
+        cls.stock_arroz = StockInventario.objects.create(ingrediente=cls.arroz, cantidad_actual=Decimal('10.00'))
+        cls.stock_pollo = StockInventario.objects.create(ingrediente=cls.pollo, cantidad_actual=Decimal('3.00'))
+        cls.plato = Plato.objects.create(nombre='Arroz con pollo', descripcion='-', categoria=cls.categoria, precio=Decimal('20.00'))
+        cls.sin_receta = Plato.objects.create(nombre='Limonada', descripcion='-', categoria=cls.categoria, precio=Decimal('5.00'))
+        PlatoIngrediente.objects.create(plato=cls.plato, ingrediente=cls.arroz, cantidad=Decimal('2.00'))
+        PlatoIngrediente.objects.create(plato=cls.plato, ingrediente=cls.pollo, cantidad=Decimal('1.00'))
+        actualizar_disponibilidad()
+
+    def setUp(self):
+        cache.clear()
+
+    def _porciones(self, plato):
+        return DisponibilidadPlato.objects.get(plato=plato).porciones
+
+    def test_minimo_entre_ingredientes(self):
+        # arroz alcanza para 5, pollo para 3
+        self.assertEqual(self._porciones(self.plato), 3)
+        self.assertFalse(DisponibilidadPlato.objects.filter(plato=self.sin_receta).exists())
+
+    def test_division_exacta_en_una_consulta(self):
+        sal = Ingrediente.objects.create(nombre='Sal')
+        StockInventario.objects.create(ingrediente=sal, cantidad_actual=Decimal('0.30'))
+        salado = Plato.objects.create(nombre='Salado', descripcion='-', categoria=self.categoria, precio=Decimal('1.00'))
+        PlatoIngrediente.objects.create(plato=salado, ingrediente=sal, cantidad=Decimal('0.10'))
+        with self.assertNumQueries(1):
+            porciones = calcular_porciones(PlatoIngrediente.objects.all())
+        # 0.30 / 0.10 en coma flotante da 2.999...: la división en centavos da 3
+        self.assertEqual(porciones, {self.plato.id: 3, salado.id: 3})
+
+    def test_cambio_de_stock_actualiza_solo_los_platos_afectados(self):
+        otro = Plato.objects.create(nombre='Arroz blanco', descripcion='-', categoria=self.categoria, precio=Decimal('8.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            PlatoIngrediente.objects.create(plato=otro, ingrediente=self.arroz, cantidad=Decimal('1.00'))
+        self.assertEqual(self._porciones(otro), 10)
+
+        self.stock_pollo.cantidad_actual = Decimal('0.50')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stock_pollo.save()
+        self.assertEqual(self._porciones(self.plato), 0)
+        self.assertEqual(self._porciones(otro), 10)
+        # Sin cambios no se escribe nada
+        self.assertEqual(actualizar_disponibilidad(ingrediente_ids=[self.pollo.id]), 0)
+
+    def test_checkout_descuenta_porciones(self):
+        cliente = Usuario.objects.create_user(username='cliente', password='x')
+        pedido = Pedido.objects.create(cliente=cliente)
+        ItemPedido.objects.create(pedido=pedido, plato=self.plato, cantidad=2, precio_unitario=self.plato.precio)
+        with self.captureOnCommitCallbacks(execute=True):
+            descontar_ingredientes_pedido(pedido)
+        # quedan 6 de arroz y 1 de pollo
+        self.assertEqual(self._porciones(self.plato), 1)
+
+    def test_menu_oculta_agotados_y_carrito_respeta_porciones(self):
+        url_carrito = reverse('menu:agregar_carrito', args=[self.plato.id])
+        respuesta = self.client.post(url_carrito, {'cantidad': 4})
+        self.assertRedirects(respuesta, reverse('menu:detalle_plato', args=[self.plato.id]))
+        self.client.post(url_carrito, {'cantidad': 3})
+        self.assertEqual(self.client.session['carrito'][str(self.plato.id)]['cantidad'], 3)
+        self.assertRedirects(self.client.post(url_carrito, {'cantidad': 1}), reverse('menu:detalle_plato', args=[self.plato.id]))
+
+        self.assertContains(self.client.get(reverse('menu:index')), 'Arroz con pollo')
+        self.stock_pollo.cantidad_actual = Decimal('0.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stock_pollo.save()
+        respuesta = self.client.get(reverse('menu:index'))
+        self.assertNotContains(respuesta, 'Arroz con pollo')
+        self.assertContains(respuesta, 'Limonada')
@@ -0,0 +1,282 @@
+import re
+import unicodedata
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Upper
+from django.utils.module_loading import import_string
+
+
+TAMANO_LOTE = 1000
+
+PALABRAS_VACIAS = {
+    'a', 'al', 'con', 'de', 'del', 'e', 'el', 'en', 'la', 'las', 'lo', 'los',
+    'o', 'para', 'por', 'sin', 'su', 'un', 'una', 'y',
+}
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Plátano' -> 'platano'"""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def raiz(palabra):
+    """Stemming liviano para español: quita el plural y la vocal final.
+
+    'plátanos', 'platano' y 'plátana' quedan en 'platan'; 'limones' en 'limon'.
+    """
+    if len(palabra) >= 5 and palabra.endswith('ces'):
+        palabra = palabra[:-3] + 'z'
+    elif len(palabra) >= 5 and palabra.endswith('es') and palabra[-3] not in 'aeiou':
+        palabra = palabra[:-2]
+    elif len(palabra) >= 4 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    if len(palabra) >= 5 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+def terminos(texto):
+    """Raíces de las palabras del texto, sin palabras vacías; igual para indexar y buscar"""
+    return [
+        raiz(palabra) for palabra in re.findall(r'[a-z0-9]+', normalizar(texto))
+        if palabra not in PALABRAS_VACIAS
+    ]
+
+
+def _documento(nombre, descripcion):
+    return ' '.join(terminos(nombre)), ' '.join(terminos(descripcion))
+
+
+class BusquedaSimple:
+    """Sin índice: icontains sobre nombre y descripción (bases sin FTS)"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def crear(self):
+        pass
+
+    def borrar(self):
+        pass
+
+    def indexar(self, plato_id, nombre, descripcion):
+        pass
+
+    def eliminar(self, plato_id):
+        pass
+
+    def reconstruir(self, platos):
+        return 0
+
+    def actualizar(self, platos):
+        return 0
+
+    def filtrar(self, queryset, texto):
+        return queryset.filter(Q(nombre__icontains=texto) | Q(descripcion__icontains=texto))
+
+
+class _BusquedaIndexada(BusquedaSimple):
+    """Base de los motores con índice propio.
+
+    El índice se consulta con subconsultas sobre el queryset del llamador
+    (RawSQL: la tabla del índice no tiene modelo), así sus filtros (categoría,
+    disponibilidad, stock) se aplican a todas las coincidencias y el ranking
+    se calcula solo para los platos que coinciden.
+    """
+    TABLA = ''
+    COLUMNA_ID = ''
+    # Puntaje de cada plato del resultado: subconsulta correlada por la clave del índice
+    SQL_PUNTAJE = 'SELECT {rango} FROM {tabla_indice} WHERE {tabla_indice}.{id_indice} = {tabla}.id AND ({donde})'
+
+    def _filtrar(self, queryset, donde, parametros, rango, parametros_rango, descendente):
+        tabla = queryset.model._meta.db_table
+        coincidencias = RawSQL(f'SELECT {self.COLUMNA_ID} FROM {self.TABLA} WHERE {donde}', parametros)
+        puntaje = RawSQL(
+            self.SQL_PUNTAJE.format(tabla_indice=self.TABLA, id_indice=self.COLUMNA_ID, tabla=tabla, donde=donde, rango=rango),
+            [*parametros_rango, *parametros], output_field=FloatField(),
+        )
+        return queryset.filter(id__in=coincidencias).annotate(rango_busqueda=puntaje).order_by(
+            '-rango_busqueda' if descendente else 'rango_busqueda', 'id'
+        )
+
+    def reconstruir(self, platos):
+        """Vacía el índice y lo vuelve a llenar por lotes. Devuelve cuántos platos indexó"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.SQL_VACIAR)
+            lote, total = [], 0
+            for plato_id, nombre, descripcion in platos.values_list('id', 'nombre', 'descripcion').iterator(chunk_size=TAMANO_LOTE):
+                lote.append((plato_id, *_documento(nombre, descripcion)))
+                if len(lote) == TAMANO_LOTE:
+                    cursor.executemany(self.SQL_INSERTAR, lote)
+                    total += len(lote)
+                    lote = []
+            if lote:
+                cursor.executemany(self.SQL_INSERTAR, lote)
+                total += len(lote)
+        return total
+
+    def actualizar(self, platos):
+        """Reindexa solo estos platos (instancias guardadas), por lotes. Devuelve cuántos indexó"""
+        filas = [(plato.pk, *_documento(plato.nombre, plato.descripcion)) for plato in platos]
+        with self.connection.cursor() as cursor:
+            for inicio in range(0, len(filas), TAMANO_LOTE):
+                lote = filas[inicio:inicio + TAMANO_LOTE]
+                cursor.executemany(self.SQL_BORRAR, [(fila[0],) for fila in lote])
+                cursor.executemany(self.SQL_INSERTAR, lote)
+        return len(filas)
+
+
+class BusquedaSQLite(_BusquedaIndexada):
+    """Tabla virtual FTS5 con rowid = id del plato, ranking bm25 (el nombre pesa más)"""
+    TABLA = 'menu_plato_fts'
+    COLUMNA_ID = 'rowid'
+    SQL_VACIAR = 'DELETE FROM menu_plato_fts'
+    SQL_BORRAR = 'DELETE FROM menu_plato_fts WHERE rowid = %s'
+    # FTS5 repetiría el MATCH por cada fila de una subconsulta correlada: el ranking se
+    # materializa una vez por consulta y se busca por id
+    SQL_PUNTAJE = (
+        'WITH r AS MATERIALIZED (SELECT {id_indice} AS id, {rango} AS rango FROM {tabla_indice} WHERE {donde}) '
+        'SELECT r.rango FROM r WHERE r.id = {tabla}.id'
+    )
+    SQL_INSERTAR = 'INSERT INTO menu_plato_fts (rowid, nombre, descripcion) VALUES (%s, %s, %s)'
+
+    def crear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS menu_plato_fts USING fts5("
+                "nombre, descripcion, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def borrar(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS menu_plato_fts')
+
+    def indexar(self, plato_id, nombre, descripcion):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM menu_plato_fts WHERE rowid = %s', [plato_id])
+            cursor.execute(self.SQL_INSERTAR, [plato_id, *_documento(nombre, descripcion)])
+
+    def eliminar(self, plato_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM menu_plato_fts WHERE rowid = %s', [plato_id])
+
+    def filtrar(self, queryset, texto):
+        raices = terminos(texto)
+        if not raices:
+            return queryset
+        # Cada raíz como prefijo entre comillas; FTS5 exige todas (AND implícito)
+        consulta = ' '.join(f'"{r}"*' for r in raices)
+        return self._filtrar(queryset, 'menu_plato_fts MATCH %s', [consulta], 'bm25(menu_plato_fts, 10.0, 1.0)', [], False)
+
+
+# Alias de conexión -> pg_trgm instalada; se consulta una vez por proceso
+_TRIGRAMAS = {}
+
+
+class BusquedaPostgres(_BusquedaIndexada):
+    """tsvector con pesos (A nombre, B descripción) e índice GIN; si la
+    extensión pg_trgm está instalada, también coinciden los nombres parecidos
+    por trigramas (errores de tipeo), ordenados después de las coincidencias
+    exactas."""
+    TABLA = 'menu_plato_busqueda'
+    COLUMNA_ID = 'plato_id'
+    SQL_VACIAR = 'DELETE FROM menu_plato_busqueda'
+    SQL_BORRAR = 'DELETE FROM menu_plato_busqueda WHERE plato_id = %s'
+    SQL_INSERTAR = (
+        "INSERT INTO menu_plato_busqueda (plato_id, documento, texto) "
+        "SELECT v.id, setweight(to_tsvector('simple', v.nombre), 'A') || setweight(to_tsvector('simple', v.descripcion), 'B'), v.nombre "
+        "FROM (SELECT %s::bigint AS id, %s::text AS nombre, %s::text AS descripcion) v "
+        "ON CONFLICT (plato_id) DO UPDATE SET documento = EXCLUDED.documento, texto = EXCLUDED.texto"
+    )
+
+    def crear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE IF NOT EXISTS menu_plato_busqueda ('
+                'plato_id bigint PRIMARY KEY REFERENCES menu_plato (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+                'documento tsvector NOT NULL, texto text NOT NULL)'
+            )
+            cursor.execute('CREATE INDEX IF NOT EXISTS menu_plato_busqueda_gin ON menu_plato_busqueda USING GIN (documento)')
+            _TRIGRAMAS.pop(self.connection.alias, None)
+            if self._trigramas():
+                cursor.execute(
+                    'CREATE INDEX IF NOT EXISTS menu_plato_busqueda_trgm ON menu_plato_busqueda USING GIN (texto gin_trgm_ops)'
+                )
+
+    def borrar(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS menu_plato_busqueda')
+
+    def _trigramas(self):
+        alias = self.connection.alias
+        if alias not in _TRIGRAMAS:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _TRIGRAMAS[alias] = cursor.fetchone() is not None
+        return _TRIGRAMAS[alias]
+
+    def indexar(self, plato_id, nombre, descripcion):
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.SQL_INSERTAR, [plato_id, *_documento(nombre, descripcion)])
+
+    def eliminar(self, plato_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM menu_plato_busqueda WHERE plato_id = %s', [plato_id])
+
+    def filtrar(self, queryset, texto):
+        raices = terminos(texto)
+        if not raices:
+            return queryset
+        consulta = ' & '.join(f'{r}:*' for r in raices)
+        exacta = "documento @@ to_tsquery('simple', %s)"
+        rango = "ts_rank(documento, to_tsquery('simple', %s))"
+        if not self._trigramas():
+            return self._filtrar(queryset, exacta, [consulta], rango, [consulta], True)
+        # Una sola consulta: ts_rank está en [0, 1], así las exactas quedan antes que las parecidas
+        texto = ' '.join(raices)
+        return self._filtrar(
+            queryset, f'{exacta} OR texto %% %s', [consulta, texto],
+            f'CASE WHEN {exacta} THEN 1 + {rango} ELSE similarity(texto, %s) END', [consulta, consulta, texto], True,
+        )
+
+
+MOTORES = {
+    'sqlite': BusquedaSQLite,
+    'postgresql': BusquedaPostgres,
+}
+
+
+def motor_busqueda(using='default'):
+    """Motor de búsqueda para la base de datos; MENU_BUSQUEDA fuerza una clase por ruta"""
+    connection = connections[using]
+    ruta = getattr(settings, 'MENU_BUSQUEDA', None)
+    clase = import_string(ruta) if ruta else MOTORES.get(connection.vendor, BusquedaSimple)
+    return clase(connection)
+
+
+def buscar_platos(queryset, texto):
+    """Filtra el queryset de platos por el texto, ordenado por relevancia"""
+    return motor_busqueda(queryset.db).filtrar(queryset, texto)
+
+
+def buscar_ingredientes(texto, limite=20):
+    """Ingredientes activos cuyo nombre empieza por `texto`, sin distinguir mayúsculas.
+
+    Se compara un rango [TEXTO, TEXTO + U+FFFF) sobre UPPER(nombre): así lo
+    resuelve el índice ingrediente_nombre_mayus_idx tanto en SQLite como en
+    PostgreSQL (LIKE no lo usaría). El texto se pasa a mayúsculas con el mismo
+    UPPER de la base de datos, así se transforma igual que la columna indexada.
+    """
+    from .models import Ingrediente
+
+    texto = (texto or '').strip()
+    if not texto:
+        return Ingrediente.objects.none()
+    return Ingrediente.objects.annotate(nombre_mayus=Upper('nombre')).filter(
+        nombre_mayus__gte=Upper(Value(texto)),
+        nombre_mayus__lt=Upper(Value(texto + '\uffff')),
+        activo=True,
+    ).order_by('nombre_mayus')[:limite]
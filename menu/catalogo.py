@@ -0,0 +1,67 @@
+import hashlib
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max, Q
+from inventario.disponibilidad import con_stock
+from .fragmentos import version_menu
+from .models import Categoria, Plato
+
+
+VERSION_API = 1
+
+
+def version_catalogo():
+    """Versión del catálogo: última modificación y conteo de platos y categorías.
+
+    El conteo cubre los borrados, que no mueven la fecha máxima; los platos
+    agotados por falta de stock también entran en la firma. Se calcula una
+    vez por versión del menú en caché, así que los sondeos repetidos no
+    consultan la base de datos.
+    """
+    clave = f'menu:v{version_menu()}:api:version'
+    version = cache.get(clave)
+    if version is None:
+        agotado = Q(disponibilidad__porciones=0)
+        platos = Plato.objects.aggregate(
+            ultima=Max('fecha_actualizacion'), cantidad=Count('id'),
+            agotados=Count('id', filter=agotado), ultimo_agotado=Max('disponibilidad__fecha_actualizacion', filter=agotado),
+        )
+        categorias = Categoria.objects.aggregate(ultima=Max('fecha_actualizacion'), cantidad=Count('id'))
+        firma = '|'.join(str(valor) for valor in (
+            VERSION_API, platos['ultima'], platos['cantidad'], platos['agotados'], platos['ultimo_agotado'],
+            categorias['ultima'], categorias['cantidad'],
+        ))
+        version = hashlib.sha256(firma.encode()).hexdigest()[:20]
+        cache.set(clave, version, getattr(settings, 'MENU_CACHE_TTL', 900))
+    return version
+
+
+def _plato(plato):
+    tarjeta = plato.imagenes.get('tarjeta', {})
+    return {
+        'id': plato.id,
+        'nombre': plato.nombre,
+        'descripcion': plato.descripcion,
+        'categoria_id': plato.categoria_id,
+        'categoria': plato.categoria.nombre,
+        'precio': plato.precio,
+        'tiempo_preparacion': plato.tiempo_preparacion,
+        'imagen': tarjeta.get('src') or (plato.imagen.url if plato.imagen else None),
+    }
+
+
+def menu_json(version):
+    """JSON del menú (categorías activas y platos disponibles con stock) guardado por versión"""
+    clave = f'menu:api:{version}'
+    contenido = cache.get(clave)
+    if contenido is None:
+        datos = {
+            'version': version,
+            'categorias': list(Categoria.objects.filter(activa=True).values('id', 'nombre', 'descripcion')),
+            'platos': [_plato(plato) for plato in con_stock(Plato.objects.filter(disponible=True)).select_related('categoria')],
+        }
+        contenido = json.dumps(datos, cls=DjangoJSONEncoder)
+        cache.set(clave, contenido, getattr(settings, 'MENU_CACHE_TTL', 900))
+    return contenido
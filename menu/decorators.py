@@ -1,34 +1,37 @@
 from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.shortcuts import redirect
 from django.contrib import messages
 
 
-def staff_or_mesero_required(view_func):
-    """Decorador que permite acceso a administradores y meseros"""
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            messages.error(request, 'Debes iniciar sesión para acceder a esta página')
-            return redirect('usuarios:login')
-        
-        if request.user.es_administrador() or request.user.es_mesero():
-            return view_func(request, *args, **kwargs)
-        else:
-            messages.error(request, 'No tienes permisos para acceder a esta página')
-            return redirect('menu:index')
-    
-    return _wrapped_view
-
-
-def admin_role_required(view_func):
-    @wraps(view_func)
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
+def _requiere_rol(view_func, tiene_permiso):
+    """Envuelve vistas síncronas o asíncronas con la misma verificación de rol"""
+    def _denegado(request, user):
+        if not user.is_authenticated:
             messages.error(request, 'Debes iniciar sesión para acceder a esta página')
             return redirect('usuarios:login')
-        if request.user.is_superuser or request.user.es_administrador():
-            return view_func(request, *args, **kwargs)
         messages.error(request, 'No tienes permisos para acceder a esta página')
         return redirect('menu:index')
-    return _wrapped_view
 
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            user = await request.auser()
+            if user.is_authenticated and tiene_permiso(user):
+                return await view_func(request, *args, **kwargs)
+            return _denegado(request, user)
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            if request.user.is_authenticated and tiene_permiso(request.user):
+                return view_func(request, *args, **kwargs)
+            return _denegado(request, request.user)
+
+    return wraps(view_func)(_wrapped_view)
+
+
+def staff_or_mesero_required(view_func):
+    """Decorador que permite acceso a administradores y meseros"""
+    return _requiere_rol(view_func, lambda user: user.es_administrador() or user.es_mesero())
+
+
+def admin_role_required(view_func):
+    return _requiere_rol(view_func, lambda user: user.is_superuser or user.es_administrador())
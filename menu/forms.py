@@ -1,7 +1,9 @@
 from django import forms
 from django.forms import inlineformset_factory, BaseInlineFormSet
 from django.core.exceptions import ValidationError
+from django.utils.functional import cached_property
 from .models import Plato, Categoria, Ingrediente, PlatoIngrediente
+from .imagenes import actualizar_variantes
 
 
 class PlatoForm(forms.ModelForm):
@@ -20,6 +22,12 @@ class PlatoForm(forms.ModelForm):
             'tiempo_preparacion': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
         }
 
+    def save(self, commit=True):
+        plato = super().save(commit)
+        if commit and 'imagen' in self.changed_data:
+            actualizar_variantes(plato)
+        return plato
+
 
 class CategoriaForm(forms.ModelForm):
     """Formulario para crear/editar categorías"""
@@ -48,21 +56,106 @@ class IngredienteForm(forms.ModelForm):
         }
 
 
+class ImportarMenuForm(forms.Form):
+    """Archivo CSV o Excel con el menú (formato de menu/importacion.py)"""
+    archivo = forms.FileField(widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}))
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            raise ValidationError('El archivo debe ser .csv o .xlsx')
+        return archivo
+
+    @property
+    def formato(self):
+        return 'excel' if self.cleaned_data['archivo'].name.lower().endswith('.xlsx') else 'csv'
+
+
+class OpcionesCompartidasField(forms.ModelChoiceField):
+    """Valida contra las opciones ({id: objeto}) que comparte el formset, sin una consulta por fila"""
+    opciones = None
+
+    def to_python(self, value):
+        if self.opciones is None or value in self.empty_values:
+            return super().to_python(value)
+        try:
+            return self.opciones[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
+
+
 class PlatoIngredienteForm(forms.ModelForm):
     class Meta:
         model = PlatoIngrediente
         fields = ['ingrediente', 'cantidad']
+        field_classes = {'ingrediente': OpcionesCompartidasField}
         widgets = {
-            'ingrediente': forms.Select(attrs={'class': 'form-select'}),
+            'ingrediente': forms.Select(attrs={'class': 'form-select select-ingrediente'}),
             'cantidad': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.01'}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['ingrediente'].queryset = Ingrediente.objects.filter(activo=True).order_by('nombre')
+    def _get_validation_exclusions(self):
+        # El formset ya validó el ingrediente contra sus opciones y las líneas
+        # repetidas en memoria: el modelo no vuelve a consultarlos por fila
+        exclusiones = super()._get_validation_exclusions()
+        exclusiones.add('ingrediente')
+        return exclusiones
 
 
 class PlatoIngredienteBaseFormSet(BaseInlineFormSet):
+    """Las filas comparten una sola lista de ingredientes: solo los que ya usa la receta
+    o vienen en el POST. El resto se busca con el autocompletado (buscar_ingredientes)."""
+
+    def __init__(self, *args, queryset=None, **kwargs):
+        if queryset is None:
+            queryset = PlatoIngrediente.objects.select_related('ingrediente')
+        super().__init__(*args, queryset=queryset, **kwargs)
+
+    @cached_property
+    def opciones_ingredientes(self):
+        """{id: Ingrediente} activos referenciados por el formset, en una consulta"""
+        ids = {linea.ingrediente_id for linea in self.get_queryset()}
+        if self.is_bound:
+            for i in range(self.total_form_count()):
+                valor = self.data.get(f'{self.add_prefix(i)}-ingrediente', '')
+                if str(valor).isdigit():
+                    ids.add(int(valor))
+        return Ingrediente.objects.filter(activo=True).in_bulk(ids)
+
+    @cached_property
+    def choices_ingredientes(self):
+        ingredientes = sorted(self.opciones_ingredientes.values(), key=lambda ingrediente: ingrediente.nombre)
+        return [('', '---------')] + [(ingrediente.pk, str(ingrediente)) for ingrediente in ingredientes]
+
+    @cached_property
+    def opciones_lineas(self):
+        """{id: PlatoIngrediente} de la receta, ya leídos por get_queryset"""
+        return {linea.pk: linea for linea in self.get_queryset()}
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # El id de cada fila se valida contra las líneas ya leídas, no con un SELECT por fila
+        campo = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = OpcionesCompartidasField(
+            campo.queryset, initial=campo.initial, required=False, widget=campo.widget,
+        )
+        form.fields[self._pk_field.name].opciones = self.opciones_lineas
+
+    def _compartir_opciones(self, form):
+        campo = form.fields['ingrediente']
+        campo.opciones = self.opciones_ingredientes
+        campo.choices = self.choices_ingredientes
+        return form
+
+    def _construct_form(self, i, **kwargs):
+        return self._compartir_opciones(super()._construct_form(i, **kwargs))
+
+    @property
+    def empty_form(self):
+        form = super().empty_form
+        form.fields['ingrediente'].choices = [('', '---------')]
+        return form
+
     def clean(self):
         super().clean()
         ingredientes_vistos = set()
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+CLAVE_VERSION = 'menu:version'
+# Se guarda en el HTML cacheado en lugar del token CSRF y se reemplaza por el
+# token del visitante al servir la página: el fragmento no lleva datos de nadie
+MARCADOR_CSRF = '__csrf_menu__'
+
+
+def version_menu():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = 1
+        cache.add(CLAVE_VERSION, version, None)
+    return version
+
+
+def invalidar_menu():
+    """Invalida todos los fragmentos del menú cambiando la versión de sus claves"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 2, None)
+
+
+def invalidar_menu_al_confirmar():
+    """Invalida al confirmar la transacción, para no volver a cachear datos viejos"""
+    transaction.on_commit(invalidar_menu, robust=True)
+
+
+def rol_visitante(user):
+    if not user.is_authenticated:
+        return 'anonimo'
+    return 'administrador' if user.es_administrador() else user.rol
+
+
+def _paginas(version, contar):
+    """{categoría o 'todas': número de páginas} del listado, cacheado con la versión del menú"""
+    clave = f'menu:v{version}:paginas'
+    paginas = cache.get(clave)
+    if paginas is None:
+        por_pagina = getattr(settings, 'MENU_POR_PAGINA', 24)
+        conteos = contar()
+        paginas = {categoria_id: -(-total // por_pagina) for categoria_id, total in conteos.items() if total}
+        paginas['todas'] = max(-(-sum(conteos.values()) // por_pagina), 1)
+        cache.set(clave, paginas, getattr(settings, 'MENU_CACHE_TTL', 900))
+    return paginas
+
+
+def fragmento_menu(categoria_id, pagina, rol, renderizar, contar):
+    """HTML del listado para (categoría, página, rol), desde la caché o renderizado.
+
+    `contar` devuelve {categoria_id: platos del listado}. Solo se cachean las
+    categorías con platos y las páginas que existen (una mayor es la última,
+    como en Paginator.get_page); lo demás se renderiza sin caché, así los
+    parámetros de la URL no crean claves nuevas.
+    """
+    version = version_menu()
+    paginas = _paginas(version, contar)
+    ultima = paginas.get(categoria_id or 'todas')
+    if ultima is None:
+        return renderizar()
+    clave = f'menu:v{version}:listado:{categoria_id or "todas"}:{min(pagina, ultima)}:{rol}'
+    html = cache.get(clave)
+    if html is None:
+        html = renderizar()
+        cache.set(clave, html, getattr(settings, 'MENU_CACHE_TTL', 900))
+    return html
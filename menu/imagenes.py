@@ -0,0 +1,67 @@
+import hashlib
+import io
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+DIRECTORIO_VARIANTES = 'platos/variantes/'
+# Anchos (1x y 2x) de cada variante; la imagen nunca se agranda
+VARIANTES = {
+    'tarjeta': (400, 800),
+    'detalle': (800, 1600),
+}
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _anchos(variante, ancho_original):
+    """Anchos a generar sin agrandar; si la original es más chica queda solo su ancho"""
+    anchos = [ancho for ancho in VARIANTES[variante] if ancho <= ancho_original]
+    return anchos or [ancho_original]
+
+
+def generar_variantes(nombre, storage=None):
+    """Genera las variantes WebP y JPEG de la imagen `nombre` del storage.
+
+    Los archivos se nombran con el hash del original, así que su contenido no
+    cambia nunca y pueden servirse con caché de larga duración. Devuelve
+    {variante: [{'ancho', 'formato', 'ruta'}, ...]}.
+    """
+    from PIL import Image, ImageOps  # Pillow solo se carga al procesar imágenes
+
+    storage = storage or default_storage
+    with storage.open(nombre, 'rb') as archivo:
+        datos = archivo.read()
+    huella = hashlib.sha256(datos).hexdigest()[:16]
+    with Image.open(io.BytesIO(datos)) as original:
+        imagen = ImageOps.exif_transpose(original).convert('RGB')
+
+    resultado = {}
+    for variante in VARIANTES:
+        resultado[variante] = []
+        for ancho in _anchos(variante, imagen.width):
+            alto = round(imagen.height * ancho / imagen.width)
+            reducida = imagen if ancho == imagen.width else imagen.resize((ancho, alto), Image.LANCZOS)
+            for formato, (formato_pil, opciones) in FORMATOS.items():
+                ruta = f'{DIRECTORIO_VARIANTES}{huella}_{variante}_{ancho}.{formato}'
+                if not storage.exists(ruta):
+                    buffer = io.BytesIO()
+                    reducida.save(buffer, formato_pil, **opciones)
+                    storage.save(ruta, ContentFile(buffer.getvalue()))
+                resultado[variante].append({'ancho': ancho, 'formato': formato, 'ruta': ruta})
+    return resultado
+
+
+def actualizar_variantes(plato):
+    """Regenera y guarda las variantes del plato; si la imagen no se puede leer se sirve la original"""
+    variantes = {}
+    if plato.imagen:
+        try:
+            variantes = generar_variantes(plato.imagen.name)
+        except Exception:
+            variantes = {}  # archivo dañado o formato no soportado: se sigue usando el original
+    plato.imagen_variantes = variantes
+    plato.save(update_fields=['imagen_variantes'])
+    return variantes
@@ -0,0 +1,345 @@
+"""Importación y exportación del menú (categorías, platos, ingredientes y recetas) en CSV o Excel.
+
+Cada fila describe una línea de receta: los datos del plato se repiten (o se
+dejan vacíos) en las filas siguientes del mismo plato. Si un plato trae
+ingredientes, su receta queda exactamente como en el archivo; si no trae
+ninguno, solo se actualizan sus datos. Una fila sin plato solo asegura que
+exista la categoría o el ingrediente que nombra.
+"""
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from .models import Categoria, Ingrediente, Plato, PlatoIngrediente
+
+
+COLUMNAS = [
+    'categoria', 'plato', 'descripcion', 'precio', 'disponible', 'tiempo_preparacion',
+    'ingrediente', 'unidad_medida', 'cantidad',
+]
+CAMPOS_PLATO = ['descripcion', 'precio', 'disponible', 'tiempo_preparacion']
+VERDADEROS = {'1', 'si', 'sí', 'true', 'x', 'verdadero'}
+FALSOS = {'0', 'no', 'false', 'falso'}
+TAMANO_LOTE = 1000
+MAXIMO_DECIMAL = Decimal('1e8')  # max_digits=10 con 2 decimales: hasta 8 dígitos enteros
+MAXIMO_ENTERO = 2147483647
+
+
+class ErrorArchivo(Exception):
+    """El archivo no se puede leer o no tiene las columnas esperadas"""
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def leer_filas(archivo, formato='csv'):
+    """Lista de diccionarios {columna: texto} de un CSV (coma o punto y coma) o un XLSX"""
+    if formato == 'excel':
+        from openpyxl import load_workbook  # openpyxl solo se carga al importar un Excel
+        try:
+            libro = load_workbook(archivo, read_only=True, data_only=True)
+        except Exception as e:
+            raise ErrorArchivo(f'No se pudo leer el Excel: {e}')
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+    else:
+        try:
+            contenido = archivo.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ErrorArchivo('El CSV debe estar codificado en UTF-8')
+        try:
+            dialecto = csv.Sniffer().sniff(contenido[:4096], delimiters=',;')
+        except csv.Error:
+            dialecto = csv.excel
+        filas = csv.reader(io.StringIO(contenido), dialecto)
+
+    encabezado = [_texto(columna).lower() for columna in next(filas, [])]
+    faltantes = [columna for columna in COLUMNAS if columna not in encabezado]
+    if faltantes:
+        raise ErrorArchivo(f'Faltan columnas: {", ".join(faltantes)}')
+    posiciones = {columna: encabezado.index(columna) for columna in COLUMNAS}
+    resultado = []
+    for fila in filas:
+        fila = list(fila)
+        if not any(_texto(valor) for valor in fila):
+            continue
+        fila += [None] * (len(encabezado) - len(fila))
+        resultado.append({columna: _texto(fila[posicion]) for columna, posicion in posiciones.items()})
+    return resultado
+
+
+def _decimal(valor, minimo):
+    """Número con hasta 2 decimales que cabe en DecimalField(max_digits=10), o None"""
+    try:
+        numero = Decimal(valor.replace(',', '.'))
+    except InvalidOperation:
+        return None
+    if not numero.is_finite() or numero < minimo or numero.as_tuple().exponent < -2 or numero >= MAXIMO_DECIMAL:
+        return None
+    return numero
+
+
+def _entero(valor):
+    """Entero positivo que cabe en IntegerField, o None"""
+    if not valor.isdigit() or not 0 < int(valor) <= MAXIMO_ENTERO:
+        return None
+    return int(valor)
+
+
+def _booleano(valor):
+    valor = valor.lower()
+    if valor in VERDADEROS:
+        return True
+    if valor in FALSOS:
+        return False
+    return None
+
+
+class ImportacionMenu:
+    """Valida las filas contra la base de datos y calcula los cambios sin escribir nada.
+
+    Lee el catálogo existente con un número fijo de consultas. `errores` lista
+    (fila, mensaje) con la fila del archivo (el encabezado es la 1); `aplicar`
+    solo se permite si no hay errores y escribe todo en una transacción.
+    """
+
+    def __init__(self, filas):
+        self.errores = []
+        self.categorias_nuevas = {}
+        self.ingredientes_nuevos = {}
+        self.ingredientes_actualizados = []
+        self.platos_nuevos = {}
+        self.platos_actualizados = []
+        self.lineas_nuevas = []
+        self.lineas_actualizadas = []
+        self.lineas_eliminadas = []
+        self._validar(filas)
+
+    def _error(self, numero, mensaje):
+        self.errores.append((numero, mensaje))
+
+    def _validar(self, filas):
+        categorias = {categoria.nombre: categoria for categoria in Categoria.objects.all()}
+        ingredientes = {ingrediente.nombre: ingrediente for ingrediente in Ingrediente.objects.all()}
+        unidades = {}
+        platos = {}  # (categoria, plato) -> {'numero', datos del plato, 'recetas': {ingrediente: cantidad}}
+
+        for numero, fila in enumerate(filas, start=2):
+            nombre_categoria, nombre_plato, nombre_ingrediente = fila['categoria'], fila['plato'], fila['ingrediente']
+            if nombre_plato and not nombre_categoria:
+                self._error(numero, 'El plato necesita una categoría')
+                continue
+            if not (nombre_categoria or nombre_ingrediente):
+                self._error(numero, 'La fila no tiene categoría, plato ni ingrediente')
+                continue
+            if len(nombre_categoria) > 100 or len(nombre_plato) > 200 or len(nombre_ingrediente) > 100:
+                self._error(numero, 'Nombre demasiado largo')
+                continue
+            if len(fila['unidad_medida']) > 50:
+                self._error(numero, 'Unidad de medida demasiado larga')
+                continue
+            if nombre_categoria and nombre_categoria not in categorias:
+                categorias[nombre_categoria] = self.categorias_nuevas[nombre_categoria] = Categoria(nombre=nombre_categoria)
+
+            if nombre_ingrediente:
+                unidad = fila['unidad_medida']
+                anterior = unidades.setdefault(nombre_ingrediente, unidad)
+                if unidad and anterior and unidad != anterior:
+                    self._error(numero, f'Unidad de medida distinta para {nombre_ingrediente}')
+                    continue
+                unidades[nombre_ingrediente] = anterior or unidad
+
+            if not nombre_plato:
+                continue
+            clave = (nombre_categoria, nombre_plato)
+            plato = platos.setdefault(clave, {'numero': numero, 'recetas': {}})
+            for campo in CAMPOS_PLATO:
+                if fila[campo]:
+                    if plato.setdefault(campo, fila[campo]) != fila[campo]:
+                        self._error(numero, f'Valor de {campo} distinto al de la fila {plato["numero"]}')
+            if nombre_ingrediente:
+                cantidad = _decimal(fila['cantidad'], Decimal('0.01'))
+                if cantidad is None:
+                    self._error(numero, 'La cantidad del ingrediente debe ser un número mayor a 0, de hasta 8 cifras enteras y 2 decimales')
+                elif nombre_ingrediente in plato['recetas']:
+                    self._error(numero, f'{nombre_ingrediente} está repetido en {nombre_plato}')
+                else:
+                    plato['recetas'][nombre_ingrediente] = cantidad
+
+        for nombre, unidad in unidades.items():
+            ingrediente = ingredientes.get(nombre)
+            if ingrediente is None:
+                ingredientes[nombre] = self.ingredientes_nuevos[nombre] = Ingrediente(
+                    nombre=nombre, unidad_medida=unidad or 'unidad'
+                )
+            elif unidad and ingrediente.unidad_medida != unidad:
+                ingrediente.unidad_medida = unidad
+                self.ingredientes_actualizados.append(ingrediente)
+
+        self._validar_platos(platos, categorias, ingredientes)
+
+    def _validar_platos(self, platos, categorias, ingredientes):
+        existentes = {}
+        del_archivo = Plato.objects.filter(categoria__nombre__in={categoria for categoria, _ in platos})
+        duplicados = {
+            (fila['categoria__nombre'], fila['nombre'])
+            for fila in del_archivo.values('categoria__nombre', 'nombre').annotate(n=Count('id')).filter(n__gt=1)
+        }
+        for plato in del_archivo.select_related('categoria'):
+            existentes[(plato.categoria.nombre, plato.nombre)] = plato
+        recetas = {}
+        for linea in PlatoIngrediente.objects.filter(plato__in=[p.pk for p in existentes.values()]).select_related('ingrediente'):
+            recetas.setdefault(linea.plato_id, {})[linea.ingrediente.nombre] = linea
+        ahora = timezone.now()
+
+        for clave, datos in platos.items():
+            numero = datos['numero']
+            if clave in duplicados:
+                self._error(numero, f'Hay más de un plato "{clave[1]}" en {clave[0]}; corrígelo antes de importar')
+                continue
+            valores = {}
+            if datos.get('precio'):
+                valores['precio'] = _decimal(datos['precio'], Decimal('0.01'))
+                if valores['precio'] is None:
+                    self._error(numero, 'El precio debe ser un número mayor a 0, de hasta 8 cifras enteras y 2 decimales')
+            if datos.get('disponible'):
+                valores['disponible'] = _booleano(datos['disponible'])
+                if valores['disponible'] is None:
+                    self._error(numero, 'Disponible debe ser sí o no')
+            if datos.get('tiempo_preparacion'):
+                valores['tiempo_preparacion'] = _entero(datos['tiempo_preparacion'])
+                if valores['tiempo_preparacion'] is None:
+                    self._error(numero, 'El tiempo de preparación debe ser un número entero de minutos')
+            if datos.get('descripcion'):
+                valores['descripcion'] = datos['descripcion']
+            if None in valores.values():
+                continue
+
+            plato = existentes.get(clave)
+            if plato is None:
+                if 'precio' not in valores:
+                    self._error(numero, f'El plato nuevo {clave[1]} necesita precio')
+                    continue
+                plato = self.platos_nuevos[clave] = Plato(
+                    nombre=clave[1], categoria=categorias[clave[0]], **{'descripcion': '', **valores}
+                )
+                actuales = {}
+            else:
+                cambiados = [campo for campo, valor in valores.items() if getattr(plato, campo) != valor]
+                if cambiados:
+                    for campo in cambiados:
+                        setattr(plato, campo, valores[campo])
+                    plato.fecha_actualizacion = ahora  # bulk_update no aplica auto_now
+                    self.platos_actualizados.append(plato)
+                actuales = recetas.get(plato.pk, {})
+
+            for nombre, cantidad in datos['recetas'].items():
+                linea = actuales.get(nombre)
+                if linea is None:
+                    self.lineas_nuevas.append(PlatoIngrediente(plato=plato, ingrediente=ingredientes[nombre], cantidad=cantidad))
+                elif linea.cantidad != cantidad:
+                    linea.cantidad = cantidad
+                    self.lineas_actualizadas.append(linea)
+            # Sin ingredientes en el archivo la receta guardada no se toca
+            if datos['recetas']:
+                self.lineas_eliminadas.extend(
+                    linea for nombre, linea in actuales.items() if nombre not in datos['recetas']
+                )
+
+    def resumen(self):
+        """Conteo de cambios por tipo, para mostrar la simulación"""
+        return {
+            'Categorías nuevas': len(self.categorias_nuevas),
+            'Ingredientes nuevos': len(self.ingredientes_nuevos),
+            'Ingredientes modificados': len(self.ingredientes_actualizados),
+            'Platos nuevos': len(self.platos_nuevos),
+            'Platos modificados': len(self.platos_actualizados),
+            'Líneas de receta nuevas': len(self.lineas_nuevas),
+            'Líneas de receta modificadas': len(self.lineas_actualizadas),
+            'Líneas de receta eliminadas': len(self.lineas_eliminadas),
+        }
+
+    def hay_cambios(self):
+        return any(self.resumen().values())
+
+    def aplicar(self):
+        """Escribe todos los cambios en una transacción con operaciones en bloque"""
+        from inventario.disponibilidad import marcar_disponibilidad
+        from inventario.models import StockInventario
+        from .busqueda import motor_busqueda
+        from .fragmentos import invalidar_menu_al_confirmar
+
+        if self.errores:
+            raise ValueError('La importación tiene errores')
+        with transaction.atomic():
+            Categoria.objects.bulk_create(self.categorias_nuevas.values(), batch_size=TAMANO_LOTE)
+            Ingrediente.objects.bulk_create(self.ingredientes_nuevos.values(), batch_size=TAMANO_LOTE)
+            Ingrediente.objects.bulk_update(self.ingredientes_actualizados, ['unidad_medida'], batch_size=TAMANO_LOTE)
+            # Stock inicial de los ingredientes nuevos, como al crearlos desde el formulario
+            StockInventario.objects.bulk_create(
+                [StockInventario(ingrediente=ingrediente) for ingrediente in self.ingredientes_nuevos.values()],
+                batch_size=TAMANO_LOTE, ignore_conflicts=True,
+            )
+            Plato.objects.bulk_create(self.platos_nuevos.values(), batch_size=TAMANO_LOTE)
+            Plato.objects.bulk_update(
+                self.platos_actualizados, CAMPOS_PLATO + ['fecha_actualizacion'], batch_size=TAMANO_LOTE
+            )
+            PlatoIngrediente.objects.filter(pk__in=[linea.pk for linea in self.lineas_eliminadas]).delete()
+            PlatoIngrediente.objects.bulk_create(self.lineas_nuevas, batch_size=TAMANO_LOTE)
+            PlatoIngrediente.objects.bulk_update(self.lineas_actualizadas, ['cantidad'], batch_size=TAMANO_LOTE)
+
+            # Las operaciones en bloque no disparan señales: índices y caché a mano
+            if self.platos_nuevos or self.platos_actualizados:
+                motor_busqueda().actualizar([*self.platos_nuevos.values(), *self.platos_actualizados])
+            marcar_disponibilidad(plato_ids={
+                linea.plato_id for linea in [*self.lineas_nuevas, *self.lineas_actualizadas, *self.lineas_eliminadas]
+            })
+            invalidar_menu_al_confirmar()
+        return self.resumen()
+
+
+def filas_menu():
+    """Filas del menú completo en el formato de importación (tres consultas en total)"""
+    recetas = {}
+    for plato_id, ingrediente, unidad, cantidad in PlatoIngrediente.objects.order_by(
+        'plato_id', 'ingrediente__nombre'
+    ).values_list('plato_id', 'ingrediente__nombre', 'ingrediente__unidad_medida', 'cantidad'):
+        recetas.setdefault(plato_id, []).append((ingrediente, unidad, cantidad))
+    usados = {ingrediente for lineas in recetas.values() for ingrediente, _, _ in lineas}
+
+    con_platos = set()
+    platos = Plato.objects.order_by('categoria__nombre', 'nombre', 'id').values_list(
+        'id', 'categoria__nombre', 'nombre', 'descripcion', 'precio', 'disponible', 'tiempo_preparacion'
+    )
+    for plato_id, categoria, nombre, descripcion, precio, disponible, tiempo in platos:
+        con_platos.add(categoria)
+        datos = [categoria, nombre, descripcion, precio, 'sí' if disponible else 'no', tiempo]
+        for ingrediente, unidad, cantidad in recetas.get(plato_id) or [('', '', '')]:
+            yield datos + [ingrediente, unidad, cantidad]
+    for categoria in Categoria.objects.exclude(nombre__in=con_platos).values_list('nombre', flat=True):
+        yield [categoria, '', '', '', '', '', '', '', '']
+    for ingrediente, unidad in Ingrediente.objects.exclude(nombre__in=usados).values_list('nombre', 'unidad_medida'):
+        yield ['', '', '', '', '', '', ingrediente, unidad, '']
+
+
+def escribir_menu_csv(archivo):
+    escritor = csv.writer(archivo)
+    escritor.writerow(COLUMNAS)
+    escritor.writerows(filas_menu())
+
+
+def escribir_menu_excel(archivo):
+    from openpyxl import Workbook  # openpyxl solo se carga al exportar un Excel
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Menú')
+    hoja.append(COLUMNAS)
+    for fila in filas_menu():
+        hoja.append(fila)
+    libro.save(archivo)
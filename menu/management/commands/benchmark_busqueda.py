@@ -0,0 +1,69 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from menu.busqueda import BusquedaSimple, motor_busqueda
+from menu.models import Categoria, Plato
+
+
+PALABRAS = [
+    'arroz', 'pollo', 'plátano', 'maduro', 'frijoles', 'chicharrón', 'aguacate', 'limón',
+    'carne', 'asada', 'sopa', 'ajiaco', 'papas', 'criollas', 'mazorca', 'queso', 'costeño',
+    'arepa', 'huevo', 'pescado', 'frito', 'patacón', 'ensalada', 'tomate', 'cebolla',
+    'cilantro', 'camarones', 'coco', 'postre', 'tres', 'leches', 'fresas', 'crema', 'jugo',
+]
+SILABAS = ['ba', 'ca', 'da', 'fe', 'go', 'la', 'ma', 'ne', 'pi', 'ro', 'sa', 'te', 'vi', 'zo', 'chu', 'lla']
+CONSULTAS = ['platano', 'pollo asado', 'camarón', 'Ajiaco', 'papas criollas', 'limones', 'queso costeño', 'sancocho']
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de la búsqueda de platos (índice vs icontains) con un catálogo sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--platos', type=int, default=50000, help='Platos en el catálogo sintético')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Repeticiones por consulta')
+
+    def _medir(self, motor, queryset, repeticiones):
+        tiempos = []
+        for texto in CONSULTAS:
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                # Lo que hace el listado paginado: contar y leer la primera página
+                resultado = motor.filtrar(queryset, texto)
+                resultado.count()
+                list(resultado.values_list('id', flat=True)[:24])
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        tiempos.sort()
+        return tiempos[len(tiempos) // 2], tiempos[int(len(tiempos) * 0.95)]
+
+    def handle(self, *args, **options):
+        n, repeticiones = options['platos'], options['repeticiones']
+        azar = random.Random(0)
+        # Relleno con palabras inventadas para que cada término sea tan selectivo como en una carta real
+        relleno = [''.join(azar.choices(SILABAS, k=3)) for _ in range(3000)]
+        motor = motor_busqueda()
+        # Todo se hace en una transacción que se revierte al final
+        with transaction.atomic():
+            categoria = Categoria.objects.create(nombre='Benchmark búsqueda')
+            Plato.objects.bulk_create([
+                Plato(
+                    nombre=' '.join(azar.sample(PALABRAS, 3)).capitalize(),
+                    descripcion=' '.join(azar.choices(PALABRAS, k=3) + azar.choices(relleno, k=12)),
+                    categoria=categoria,
+                    precio=Decimal('10.00'),
+                )
+                for _ in range(n)
+            ], batch_size=2000)
+            inicio = time.perf_counter()
+            motor.reconstruir(Plato.objects.all())
+            indexado = time.perf_counter() - inicio
+
+            platos = Plato.objects.filter(disponible=True)
+            indice = self._medir(motor, platos, repeticiones)
+            simple = self._medir(BusquedaSimple(motor.connection), platos, repeticiones)
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{n} platos, motor {type(motor).__name__}; indexado en {indexado:.2f} s')
+        self.stdout.write(f'Índice:    p50 {indice[0]:.2f} ms, p95 {indice[1]:.2f} ms')
+        self.stdout.write(f'icontains: p50 {simple[0]:.2f} ms, p95 {simple[1]:.2f} ms')
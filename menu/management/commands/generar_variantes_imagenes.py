@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connections
+from menu.fragmentos import invalidar_menu
+from menu.imagenes import generar_variantes
+from menu.models import Plato
+
+
+def _procesar(datos):
+    """Se ejecuta en el proceso hijo: solo lee y escribe archivos, no toca la base de datos"""
+    plato_id, nombre = datos
+    try:
+        return plato_id, generar_variantes(nombre), None
+    except Exception as e:
+        return plato_id, {}, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Genera las variantes WebP/JPEG de las imágenes de platos existentes en paralelo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todas', action='store_true', help='Regenera también las que ya tienen variantes')
+        parser.add_argument('--workers', type=int, default=0, help='Procesos en paralelo (por defecto: núcleos)')
+
+    def _guardar(self, resultados):
+        generadas = fallidas = 0
+        for plato_id, variantes, error in resultados:
+            if error:
+                fallidas += 1
+                self.stderr.write(f'Plato {plato_id}: {error}')
+                continue
+            # update() no dispara señales: el menú se invalida una vez al final
+            Plato.objects.filter(pk=plato_id).update(imagen_variantes=variantes)
+            generadas += 1
+        return generadas, fallidas
+
+    def handle(self, *args, **options):
+        platos = Plato.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todas']:
+            platos = platos.filter(imagen_variantes={})
+        pendientes = list(platos.values_list('id', 'imagen'))
+        if not pendientes:
+            self.stdout.write('No hay imágenes pendientes')
+            return
+
+        workers = min(options['workers'] or os.cpu_count() or 1, len(pendientes))
+        if workers < 2:
+            generadas, fallidas = self._guardar(map(_procesar, pendientes))
+        else:
+            # Las conexiones abiertas no deben heredarse en los procesos hijos
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as ejecutor:
+                generadas, fallidas = self._guardar(ejecutor.map(_procesar, pendientes, chunksize=4))
+        invalidar_menu()
+        self.stdout.write(self.style.SUCCESS(
+            f'Variantes generadas para {generadas} platos ({fallidas} con error, {workers} procesos)'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from menu.importacion import ErrorArchivo, ImportacionMenu, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importa platos, recetas, categorías e ingredientes desde un CSV o Excel (simula si no se pasa --aplicar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--aplicar', action='store_true', help='Guarda los cambios; sin esta opción solo los muestra')
+
+    def handle(self, *args, **options):
+        formato = 'excel' if options['archivo'].lower().endswith('.xlsx') else 'csv'
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                importacion = ImportacionMenu(leer_filas(archivo, formato))
+        except (OSError, ErrorArchivo) as e:
+            raise CommandError(str(e))
+
+        for fila, mensaje in importacion.errores:
+            self.stderr.write(f'Fila {fila}: {mensaje}')
+        for tipo, cantidad in importacion.resumen().items():
+            self.stdout.write(f'{tipo}: {cantidad}')
+        if importacion.errores:
+            raise CommandError(f'{len(importacion.errores)} errores; no se importó nada')
+        if options['aplicar']:
+            importacion.aplicar()
+            self.stdout.write(self.style.SUCCESS('Menú importado'))
+        else:
+            self.stdout.write('Simulación: usa --aplicar para guardar los cambios')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from menu.busqueda import motor_busqueda
+from menu.models import Plato
+
+
+class Command(BaseCommand):
+    help = 'Regenera desde cero el índice de búsqueda de platos'
+
+    def handle(self, *args, **options):
+        motor = motor_busqueda()
+        with transaction.atomic():
+            motor.crear()
+            total = motor.reconstruir(Plato.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Índice de búsqueda reconstruido ({type(motor).__name__}): {total} platos'
+        ))
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from menu.busqueda import motor_busqueda
+    alias = schema_editor.connection.alias
+    motor = motor_busqueda(alias)
+    motor.crear()
+    motor.reconstruir(apps.get_model('menu', 'Plato').objects.using(alias))
+
+
+def borrar_indice(apps, schema_editor):
+    from menu.busqueda import motor_busqueda
+    motor_busqueda(schema_editor.connection.alias).borrar()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_busqueda_platos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plato',
+            name='imagen_variantes',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
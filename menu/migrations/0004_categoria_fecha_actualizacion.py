@@ -0,0 +1,18 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_variantes_imagen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categoria',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:28
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_categoria_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingrediente',
+            index=models.Index(django.db.models.functions.text.Upper('nombre'), name='ingrediente_nombre_mayus_idx'),
+        ),
+    ]
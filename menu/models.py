@@ -1,5 +1,7 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Upper
+from django.urls import reverse
 from decimal import Decimal
 
 
@@ -9,6 +11,7 @@ class Categoria(models.Model):
     descripcion = models.TextField(blank=True, null=True)
     activa = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Categoría'
@@ -31,6 +34,10 @@ class Ingrediente(models.Model):
         verbose_name = 'Ingrediente'
         verbose_name_plural = 'Ingredientes'
         ordering = ['nombre']
+        indexes = [
+            # Búsqueda por prefijo sin distinguir mayúsculas (autocompletado de recetas)
+            models.Index(Upper('nombre'), name='ingrediente_nombre_mayus_idx'),
+        ]
     
     def __str__(self):
         return self.nombre
@@ -47,6 +54,8 @@ class Plato(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))]
     )
     imagen = models.ImageField(upload_to='platos/', blank=True, null=True)
+    # Versiones reducidas WebP/JPEG de la imagen (menu/imagenes.py)
+    imagen_variantes = models.JSONField(default=dict, blank=True, editable=False)
     disponible = models.BooleanField(default=True)
     tiempo_preparacion = models.IntegerField(default=30, help_text="Tiempo en minutos")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -60,6 +69,20 @@ class Plato(models.Model):
     def __str__(self):
         return f"{self.nombre} - ${self.precio}"
 
+    @property
+    def imagenes(self):
+        """srcset por variante y formato: {'tarjeta': {'webp': ..., 'jpeg': ..., 'src': ...}}"""
+        imagenes = {}
+        for variante, archivos in (self.imagen_variantes or {}).items():
+            srcset = {}
+            for archivo in archivos:
+                url = reverse('menu:imagen_variante', args=[archivo['ruta']])
+                srcset.setdefault(archivo['formato'], []).append(f"{url} {archivo['ancho']}w")
+                if archivo['formato'] == 'jpeg' and 'src' not in srcset:
+                    srcset['src'] = url
+            imagenes[variante] = {formato: valor if formato == 'src' else ', '.join(valor) for formato, valor in srcset.items()}
+        return imagenes
+
 
 
 
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .busqueda import motor_busqueda
+from .fragmentos import invalidar_menu_al_confirmar
+from .models import Categoria, Plato, PlatoIngrediente
+
+
+# El índice de búsqueda se actualiza en la misma transacción que el plato.
+# Las actualizaciones en bloque (QuerySet.update, bulk_create) no disparan
+# señales: después de ellas hay que correr `reconstruir_busqueda`.
+
+@receiver(post_save, sender=Plato)
+def plato_guardado(sender, instance, using, **kwargs):
+    motor_busqueda(using).indexar(instance.pk, instance.nombre, instance.descripcion)
+
+
+@receiver(post_delete, sender=Plato)
+def plato_eliminado(sender, instance, using, **kwargs):
+    motor_busqueda(using).eliminar(instance.pk)
+
+
+@receiver(post_save, sender=Plato)
+@receiver(post_delete, sender=Plato)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=PlatoIngrediente)
+@receiver(post_delete, sender=PlatoIngrediente)
+def menu_cambiado(sender, **kwargs):
+    invalidar_menu_al_confirmar()
@@ -1,3 +1,405 @@
-from django.test import TestCase
+import io
+import re
+import tempfile
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .busqueda import buscar_platos, motor_busqueda, terminos
+from .forms import PlatoForm, PlatoIngredienteFormSet
+from .importacion import COLUMNAS, ImportacionMenu, escribir_menu_csv, escribir_menu_excel, leer_filas
+from inventario.models import StockInventario
+from usuarios.models import Usuario
+from .models import Categoria, Ingrediente, Plato, PlatoIngrediente
 
-# Create your tests here.
+
+class BusquedaPlatosTests(TestCase):
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre='Principales')
+
+    def _plato(self, nombre, descripcion='-', **kwargs):
+        return Plato.objects.create(nombre=nombre, descripcion=descripcion, categoria=self.categoria, precio=10, **kwargs)
+
+    def test_terminos_sin_tildes_ni_plurales(self):
+        self.assertEqual(terminos('Plátanos'), terminos('platano'))
+        self.assertEqual(terminos('Limones con sal'), ['limon', 'sal'])
+
+    def test_busqueda_insensible_a_tildes_y_rankeada(self):
+        en_descripcion = self._plato('Bandeja paisa', 'Frijoles, arroz y plátano maduro')
+        en_nombre = self._plato('Plátanos maduros')
+        self._plato('Ajiaco')
+
+        response = self.client.get(reverse('menu:index'), {'busqueda': 'platano'})
+        self.assertEqual(list(response.context['pagina']), [en_nombre, en_descripcion])
+
+    def test_indice_sigue_cambios_del_plato(self):
+        plato = self._plato('Sopa de tomate')
+        platos = Plato.objects.all()
+        self.assertEqual(list(buscar_platos(platos, 'tomate')), [plato])
+
+        plato.nombre = 'Crema de ahuyama'
+        plato.save()
+        self.assertEqual(list(buscar_platos(platos, 'tomate')), [])
+        self.assertEqual(list(buscar_platos(platos, 'ahuyama')), [plato])
+
+        plato.delete()
+        self.assertEqual(list(buscar_platos(platos, 'ahuyama')), [])
+
+    def test_respeta_filtros_del_queryset(self):
+        self._plato('Arepa de queso', disponible=False)
+        disponible = self._plato('Arepa de huevo')
+        self.assertEqual(list(buscar_platos(Plato.objects.filter(disponible=True), 'arepas')), [disponible])
+
+    def test_filtro_de_categoria_no_se_pierde_detras_de_muchas_coincidencias(self):
+        Plato.objects.bulk_create([
+            Plato(nombre=f'Arroz {i}', descripcion='-', categoria=self.categoria, precio=10) for i in range(600)
+        ])
+        call_command('reconstruir_busqueda', stdout=io.StringIO())
+        otra = Categoria.objects.create(nombre='Otra')
+        aparte = Plato.objects.create(nombre='Arroz con coco', descripcion='-', categoria=otra, precio=10)
+
+        self.assertEqual(list(buscar_platos(Plato.objects.filter(categoria=otra), 'arroz')), [aparte])
+        # Sin recorte: el listado y la paginación ven todas las coincidencias
+        self.assertEqual(buscar_platos(Plato.objects.all(), 'arroz').count(), 601)
+
+    def test_busqueda_en_una_sola_consulta(self):
+        self._plato('Arroz con pollo')
+        primero = self._plato('Arroz')
+        resultado = buscar_platos(Plato.objects.all(), 'arroz')
+        with self.assertNumQueries(1):
+            self.assertEqual(list(resultado)[0], primero)
+        self.assertFalse(resultado.query.extra_tables)
+
+
+class MenuCacheadoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.entradas = Categoria.objects.create(nombre='Entradas')
+        self.postres = Categoria.objects.create(nombre='Postres')
+        for i in range(3):
+            Plato.objects.create(nombre=f'Empanada {i}', descripcion='-', categoria=self.entradas, precio=5)
+        Plato.objects.create(nombre='Flan', descripcion='-', categoria=self.postres, precio=4)
+
+    def test_segunda_visita_no_consulta_la_base(self):
+        self.client.get(reverse('menu:index'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('menu:index'))
+        self.assertContains(response, 'Empanada 2')
+        self.assertContains(response, 'Entradas', count=4)  # botón + 3 tarjetas, sin N+1
+
+    def test_token_csrf_del_visitante(self):
+        self.client.get(reverse('menu:index'))  # otro visitante llena la caché
+        visitante = Client(enforce_csrf_checks=True)
+        response = visitante.get(reverse('menu:index'))
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        plato = Plato.objects.get(nombre='Flan')
+        response = visitante.post(reverse('menu:agregar_carrito', args=[plato.id]), {'csrfmiddlewaretoken': token, 'cantidad': 1})
+        self.assertRedirects(response, reverse('pedidos:carrito'), fetch_redirect_response=False)
+
+    def test_cambios_invalidan_el_listado(self):
+        url = reverse('menu:index')
+        self.assertContains(self.client.get(url, {'categoria': self.postres.id}), 'Flan')
+        with self.captureOnCommitCallbacks(execute=True):
+            Plato.objects.filter(nombre='Flan').get().delete()
+            Plato.objects.create(nombre='Natilla', descripcion='-', categoria=self.postres, precio=4)
+        response = self.client.get(url, {'categoria': self.postres.id})
+        self.assertNotContains(response, 'Flan')
+        self.assertContains(response, 'Natilla')
+
+    def test_listado_por_rol_y_paginado(self):
+        with self.settings(MENU_POR_PAGINA=2):
+            response = self.client.get(reverse('menu:index'), {'categoria': self.entradas.id, 'pagina': 2})
+        self.assertContains(response, 'Empanada 2')
+        self.assertNotContains(response, 'Empanada 0')
+        self.assertContains(response, 'Agregar')
+
+        mesero = Usuario.objects.create_user(username='mesero', password='x', rol='mesero')
+        self.client.force_login(mesero)
+        response = self.client.get(reverse('menu:index'))
+        self.assertNotContains(response, 'Agregar')
+
+    def test_parametros_fuera_de_rango_no_crean_claves(self):
+        url = reverse('menu:index')
+        self.client.get(url, {'categoria': self.postres.id})
+        # Página mayor que la última: la misma entrada de la caché
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {'categoria': self.postres.id, 'pagina': 987654})
+        self.assertContains(response, 'Flan')
+
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as consultas:
+                self.client.get(url, {'categoria': 987654})
+            self.assertTrue(consultas.captured_queries)  # categoría inexistente: sin caché
+
+
+def _foto(ancho=2000, alto=1500, nombre='foto.jpg'):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 120, 40)).save(buffer, 'JPEG')
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/jpeg')
+
+
+class VariantesImagenTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        ajuste = override_settings(MEDIA_ROOT=self.media.name)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre='Principales')
+
+    def test_formulario_genera_variantes_y_srcset(self):
+        form = PlatoForm(
+            {'nombre': 'Bandeja', 'descripcion': '-', 'categoria': self.categoria.id, 'precio': '10',
+             'disponible': 'on', 'tiempo_preparacion': 20},
+            {'imagen': _foto()},
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        plato = form.save()
+
+        archivos = plato.imagen_variantes['tarjeta'] + plato.imagen_variantes['detalle']
+        self.assertEqual(sorted((a['ancho'], a['formato']) for a in plato.imagen_variantes['tarjeta']),
+                         [(400, 'jpeg'), (400, 'webp'), (800, 'jpeg'), (800, 'webp')])
+        for archivo in archivos:
+            self.assertTrue(default_storage.exists(archivo['ruta']))
+
+        response = self.client.get(reverse('menu:index'))
+        self.assertContains(response, 'type="image/webp"')
+        grande = next(a['ruta'] for a in archivos if (a['ancho'], a['formato']) == (800, 'webp'))
+        self.assertContains(response, f'{reverse("menu:imagen_variante", args=[grande])} 800w')
+
+        response = self.client.get(reverse('menu:imagen_variante', args=[archivos[0]['ruta']]))
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(self.client.get(reverse('menu:imagen_variante', args=[plato.imagen.name])).status_code, 404)
+
+    def test_imagen_chica_no_se_agranda_y_backfill(self):
+        plato = Plato.objects.create(
+            nombre='Jugo', descripcion='-', categoria=self.categoria, precio=3,
+            imagen=default_storage.save('platos/jugo.jpg', _foto(600, 400)),
+        )
+        self.assertEqual(plato.imagen_variantes, {})
+        call_command('generar_variantes_imagenes', workers=1, stdout=io.StringIO())
+        plato.refresh_from_db()
+        self.assertEqual({a['ancho'] for a in plato.imagen_variantes['tarjeta']}, {400})
+        self.assertEqual({a['ancho'] for a in plato.imagen_variantes['detalle']}, {600})
+
+
+class ApiMenuTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.categoria = Categoria.objects.create(nombre='Principales')
+        self.plato = Plato.objects.create(nombre='Sancocho', descripcion='-', categoria=self.categoria, precio='18.50', tiempo_preparacion=40)
+        Plato.objects.create(nombre='Agotado', descripcion='-', categoria=self.categoria, precio=5, disponible=False)
+
+    def test_menu_y_304_sin_consultas(self):
+        url = reverse('menu:api_menu')
+        with self.assertNumQueries(4):  # versión (2) + categorías + platos con su categoría
+            response = self.client.get(url)
+        datos = response.json()
+        self.assertEqual([p['nombre'] for p in datos['platos']], ['Sancocho'])
+        self.assertEqual(datos['platos'][0]['precio'], '18.50')
+        self.assertEqual(datos['platos'][0]['tiempo_preparacion'], 40)
+        self.assertEqual(datos['categorias'][0]['nombre'], 'Principales')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_cambia_con_el_catalogo(self):
+        url = reverse('menu:api_menu')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plato.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['platos'], [])
+
+
+class ImportacionMenuTests(TestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        self.client.force_login(self.admin)
+        self.categoria = Categoria.objects.create(nombre='Principales')
+        self.arroz = Ingrediente.objects.create(nombre='Arroz', unidad_medida='kg')
+        self.sancocho = Plato.objects.create(nombre='Sancocho', descripcion='-', categoria=self.categoria, precio=18)
+        PlatoIngrediente.objects.create(plato=self.sancocho, ingrediente=self.arroz, cantidad='0.20')
+
+    def _csv(self, *filas, nombre='menu.csv'):
+        contenido = io.StringIO()
+        contenido.write(';'.join(COLUMNAS) + '\n')
+        for fila in filas:
+            contenido.write(';'.join(fila) + '\n')
+        return SimpleUploadedFile(nombre, contenido.getvalue().encode(), content_type='text/csv')
+
+    def test_simula_y_luego_aplica_en_bloque(self):
+        archivo = lambda: self._csv(
+            ('Principales', 'Sancocho', '', '19,50', '', '', 'Yuca', 'kg', '0.30'),
+            ('Principales', 'Sancocho', '', '', '', '', 'Arroz', '', '0.25'),
+            ('Postres', 'Flan', 'De caramelo', '6', 'no', '10', 'Leche', 'litros', '0.2'),
+            ('Bebidas', '', '', '', '', '', '', '', ''),
+        )
+        response = self.client.post(reverse('menu:importar_menu'), {'archivo': archivo(), 'accion': 'simular'})
+        self.assertEqual(response.context['resumen']['Platos nuevos'], 1)
+        self.assertEqual(response.context['resumen']['Líneas de receta modificadas'], 1)
+        self.assertFalse(Plato.objects.filter(nombre='Flan').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('menu:importar_menu'), {'archivo': archivo(), 'accion': 'aplicar'})
+        self.assertRedirects(response, reverse('menu:lista_platos_admin'))
+        self.sancocho.refresh_from_db()
+        self.assertEqual(str(self.sancocho.precio), '19.50')
+        self.assertEqual(
+            dict(self.sancocho.ingredientes_plato.values_list('ingrediente__nombre', 'cantidad')),
+            {'Arroz': Decimal('0.25'), 'Yuca': Decimal('0.30')},
+        )
+        flan = Plato.objects.get(nombre='Flan')
+        self.assertEqual((flan.categoria.nombre, flan.disponible, flan.tiempo_preparacion), ('Postres', False, 10))
+        self.assertTrue(Categoria.objects.filter(nombre='Bebidas').exists())
+        # Los ingredientes nuevos quedan con stock, como al crearlos a mano
+        self.assertEqual(StockInventario.objects.filter(ingrediente__nombre__in=['Yuca', 'Leche']).count(), 2)
+        self.assertEqual(buscar_platos(Plato.objects.all(), 'flan').get(), flan)
+
+    def test_errores_por_fila_no_importan_nada(self):
+        response = self.client.post(reverse('menu:importar_menu'), {'accion': 'aplicar', 'archivo': self._csv(
+            ('Postres', 'Flan', '', '', '', '', 'Leche', 'litros', '0.2'),
+            ('Postres', 'Torta', '', '8', '', '', 'Harina', 'kg', 'mucho'),
+            ('Postres', 'Torta', '', '9', '', '', 'Huevo', '', '2'),
+            ('Postres', 'Flan', '', '', '', '', 'Azúcar', 'g' * 51, '20'),
+        )})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([fila for fila, _ in response.context['errores']], [3, 4, 5, 2])
+        self.assertFalse(Categoria.objects.filter(nombre='Postres').exists())
+        self.assertFalse(Ingrediente.objects.filter(nombre='Leche').exists())
+
+    def test_aplicar_solo_reindexa_los_platos_importados(self):
+        ajiaco = Plato.objects.create(nombre='Ajiaco', descripcion='-', categoria=self.categoria, precio=15)
+        # Si la importación reconstruyera todo el índice, el ajiaco volvería a aparecer
+        motor_busqueda().eliminar(ajiaco.id)
+        importacion = ImportacionMenu([dict(zip(COLUMNAS, ('Principales', 'Sancocho', 'Con mazorca', '', '', '', '', '', '')))])
+        with self.captureOnCommitCallbacks(execute=True):
+            importacion.aplicar()
+        self.assertEqual(buscar_platos(Plato.objects.all(), 'mazorca').get(), self.sancocho)
+        self.assertFalse(buscar_platos(Plato.objects.all(), 'ajiaco').exists())
+
+    def test_numeros_fuera_del_rango_de_las_columnas(self):
+        importacion = ImportacionMenu([dict(zip(COLUMNAS, fila)) for fila in [
+            ('Postres', 'Flan', '', '1000000000', '', '', '', '', ''),
+            ('Postres', 'Torta', '', '99999999.99', '', '2147483648', '', '', ''),
+            ('Postres', 'Tres leches', '', '8', '', '', 'Leche', 'litros', '123456789'),
+            ('Postres', 'Arroz con leche', '', '7', '', '2147483647', 'Leche', 'litros', '12345678.5'),
+        ]])
+        self.assertEqual([fila for fila, _ in importacion.errores], [4, 2, 3])
+        self.assertIn('precio', importacion.errores[1][1])
+        self.assertIn('tiempo de preparación', importacion.errores[2][1])
+        self.assertEqual(
+            importacion.platos_nuevos[('Postres', 'Arroz con leche')].tiempo_preparacion, 2147483647
+        )
+
+    def test_exportar_e_importar_no_cambia_nada(self):
+        Ingrediente.objects.create(nombre='Sal')
+        for formato, escribir in (('csv', escribir_menu_csv), ('excel', escribir_menu_excel)):
+            if formato == 'csv':
+                texto = io.StringIO()
+                escribir(texto)
+                archivo = io.BytesIO(texto.getvalue().encode())
+            else:
+                archivo = io.BytesIO()
+                escribir(archivo)
+                archivo.seek(0)
+            importacion = ImportacionMenu(leer_filas(archivo, formato))
+            self.assertEqual(importacion.errores, [])
+            self.assertFalse(importacion.hay_cambios(), importacion.resumen())
+
+        response = self.client.get(reverse('menu:exportar_menu'))
+        self.assertIn('Sancocho', response.content.decode())
+
+
+class EditorRecetasTests(TestCase):
+    def setUp(self):
+        self.client.force_login(Usuario.objects.create_user(username='admin', password='x', rol='administrador'))
+        self.categoria = Categoria.objects.create(nombre='Principales')
+        self.ingredientes = Ingrediente.objects.bulk_create(
+            [Ingrediente(nombre=f'Ingrediente {i:03}') for i in range(300)]
+        )
+
+    def _plato(self, lineas):
+        plato = Plato.objects.create(nombre=f'Plato {lineas}', descripcion='-', categoria=self.categoria, precio=10)
+        PlatoIngrediente.objects.bulk_create([
+            PlatoIngrediente(plato=plato, ingrediente=ingrediente, cantidad=1) for ingrediente in self.ingredientes[:lineas]
+        ])
+        return plato
+
+    def _datos(self, plato, lineas):
+        datos = {
+            'nombre': plato.nombre, 'descripcion': '-', 'categoria': self.categoria.id, 'precio': '10',
+            'tiempo_preparacion': 30, 'disponible': 'on',
+            'ingredientes_plato-TOTAL_FORMS': len(lineas), 'ingredientes_plato-INITIAL_FORMS': plato.ingredientes_plato.count(),
+            'ingredientes_plato-MIN_NUM_FORMS': 0, 'ingredientes_plato-MAX_NUM_FORMS': 1000,
+        }
+        for i, (linea_id, ingrediente_id) in enumerate(lineas):
+            datos.update({
+                f'ingredientes_plato-{i}-id': linea_id or '',
+                f'ingredientes_plato-{i}-ingrediente': ingrediente_id,
+                f'ingredientes_plato-{i}-cantidad': '2',
+            })
+        return datos
+
+    def test_filas_comparten_opciones_y_no_listan_todo_el_catalogo(self):
+        consultas = []
+        for lineas in (2, 15):
+            plato = self._plato(lineas)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse('menu:editar_plato', args=[plato.id]))
+            consultas.append(len(ctx.captured_queries))
+        self.assertEqual(consultas[0], consultas[1])
+        self.assertContains(response, 'Ingrediente 014')
+        self.assertNotContains(response, 'Ingrediente 299')
+
+    def test_formset_enviado_con_consultas_constantes(self):
+        consultas = []
+        for lineas in (2, 15):
+            plato = self._plato(lineas)
+            datos = self._datos(plato, [(linea.id, linea.ingrediente_id) for linea in plato.ingredientes_plato.order_by('id')])
+            with CaptureQueriesContext(connection) as ctx:
+                formset = PlatoIngredienteFormSet(datos, instance=plato, prefix='ingredientes_plato')
+                self.assertTrue(formset.is_valid())
+                [str(form['ingrediente']) for form in formset.forms]
+            consultas.append(len(ctx.captured_queries))
+        self.assertEqual(consultas[0], consultas[1])
+        # líneas de la receta e ingredientes referenciados
+        self.assertLessEqual(consultas[1], 2)
+
+    def test_guardar_ingrediente_elegido_con_el_buscador(self):
+        plato = self._plato(1)
+        linea = plato.ingredientes_plato.get()
+        nuevo, inactivo = self.ingredientes[200], self.ingredientes[201]
+        Ingrediente.objects.filter(pk=inactivo.pk).update(activo=False)
+
+        response = self.client.post(reverse('menu:editar_plato', args=[plato.id]), self._datos(
+            plato, [(linea.id, linea.ingrediente_id), (None, inactivo.id)]
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['formset'].forms[1].errors)
+
+        response = self.client.post(reverse('menu:editar_plato', args=[plato.id]), self._datos(
+            plato, [(linea.id, linea.ingrediente_id), (None, nuevo.id)]
+        ))
+        self.assertRedirects(response, reverse('menu:lista_platos_admin'))
+        self.assertEqual(set(plato.ingredientes_plato.values_list('ingrediente_id', flat=True)), {linea.ingrediente_id, nuevo.id})
+
+    def test_buscar_ingredientes_por_prefijo(self):
+        Ingrediente.objects.create(nombre='Arroz')
+        Ingrediente.objects.create(nombre='Arveja', activo=False)
+        url = reverse('menu:buscar_ingredientes')
+        nombres = lambda q: [r['nombre'] for r in self.client.get(url, {'q': q}).json()['resultados']]
+        self.assertEqual(nombres('ar'), ['Arroz'])
+        self.assertEqual(len(nombres('ingrediente 1')), 20)
+        self.assertEqual(nombres('ingrediente 10')[:2], ['Ingrediente 100', 'Ingrediente 101'])
+        self.assertEqual(nombres(''), [])
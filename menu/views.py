@@ -1,37 +1,77 @@
+import io
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.db.models import Q
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.db.models import Count
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
 from .models import Plato, Categoria, Ingrediente
-from .forms import PlatoForm, CategoriaForm, IngredienteForm, PlatoIngredienteFormSet
+from .busqueda import buscar_ingredientes, buscar_platos
+from .catalogo import menu_json, version_catalogo
+from .fragmentos import MARCADOR_CSRF, fragmento_menu, rol_visitante
+from .imagenes import DIRECTORIO_VARIANTES
+from .importacion import ErrorArchivo, ImportacionMenu, escribir_menu_csv, escribir_menu_excel, leer_filas
+from .forms import PlatoForm, CategoriaForm, IngredienteForm, ImportarMenuForm, PlatoIngredienteFormSet
 from .decorators import staff_or_mesero_required
-from pedidos.models import ItemPedido, Pedido
-from decimal import Decimal
+from pedidos.carrito import Carrito
+from inventario.disponibilidad import con_stock, porciones_disponibles
+
+
+def _entero_positivo(valor):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        return None
+    return numero if numero > 0 else None
 
 
 def index(request):
-    """Página principal con el menú de platos"""
-    categorias = Categoria.objects.filter(activa=True)
-    categoria_id = request.GET.get('categoria')
+    """Página principal con el menú de platos.
+
+    El listado (categorías, tarjetas y paginación) se guarda en caché por
+    categoría, página y rol; solo las búsquedas se renderizan siempre.
+    """
+    categoria_id = _entero_positivo(request.GET.get('categoria'))
+    numero_pagina = _entero_positivo(request.GET.get('pagina')) or 1
     busqueda = request.GET.get('busqueda', '')
-    
-    platos = Plato.objects.filter(disponible=True)
-    
-    if categoria_id:
-        platos = platos.filter(categoria_id=categoria_id)
-    
+    rol = rol_visitante(request.user)
+
+    def renderizar():
+        platos = con_stock(Plato.objects.filter(disponible=True)).select_related('categoria')
+        if categoria_id:
+            platos = platos.filter(categoria_id=categoria_id)
+        if busqueda:
+            platos = buscar_platos(platos, busqueda)
+        return render_to_string('menu/listado_platos.html', {
+            'pagina': Paginator(platos, getattr(settings, 'MENU_POR_PAGINA', 24)).get_page(numero_pagina),
+            'categorias': Categoria.objects.filter(activa=True),
+            'categoria_actual': categoria_id,
+            'busqueda': busqueda,
+            'puede_pedir': rol in ('anonimo', 'cliente'),
+            'marcador_csrf': MARCADOR_CSRF,
+        })
+
+    def contar():
+        platos = con_stock(Plato.objects.filter(disponible=True)).order_by()
+        return dict(platos.values_list('categoria_id').annotate(total=Count('id')))
+
     if busqueda:
-        platos = platos.filter(
-            Q(nombre__icontains=busqueda) | Q(descripcion__icontains=busqueda)
-        )
-    
+        listado = renderizar()
+    else:
+        listado = fragmento_menu(categoria_id, numero_pagina, rol, renderizar, contar)
+
     context = {
-        'platos': platos,
-        'categorias': categorias,
-        'categoria_actual': int(categoria_id) if categoria_id else None,
+        'listado': mark_safe(listado.replace(MARCADOR_CSRF, get_token(request))),
         'busqueda': busqueda,
     }
     return render(request, 'menu/index.html', context)
@@ -39,44 +79,61 @@ def index(request):
 
 def detalle_plato(request, plato_id):
     """Detalle de un plato"""
-    plato = get_object_or_404(Plato, id=plato_id, disponible=True)
-    return render(request, 'menu/detalle_plato.html', {'plato': plato})
+    plato = get_object_or_404(Plato.objects.select_related('disponibilidad'), id=plato_id, disponible=True)
+    return render(request, 'menu/detalle_plato.html', {'plato': plato, 'porciones': porciones_disponibles(plato)})
+
+
+def api_menu(request):
+    """Menú en JSON para tablets y kioscos; con If-None-Match responde 304 si no cambió"""
+    version = version_catalogo()
+    etag = quote_etag(version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(menu_json(version), content_type='application/json')
+    response['ETag'] = etag
+    # Los dispositivos siempre revalidan; la respuesta es igual para todos
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def imagen_variante(request, ruta):
+    """Sirve una variante de imagen; el nombre lleva el hash del original, así que nunca cambia"""
+    if not ruta.startswith(DIRECTORIO_VARIANTES) or '..' in ruta or not default_storage.exists(ruta):
+        raise Http404
+    formato = ruta.rsplit('.', 1)[-1]
+    response = FileResponse(default_storage.open(ruta, 'rb'), content_type=f'image/{formato}')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
-@login_required
 def agregar_al_carrito(request, plato_id):
-    """Agrega un plato al carrito de compras"""
-    if not request.user.es_cliente():
+    """Agrega un plato al carrito de compras (sesión; no crea pedidos)"""
+    if request.user.is_authenticated and not request.user.es_cliente():
         messages.error(request, 'Solo los clientes pueden realizar pedidos')
         return redirect('menu:index')
     
-    plato = get_object_or_404(Plato, id=plato_id, disponible=True)
-    cantidad = int(request.POST.get('cantidad', 1))
+    plato = get_object_or_404(Plato.objects.select_related('disponibilidad'), id=plato_id, disponible=True)
+    try:
+        cantidad = int(request.POST.get('cantidad', 1))
+    except ValueError:
+        cantidad = 0
     
     if cantidad < 1:
         messages.error(request, 'La cantidad debe ser mayor a 0')
         return redirect('menu:detalle_plato', plato_id=plato_id)
     
-    # Obtener o crear pedido pendiente del usuario
-    pedido, created = Pedido.objects.get_or_create(
-        cliente=request.user,
-        estado='pendiente',
-        defaults={'subtotal': Decimal('0.00'), 'impuesto': Decimal('0.00'), 'total': Decimal('0.00')}
-    )
-    
-    # Verificar si el plato ya está en el pedido
-    item, item_created = ItemPedido.objects.get_or_create(
-        pedido=pedido,
-        plato=plato,
-        defaults={
-            'cantidad': cantidad,
-            'precio_unitario': plato.precio,
-        }
-    )
-    
-    if not item_created:
-        item.cantidad += cantidad
-        item.save()
+    carrito = Carrito(request)
+    porciones = porciones_disponibles(plato)
+    if porciones is not None:
+        en_carrito = carrito.lineas_guardadas.get(str(plato.id), {}).get('cantidad', 0)
+        if en_carrito + cantidad > porciones:
+            if porciones == 0:
+                messages.error(request, f'{plato.nombre} está agotado')
+            else:
+                messages.error(request, f'Solo quedan {porciones} porciones de {plato.nombre}')
+            return redirect('menu:detalle_plato', plato_id=plato_id)
+
+    carrito.agregar(plato, cantidad)
     
     messages.success(request, f'{plato.nombre} agregado al carrito')
     return redirect('pedidos:carrito')
@@ -86,11 +143,11 @@ def agregar_al_carrito(request, plato_id):
 @staff_or_mesero_required
 def lista_platos_admin(request):
     """Lista de platos para administradores"""
-    platos = Plato.objects.all().order_by('-fecha_creacion')
+    platos = Plato.objects.select_related('categoria').order_by('-fecha_creacion')
     busqueda = request.GET.get('busqueda', '')
     
     if busqueda:
-        platos = platos.filter(Q(nombre__icontains=busqueda) | Q(descripcion__icontains=busqueda))
+        platos = buscar_platos(platos, busqueda)
     
     context = {
         'platos': platos,
@@ -156,6 +213,66 @@ def eliminar_plato(request, plato_id):
     return render(request, 'menu/admin/confirmar_eliminar.html', {'objeto': plato, 'tipo': 'plato'})
 
 
+@staff_or_mesero_required
+def exportar_menu(request):
+    """Descarga el menú completo (platos, recetas, categorías e ingredientes) en CSV o Excel"""
+    if request.GET.get('formato') == 'excel':
+        archivo = io.BytesIO()
+        escribir_menu_excel(archivo)
+        response = HttpResponse(
+            archivo.getvalue(),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        extension = 'xlsx'
+    else:
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response.write('\ufeff')  # BOM para que Excel detecte UTF-8
+        escribir_menu_csv(response)
+        extension = 'csv'
+    response['Content-Disposition'] = f'attachment; filename="menu.{extension}"'
+    return response
+
+
+@staff_or_mesero_required
+def importar_menu(request):
+    """Carga masiva del menú: primero simula y muestra los cambios, luego aplica todo junto"""
+    importacion = None
+    if request.method == 'POST':
+        form = ImportarMenuForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                importacion = ImportacionMenu(leer_filas(form.cleaned_data['archivo'], form.formato))
+            except ErrorArchivo as e:
+                form.add_error('archivo', str(e))
+            else:
+                if request.POST.get('accion') == 'aplicar' and not importacion.errores:
+                    importacion.aplicar()
+                    messages.success(request, 'Menú importado exitosamente')
+                    return redirect('menu:lista_platos_admin')
+    else:
+        form = ImportarMenuForm()
+
+    context = {'form': form, 'importacion': importacion}
+    if importacion:
+        context.update({
+            'resumen': importacion.resumen(),
+            'errores': importacion.errores[:100],
+            'platos_nuevos': [nombre for _, nombre in list(importacion.platos_nuevos)[:20]],
+            'platos_modificados': [plato.nombre for plato in importacion.platos_actualizados[:20]],
+        })
+    return render(request, 'menu/admin/importar_menu.html', context)
+
+
+@staff_or_mesero_required
+def buscar_ingredientes_admin(request):
+    """Autocompletado de ingredientes para el editor de recetas (por prefijo, máximo 20)"""
+    ingredientes = buscar_ingredientes(request.GET.get('q'))
+    return JsonResponse({'resultados': [
+        {'id': ingrediente.id, 'nombre': str(ingrediente), 'unidad_medida': ingrediente.unidad_medida}
+        for ingrediente in ingredientes
+    ]})
+
+
 @staff_or_mesero_required
 def lista_ingredientes_admin(request):
     """Lista de ingredientes para administradores"""
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import CorreoSaliente
+
+
+@admin.register(CorreoSaliente)
+class CorreoSalienteAdmin(admin.ModelAdmin):
+    list_display = ('asunto', 'destinatario', 'estado', 'intentos', 'fecha_creacion', 'fecha_envio')
+    list_filter = ('estado', 'fecha_creacion')
+    search_fields = ('destinatario', 'asunto')
+    readonly_fields = ('fecha_creacion', 'fecha_envio', 'ultimo_error')
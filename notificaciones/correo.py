@@ -0,0 +1,154 @@
+import importlib
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import CorreoSaliente
+
+
+MAX_INTENTOS = 5
+ESPERA_BASE = timedelta(seconds=30)
+ESPERA_MAXIMA = timedelta(hours=1)
+# Tiempo que un correo queda reservado por un worker antes de poder reintentarse
+RESERVA = timedelta(minutes=5)
+
+
+def encolar_correo(destinatario, asunto, texto, html=None):
+    """Guarda el correo en la bandeja de salida.
+
+    Se escribe en la misma transacción que la operación que lo origina, así
+    que si esta se revierte el correo tampoco se envía.
+    """
+    return CorreoSaliente.objects.create(
+        destinatario=destinatario,
+        asunto=asunto,
+        cuerpo_texto=texto,
+        cuerpo_html=html,
+        remitente=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@restaurante.com'),
+    )
+
+
+def _espera(intentos):
+    """Backoff exponencial: 30s, 60s, 120s... hasta una hora"""
+    return min(ESPERA_BASE * (2 ** max(intentos - 1, 0)), ESPERA_MAXIMA)
+
+
+def _reservar_lote(tamano):
+    """Reserva un lote de correos vencidos para este worker"""
+    ahora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            CorreoSaliente.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente', proximo_intento__lte=ahora)
+            .order_by('proximo_intento')
+            .values_list('id', flat=True)[:tamano]
+        )
+        CorreoSaliente.objects.filter(id__in=ids).update(
+            intentos=F('intentos') + 1,
+            proximo_intento=ahora + RESERVA,
+        )
+    return list(CorreoSaliente.objects.filter(id__in=ids).order_by('proximo_intento', 'id'))
+
+
+class _EnvioSendGrid:
+    """Cliente de SendGrid reutilizado durante todo el lote"""
+
+    def __init__(self, api_key):
+        self.sendgrid = importlib.import_module('sendgrid')
+        self.Mail = importlib.import_module('sendgrid.helpers.mail').Mail
+        self.cliente = self.sendgrid.SendGridAPIClient(api_key=api_key)
+
+    def enviar(self, correo):
+        message = self.Mail(
+            from_email=correo.remitente,
+            to_emails=correo.destinatario,
+            subject=correo.asunto,
+            html_content=correo.cuerpo_html or correo.cuerpo_texto,
+        )
+        resp = self.cliente.send(message)
+        if not 200 <= int(getattr(resp, 'status_code', 0)) < 300:
+            raise RuntimeError(f'SendGrid respondió {getattr(resp, "status_code", "?")}')
+
+
+class _EnvioDjango:
+    """Envío con el EMAIL_BACKEND configurado usando una sola conexión"""
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def enviar(self, correo):
+        mensaje = EmailMultiAlternatives(
+            subject=correo.asunto,
+            body=correo.cuerpo_texto,
+            from_email=correo.remitente or None,
+            to=[correo.destinatario],
+            connection=self.connection,
+        )
+        if correo.cuerpo_html:
+            mensaje.attach_alternative(correo.cuerpo_html, 'text/html')
+        mensaje.send(fail_silently=False)
+
+
+def _registrar_fallo(correo, error):
+    """Programa el reintento con backoff o marca el correo como fallido"""
+    correo.ultimo_error = str(error)
+    if correo.intentos >= MAX_INTENTOS:
+        correo.estado = 'fallido'
+    else:
+        correo.proximo_intento = timezone.now() + _espera(correo.intentos)
+    correo.save(update_fields=['estado', 'ultimo_error', 'proximo_intento'])
+
+
+def _enviar(correo, envio_sendgrid, envio_django):
+    if envio_sendgrid is not None:
+        try:
+            envio_sendgrid.enviar(correo)
+            return
+        except Exception:
+            # Igual que antes: si SendGrid falla se intenta con el backend de Django
+            pass
+    envio_django.enviar(correo)
+
+
+def enviar_pendientes(tamano_lote=50):
+    """Envía un lote de la bandeja de salida. Devuelve (enviados, fallidos)"""
+    correos = _reservar_lote(tamano_lote)
+    if not correos:
+        return 0, 0
+
+    api_key = getattr(settings, 'SENDGRID_API_KEY', None)
+    envio_django = _EnvioDjango()
+    envio_sendgrid = None
+    if api_key:
+        try:
+            envio_sendgrid = _EnvioSendGrid(api_key)
+        except Exception:
+            envio_sendgrid = None
+
+    try:
+        envio_django.connection.open()
+    except Exception as e:
+        if envio_sendgrid is None:
+            for correo in correos:
+                _registrar_fallo(correo, e)
+            return 0, len(correos)
+
+    enviados = fallidos = 0
+    try:
+        for correo in correos:
+            try:
+                _enviar(correo, envio_sendgrid, envio_django)
+            except Exception as e:
+                fallidos += 1
+                _registrar_fallo(correo, e)
+            else:
+                enviados += 1
+                correo.estado = 'enviado'
+                correo.fecha_envio = timezone.now()
+                correo.ultimo_error = None
+                correo.save(update_fields=['estado', 'fecha_envio', 'ultimo_error'])
+    finally:
+        envio_django.connection.close()
+    return enviados, fallidos
@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from notificaciones.correo import enviar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Envía los correos pendientes de la bandeja de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50, help='Correos por lote')
+        parser.add_argument('--continuo', action='store_true', help='Sigue ejecutándose y revisa la bandeja periódicamente')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera cuando la bandeja está vacía')
+
+    def handle(self, *args, **options):
+        while True:
+            enviados, fallidos = enviar_pendientes(options['lote'])
+            if enviados or fallidos:
+                self.stdout.write(f'Enviados: {enviados} - Fallidos: {fallidos}')
+            if not options['continuo']:
+                # Sin --continuo se vacía la bandeja y se termina
+                if enviados or fallidos:
+                    continue
+                break
+            if not (enviados or fallidos):
+                time.sleep(options['intervalo'])
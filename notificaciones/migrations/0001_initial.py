@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinatario', models.EmailField(max_length=254)),
+                ('asunto', models.CharField(max_length=255)),
+                ('cuerpo_texto', models.TextField()),
+                ('cuerpo_html', models.TextField(blank=True, null=True)),
+                ('remitente', models.CharField(blank=True, max_length=254)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.IntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_error', models.TextField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Correo Saliente',
+                'verbose_name_plural': 'Correos Salientes',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_prox_idx')],
+            },
+        ),
+    ]
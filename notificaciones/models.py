@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils import timezone
+
+
+class CorreoSaliente(models.Model):
+    """Bandeja de salida: correos pendientes de envío por el worker"""
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+    
+    destinatario = models.EmailField()
+    asunto = models.CharField(max_length=255)
+    cuerpo_texto = models.TextField()
+    cuerpo_html = models.TextField(blank=True, null=True)
+    remitente = models.CharField(max_length=254, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    ultimo_error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Correo Saliente'
+        verbose_name_plural = 'Correos Salientes'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_prox_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.asunto} -> {self.destinatario} ({self.get_estado_display()})"
@@ -0,0 +1,39 @@
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from .correo import encolar_correo, enviar_pendientes, MAX_INTENTOS
+from .models import CorreoSaliente
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', SENDGRID_API_KEY=None)
+class BandejaSalidaTests(TestCase):
+    def test_envia_lote_con_una_sola_conexion(self):
+        for i in range(3):
+            encolar_correo(f'cliente{i}@example.com', f'Pedido #{i}', 'Hola', html='<p>Hola</p>')
+        self.assertEqual(len(mail.outbox), 0)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as abrir:
+            enviados, fallidos = enviar_pendientes()
+        self.assertEqual((enviados, fallidos), (3, 0))
+        self.assertEqual(abrir.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(CorreoSaliente.objects.exclude(estado='enviado').exists())
+
+    def test_reintenta_con_backoff_y_marca_fallido(self):
+        correo = encolar_correo('cliente@example.com', 'Reserva', 'Hola')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('caído')):
+            self.assertEqual(enviar_pendientes(), (0, 1))
+            correo.refresh_from_db()
+            self.assertEqual(correo.estado, 'pendiente')
+            self.assertGreater(correo.proximo_intento, timezone.now())
+            self.assertEqual(enviar_pendientes(), (0, 0))  # todavía no vence
+
+            for _ in range(MAX_INTENTOS - 1):
+                CorreoSaliente.objects.update(proximo_intento=timezone.now() - timedelta(seconds=1))
+                enviar_pendientes()
+        correo.refresh_from_db()
+        self.assertEqual(correo.estado, 'fallido')
+        self.assertEqual(correo.intentos, MAX_INTENTOS)
+        self.assertIn('caído', correo.ultimo_error)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Pedido, ItemPedido
+from .models import Pedido, ItemPedido, VentaDiaria, PlatoVendidoDiario, TrabajoReporte, Eliminacion
 
 
 class ItemPedidoInline(admin.TabularInline):
@@ -21,3 +21,31 @@ class PedidoAdmin(admin.ModelAdmin):
 class ItemPedidoAdmin(admin.ModelAdmin):
     list_display = ('pedido', 'plato', 'cantidad', 'precio_unitario', 'subtotal')
     list_filter = ('pedido',)
+
+
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'estado', 'metodo_pago', 'cantidad', 'total')
+    list_filter = ('estado', 'metodo_pago')
+    date_hierarchy = 'fecha'
+
+
+@admin.register(PlatoVendidoDiario)
+class PlatoVendidoDiarioAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'plato', 'cantidad')
+    list_select_related = ('plato',)
+    date_hierarchy = 'fecha'
+
+
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'formato', 'desde', 'hasta', 'estado', 'solicitado_por', 'fecha_creacion')
+    list_filter = ('formato', 'estado')
+    readonly_fields = ('huella', 'archivo', 'error', 'fecha_creacion', 'fecha_actualizacion')
+
+
+@admin.register(Eliminacion)
+class EliminacionAdmin(admin.ModelAdmin):
+    list_display = ('modelo', 'objeto_id', 'mesero', 'fecha')
+    list_filter = ('modelo',)
+    date_hierarchy = 'fecha'
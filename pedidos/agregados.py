@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Count, DateField, Max, Min, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+from menu.models import Plato
+from .models import Pedido, ItemPedido
+from .resumenes import rango_dia, siguiente_periodo
+
+
+def particiones_mensuales(inicio, fin):
+    """Divide [inicio, fin) en tramos que no cruzan de un mes calendario a otro"""
+    particiones = []
+    while inicio < fin:
+        corte = min(siguiente_periodo(inicio.replace(day=1), 'mes'), fin)
+        particiones.append((inicio, corte))
+        inicio = corte
+    return particiones
+
+
+def _vacio():
+    return {'pedidos': 0, 'ventas': Decimal('0.00'), 'por_dia': {}, 'por_metodo': {}, 'por_plato': {}}
+
+
+def agregar_particion(inicio, fin):
+    """Totales y desgloses (por día, método de pago y plato) de los pedidos no pendientes en [inicio, fin)"""
+    desde, hasta = rango_dia(inicio)[0], rango_dia(fin)[0]
+    pedidos = Pedido.objects.exclude(estado='pendiente').filter(fecha_creacion__gte=desde, fecha_creacion__lt=hasta)
+    items = ItemPedido.objects.exclude(pedido__estado='pendiente').filter(
+        pedido__fecha_creacion__gte=desde, pedido__fecha_creacion__lt=hasta
+    )
+    resultado = _vacio()
+    for fila in pedidos.annotate(dia=TruncDate('fecha_creacion')).order_by().values('dia').annotate(
+        cantidad=Count('id'), total=Sum('total')
+    ):
+        resultado['por_dia'][fila['dia']] = (fila['cantidad'], fila['total'])
+        resultado['pedidos'] += fila['cantidad']
+        resultado['ventas'] += fila['total']
+    for fila in pedidos.order_by().values('metodo_pago').annotate(cantidad=Count('id'), total=Sum('total')):
+        resultado['por_metodo'][fila['metodo_pago'] or ''] = (fila['cantidad'], fila['total'])
+    for fila in items.order_by().values('plato_id').annotate(unidades=Sum('cantidad'), importe=Sum('subtotal')):
+        resultado['por_plato'][fila['plato_id']] = (fila['unidades'], fila['importe'])
+    return resultado
+
+
+def nombres_platos(plato_ids):
+    """Nombre de cada plato del desglose; si dos platos se llaman igual se agrega la categoría"""
+    platos = list(Plato.objects.filter(id__in=plato_ids).values_list('id', 'nombre', 'categoria__nombre'))
+    repetidos = Counter(nombre for _, nombre, _ in platos)
+    return {
+        plato_id: nombre if repetidos[nombre] == 1 else f'{nombre} ({categoria})'
+        for plato_id, nombre, categoria in platos
+    }
+
+
+def combinar(resultados):
+    total = _vacio()
+    for resultado in resultados:
+        total['pedidos'] += resultado['pedidos']
+        total['ventas'] += resultado['ventas']
+        for clave in ('por_dia', 'por_metodo', 'por_plato'):
+            for llave, (cantidad, importe) in resultado[clave].items():
+                anterior = total[clave].get(llave, (0, Decimal('0.00')))
+                total[clave][llave] = (anterior[0] + cantidad, anterior[1] + importe)
+    return total
+
+
+def _clave_mes(inicio, huella):
+    return f'agregados:mes:{inicio:%Y-%m}:{huella}'
+
+
+def _mes_cerrado(inicio, fin):
+    """Mes completo y ya terminado: su resultado se puede guardar en caché"""
+    mes_actual = timezone.localdate().replace(day=1)
+    return inicio.day == 1 and fin == siguiente_periodo(inicio, 'mes') and fin <= mes_actual
+
+
+def huellas_meses(meses):
+    """Huella (cantidad y última modificación de sus pedidos) de cada mes, en una consulta.
+
+    Cambia cuando se crea, modifica o elimina un pedido del mes, así la caché
+    de un proceso no devuelve un mes corregido desde otro proceso.
+    """
+    if not meses:
+        return {}
+    desde, hasta = rango_dia(min(meses))[0], rango_dia(siguiente_periodo(max(meses), 'mes'))[0]
+    filas = Pedido.objects.exclude(estado='pendiente').filter(
+        fecha_creacion__gte=desde, fecha_creacion__lt=hasta
+    ).annotate(mes=TruncMonth('fecha_creacion', output_field=DateField())).order_by().values('mes').annotate(
+        cantidad=Count('id'), ultima=Max('fecha_actualizacion')
+    )
+    huellas = {fila['mes']: f"{fila['cantidad']}|{fila['ultima']:%Y%m%d%H%M%S%f}" for fila in filas}
+    return {mes: huellas.get(mes, '0|-') for mes in meses}
+
+
+def _en_hilo(inicio, fin):
+    try:
+        return agregar_particion(inicio, fin)
+    finally:
+        connection.close()
+
+
+def _en_proceso(inicio, fin):
+    # Proceso hijo (fork): abre sus propias conexiones y las cierra al terminar
+    try:
+        return agregar_particion(inicio, fin)
+    finally:
+        connections.close_all()
+
+
+def _modo():
+    modo = getattr(settings, 'REPORTES_PARALELO', '')
+    if modo:
+        return modo
+    # En Postgres las consultas corren en el servidor: con hilos alcanza
+    return 'hilos' if connection.vendor == 'postgresql' else 'procesos'
+
+
+def _calcular(pendientes):
+    modo = _modo()
+    workers = min(getattr(settings, 'REPORTES_WORKERS', None) or os.cpu_count() or 1, len(pendientes))
+    if modo == 'serie' or workers < 2:
+        return [agregar_particion(inicio, fin) for inicio, fin in pendientes]
+    if modo == 'hilos':
+        with ThreadPoolExecutor(max_workers=workers) as ejecutor:
+            return list(ejecutor.map(_en_hilo, *zip(*pendientes)))
+    # Los hijos no deben heredar conexiones abiertas del proceso padre
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as ejecutor:
+        return list(ejecutor.map(_en_proceso, *zip(*pendientes)))
+
+
+def agregar_rango(fecha_inicio=None, fecha_fin=None):
+    """Totales y desgloses del rango (ambas fechas incluidas), calculados por meses en paralelo.
+
+    Los meses cerrados se leen de la caché por su huella; solo los que faltan
+    se reparten entre los workers y al final se combinan todos los resultados.
+    """
+    if fecha_inicio is None:
+        primera = Pedido.objects.exclude(estado='pendiente').aggregate(m=Min('fecha_creacion'))['m']
+        if primera is None:
+            return _vacio()
+        fecha_inicio = timezone.localdate(primera)
+    fin = (fecha_fin or timezone.localdate()) + timedelta(days=1)
+
+    particiones = particiones_mensuales(fecha_inicio, fin)
+    huellas = huellas_meses([inicio for inicio, fin_mes in particiones if _mes_cerrado(inicio, fin_mes)])
+    cerradas = {inicio: _clave_mes(inicio, huella) for inicio, huella in huellas.items()}
+    en_cache = cache.get_many(list(cerradas.values()))
+    resultados = {inicio: en_cache[clave] for inicio, clave in cerradas.items() if clave in en_cache}
+
+    pendientes = [(inicio, fin_mes) for inicio, fin_mes in particiones if inicio not in resultados]
+    if pendientes:
+        calculados = dict(zip((inicio for inicio, _ in pendientes), _calcular(pendientes)))
+        cache.set_many(
+            {cerradas[inicio]: calculados[inicio] for inicio in calculados if inicio in cerradas},
+            settings.REPORTES_PARTICIONES_TTL,
+        )
+        resultados.update(calculados)
+    return combinar(resultados[inicio] for inicio, _ in particiones)
@@ -0,0 +1,175 @@
+import secrets
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from menu.models import Plato
+from .models import Pedido, ItemPedido, calcular_impuesto
+
+
+CLAVE_SESION = 'carrito'
+CLAVE_ANONIMO = 'carrito_anonimo'
+
+
+class AlmacenSesion:
+    """Guarda el carrito en la sesión del visitante (sin escrituras en pedidos)"""
+
+    def __init__(self, request):
+        self.session = request.session
+
+    def cargar(self):
+        return dict(self.session.get(CLAVE_SESION, {}))
+
+    def guardar(self, lineas):
+        self.session[CLAVE_SESION] = lineas
+
+    def vaciar(self):
+        self.session.pop(CLAVE_SESION, None)
+
+    def fusionar_anonimo(self, usuario):
+        """Nada que hacer: los datos de la sesión se conservan al iniciar sesión"""
+
+
+class AlmacenCache:
+    """Guarda el carrito en la caché: por usuario si inició sesión, si no por visitante.
+
+    El visitante anónimo se identifica con un token guardado en su sesión y
+    no con la clave de sesión, que cambia al iniciar sesión.
+    """
+    TIMEOUT = 60 * 60 * 24 * 7
+
+    def __init__(self, request):
+        self.request = request
+
+    @property
+    def clave(self):
+        if self.request.user.is_authenticated:
+            return self._clave_usuario(self.request.user)
+        return self._clave_anonimo(crear=True)
+
+    @staticmethod
+    def _clave_usuario(usuario):
+        return f'carrito:usuario:{usuario.pk}'
+
+    def _clave_anonimo(self, crear=False):
+        token = self.request.session.get(CLAVE_ANONIMO)
+        if token is None:
+            if not crear:
+                return None
+            token = self.request.session[CLAVE_ANONIMO] = secrets.token_urlsafe(16)
+        return f'carrito:anonimo:{token}'
+
+    def cargar(self):
+        if not self.request.user.is_authenticated and CLAVE_ANONIMO not in self.request.session:
+            return {}
+        return dict(cache.get(self.clave) or {})
+
+    def guardar(self, lineas):
+        cache.set(self.clave, lineas, self.TIMEOUT)
+
+    def vaciar(self):
+        cache.delete(self.clave)
+
+    def fusionar_anonimo(self, usuario):
+        """Suma el carrito del visitante al del usuario que acaba de iniciar sesión"""
+        clave_anonimo = self._clave_anonimo()
+        self.request.session.pop(CLAVE_ANONIMO, None)
+        anonimo = cache.get(clave_anonimo) if clave_anonimo else None
+        if not anonimo:
+            return
+        clave_usuario = self._clave_usuario(usuario)
+        lineas = dict(cache.get(clave_usuario) or {})
+        for plato_id, linea in anonimo.items():
+            if plato_id in lineas:
+                lineas[plato_id] = {**lineas[plato_id], 'cantidad': lineas[plato_id]['cantidad'] + linea['cantidad']}
+            else:
+                lineas[plato_id] = linea
+        cache.set(clave_usuario, lineas, self.TIMEOUT)
+        cache.delete(clave_anonimo)
+
+
+def get_almacen(request):
+    """Instancia el almacén configurado en CARRITO_ALMACEN"""
+    ruta = getattr(settings, 'CARRITO_ALMACEN', 'pedidos.carrito.AlmacenSesion')
+    return import_string(ruta)(request)
+
+
+class Carrito:
+    """Carrito de compras; solo se convierte en Pedido al confirmar el checkout.
+
+    Las líneas se guardan como {plato_id: {'cantidad': int, 'precio': str}},
+    con el precio del plato en el momento de agregarlo.
+    """
+
+    def __init__(self, request):
+        self.almacen = get_almacen(request)
+        self.lineas_guardadas = self.almacen.cargar()
+
+    def __len__(self):
+        return len(self.lineas_guardadas)
+
+    def _guardar(self):
+        self.almacen.guardar(self.lineas_guardadas)
+
+    def agregar(self, plato, cantidad=1):
+        linea = self.lineas_guardadas.get(str(plato.id))
+        if linea:
+            linea['cantidad'] += cantidad
+        else:
+            self.lineas_guardadas[str(plato.id)] = {'cantidad': cantidad, 'precio': str(plato.precio)}
+        self._guardar()
+
+    def actualizar(self, plato_id, cantidad):
+        if str(plato_id) not in self.lineas_guardadas:
+            return False
+        if cantidad < 1:
+            return self.eliminar(plato_id)
+        self.lineas_guardadas[str(plato_id)]['cantidad'] = cantidad
+        self._guardar()
+        return True
+
+    def eliminar(self, plato_id):
+        if self.lineas_guardadas.pop(str(plato_id), None) is None:
+            return False
+        self._guardar()
+        return True
+
+    def vaciar(self):
+        self.lineas_guardadas = {}
+        self.almacen.vaciar()
+
+    def items(self):
+        """Items sin guardar (ItemPedido) de los platos que siguen disponibles, en una consulta"""
+        platos = Plato.objects.filter(id__in=self.lineas_guardadas.keys(), disponible=True).in_bulk()
+        items = []
+        for plato_id, linea in self.lineas_guardadas.items():
+            plato = platos.get(int(plato_id))
+            if plato is None:
+                continue
+            precio = Decimal(linea['precio'])
+            items.append(ItemPedido(
+                plato=plato,
+                cantidad=linea['cantidad'],
+                precio_unitario=precio,
+                subtotal=precio * Decimal(linea['cantidad']),
+            ))
+        return items
+
+    def resumen(self, items=None):
+        """Pedido sin guardar con los totales del carrito (mismo cálculo que Pedido)"""
+        items = self.items() if items is None else items
+        subtotal = sum((item.subtotal for item in items), Decimal('0.00'))
+        impuesto = calcular_impuesto(subtotal)
+        return Pedido(subtotal=subtotal, impuesto=impuesto, total=subtotal + impuesto)
+
+    def crear_pedido(self, cliente, metodo_pago, notas='', items=None):
+        """Crea el Pedido confirmado y sus items en bloque; debe llamarse dentro de una transacción"""
+        items = self.items() if items is None else items
+        if not items:
+            return None
+        pedido = Pedido.objects.create(cliente=cliente, estado='confirmado', metodo_pago=metodo_pago, notas=notas)
+        for item in items:
+            item.pedido = pedido
+        ItemPedido.objects.bulk_create(items)
+        pedido.recalcular_total()
+        return pedido
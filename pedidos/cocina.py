@@ -0,0 +1,149 @@
+import heapq
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Max, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import Pedido
+
+
+ESTADOS_EN_COCINA = ('en_preparacion', 'confirmado')
+MINUTOS_POR_DEFECTO = 30  # igual que el default de Plato.tiempo_preparacion
+
+
+def simular_cola(ordenes, estaciones, libres=None):
+    """Asigna cada orden a la estación que se libera primero (cola de prioridad).
+
+    `ordenes` son pares (pedido_id, minutos) ya en orden de prioridad y los
+    tiempos son minutos desde ahora. Devuelve ({pedido_id: minuto_listo},
+    estado de las estaciones) para poder continuar la simulación después.
+    """
+    libres = list(libres) if libres is not None else [(0.0, n) for n in range(max(estaciones, 1))]
+    heapq.heapify(libres)
+    listos = {}
+    for pedido_id, minutos in ordenes:
+        libre, estacion = libres[0]
+        fin = libre + minutos
+        heapq.heapreplace(libres, (fin, estacion))
+        listos[pedido_id] = fin
+    return listos, libres
+
+
+def _inicio(pedido):
+    """Desde cuándo está en preparación (los anteriores al campo usan su última actualización)"""
+    return pedido.fecha_preparacion or pedido.fecha_actualizacion
+
+
+def _ordenes_abiertas(ahora, hasta=None):
+    """Pedidos en cocina con su duración (el plato más lento), en orden de prioridad.
+
+    Con `hasta` solo se leen los que van antes que ese pedido (y él mismo):
+    los posteriores no cambian cuándo queda listo.
+    """
+    pedidos = Pedido.objects.filter(estado__in=ESTADOS_EN_COCINA).annotate(
+        inicio=Coalesce('fecha_preparacion', 'fecha_actualizacion')
+    )
+    if hasta is not None and hasta.estado == 'en_preparacion':
+        pedidos = pedidos.filter(
+            Q(inicio__lt=_inicio(hasta)) | Q(inicio=_inicio(hasta), id__lte=hasta.id), estado='en_preparacion'
+        )
+    elif hasta is not None:
+        pedidos = pedidos.filter(
+            Q(estado='en_preparacion') | Q(fecha_creacion__lt=hasta.fecha_creacion)
+            | Q(fecha_creacion=hasta.fecha_creacion, id__lte=hasta.id)
+        )
+    filas = pedidos.order_by().values('id', 'estado', 'fecha_creacion', 'inicio').annotate(
+        duracion=Coalesce(Max('items__plato__tiempo_preparacion'), Value(MINUTOS_POR_DEFECTO))
+    )
+    ordenes = []
+    for fila in filas:
+        minutos = float(fila['duracion'])
+        if fila['estado'] == 'en_preparacion':
+            # Lo que ya lleva desde que entró a cocina; otros guardados del pedido no lo reinician
+            transcurrido = max((ahora - fila['inicio']).total_seconds() / 60, 0.0)
+            minutos = max(minutos - transcurrido, 0.0)
+            prioridad = (0, fila['inicio'], fila['id'])
+        else:
+            prioridad = (1, fila['fecha_creacion'], fila['id'])
+        ordenes.append((prioridad, fila['id'], minutos))
+    ordenes.sort()
+    return [(pedido_id, minutos) for _, pedido_id, minutos in ordenes]
+
+
+class ColaCocina:
+    """Estimaciones de la cola de cocina, recalculadas solo desde lo que cambió.
+
+    Guarda el estado de las estaciones después de cada orden simulada; si la
+    nueva cola comparte un prefijo con la anterior (lo normal: llegan pedidos
+    al final) la simulación continúa desde ahí en vez de empezar de cero.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._base = None
+        self._ordenes = []
+        self._estados = []
+        self._listos = {}
+
+    def estimar(self, ordenes, estaciones, base):
+        with self._lock:
+            comun = 0
+            if base == self._base:
+                for nueva, anterior in zip(ordenes, self._ordenes):
+                    if nueva != anterior:
+                        break
+                    comun += 1
+            else:
+                self._listos = {}
+            if comun:
+                libres = self._estados[comun - 1]
+                listos = {pedido_id: self._listos[pedido_id] for pedido_id, _ in ordenes[:comun]}
+            else:
+                libres = [(0.0, n) for n in range(max(estaciones, 1))]
+                listos = {}
+            estados = self._estados[:comun]
+            for orden in ordenes[comun:]:
+                nuevos, libres = simular_cola([orden], estaciones, libres)
+                listos.update(nuevos)
+                estados.append(tuple(libres))
+            self._base, self._ordenes, self._estados, self._listos = base, list(ordenes), estados, listos
+            return dict(listos)
+
+    def consultar(self, pedido_id, base):
+        """Minuto estimado de un pedido en la última simulación, si fue con la misma base"""
+        with self._lock:
+            return self._listos.get(pedido_id) if base == self._base else None
+
+
+_cola = ColaCocina()
+
+
+def _base(estaciones):
+    estaciones = estaciones or getattr(settings, 'COCINA_ESTACIONES', 3)
+    # Minuto actual como ancla: dentro del mismo minuto se reutiliza la simulación
+    return timezone.now().replace(second=0, microsecond=0), estaciones
+
+
+def estimar_entregas(estaciones=None):
+    """{pedido_id: hora estimada de listo} para los pedidos confirmados y en preparación"""
+    ahora, estaciones = _base(estaciones)
+    ordenes = _ordenes_abiertas(ahora)
+    listos = _cola.estimar(ordenes, estaciones, (ahora, estaciones))
+    return {pedido_id: ahora + timedelta(minutes=minutos) for pedido_id, minutos in listos.items()}
+
+
+def estimar_entrega(pedido, estaciones=None):
+    """Hora estimada de listo de un pedido (None si no está en cocina).
+
+    Usa la simulación del minuto si ya la hay; si no, simula solo las órdenes
+    que van antes que el pedido, sin recalcular toda la cola.
+    """
+    if pedido.estado not in ESTADOS_EN_COCINA:
+        return None
+    ahora, estaciones = _base(estaciones)
+    minutos = _cola.consultar(pedido.id, (ahora, estaciones))
+    if minutos is None:
+        listos, _ = simular_cola(_ordenes_abiertas(ahora, hasta=pedido), estaciones)
+        minutos = listos.get(pedido.id)
+    return None if minutos is None else ahora + timedelta(minutes=minutos)
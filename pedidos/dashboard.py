@@ -0,0 +1,116 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Q, Sum
+from .models import VentaDiaria, PlatoVendidoDiario
+from .resumenes import ESTADOS_CON_INGRESO, serie_temporal, siguiente_periodo
+
+
+CLAVE_VERSION = 'dashboard:version'
+
+
+def _version():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        version = 1
+        cache.add(CLAVE_VERSION, version, None)
+    return version
+
+
+def invalidar_dashboard():
+    """Invalida todos los widgets cambiando la versión de sus claves"""
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        cache.set(CLAVE_VERSION, 2, None)
+
+
+class WidgetsDashboard:
+    """Calcula cada widget a través de la caché y cuenta aciertos y fallos"""
+
+    def __init__(self):
+        self.version = _version()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, nombre, periodo, calcular):
+        clave = f'dashboard:v{self.version}:{nombre}:{periodo}'
+        valor = cache.get(clave)
+        if valor is None:
+            self.fallos += 1
+            valor = calcular()
+            cache.set(clave, valor, getattr(settings, 'DASHBOARD_CACHE_TTL', 300))
+        else:
+            self.aciertos += 1
+        return valor
+
+    def generales(self, hoy):
+        def calcular():
+            mes_actual = hoy.replace(day=1)
+            datos = VentaDiaria.objects.aggregate(
+                total_pedidos=Sum('cantidad'),
+                pedidos_hoy=Sum('cantidad', filter=Q(fecha=hoy)),
+                ventas_hoy=Sum('total', filter=Q(fecha=hoy, estado__in=ESTADOS_CON_INGRESO)),
+                ventas_mes=Sum('total', filter=Q(fecha__gte=mes_actual, estado__in=ESTADOS_CON_INGRESO)),
+            )
+            return {
+                'total_pedidos': datos['total_pedidos'] or 0,
+                'pedidos_hoy': datos['pedidos_hoy'] or 0,
+                'ventas_hoy': datos['ventas_hoy'] or Decimal('0.00'),
+                'ventas_mes': datos['ventas_mes'] or Decimal('0.00'),
+            }
+        return self.obtener('generales', hoy.isoformat(), calcular)
+
+    def platos_vendidos(self, desde=None, hasta=None):
+        return self.obtener('platos', _clave_rango(desde, hasta), lambda: list(
+            _en_rango(PlatoVendidoDiario.objects.all(), desde, hasta).values('plato__nombre').annotate(
+                total_vendido=Sum('cantidad')
+            ).order_by('-total_vendido')[:10]
+        ))
+
+    def ingresos(self, desde, hasta, periodo='mes'):
+        return self.obtener('ingresos', f'{_clave_rango(desde, hasta)}:{periodo}', lambda: [
+            {'periodo': inicio.isoformat(), 'total': float(total)}
+            for inicio, total in serie_temporal(
+                VentaDiaria.objects.filter(estado__in=ESTADOS_CON_INGRESO), 'fecha', 'total',
+                desde, hasta, periodo=periodo,
+            )
+        ])
+
+    def pedidos_por_estado(self, desde=None, hasta=None):
+        return self.obtener('estados', _clave_rango(desde, hasta), lambda: list(
+            _en_rango(VentaDiaria.objects.all(), desde, hasta).values('estado').annotate(
+                cantidad=Sum('cantidad')
+            ).order_by('estado')
+        ))
+
+    def modificado(self, desde=None, hasta=None):
+        """Última actualización de los resúmenes del rango (para Last-Modified)"""
+        def calcular():
+            fechas = [
+                _en_rango(modelo.objects.all(), desde, hasta).aggregate(m=Max('fecha_actualizacion'))['m']
+                for modelo in (VentaDiaria, PlatoVendidoDiario)
+            ]
+            return max((fecha for fecha in fechas if fecha), default=None) or 0
+        return self.obtener('modificado', _clave_rango(desde, hasta), calcular) or None
+
+
+def ultimos_doce_meses(mes_actual):
+    """Rango [inicio, fin) de los 12 meses calendario que terminan en mes_actual"""
+    inicio = mes_actual
+    for _ in range(11):
+        inicio = (inicio - timedelta(days=1)).replace(day=1)
+    return inicio, siguiente_periodo(mes_actual, 'mes')
+
+
+def _clave_rango(desde, hasta):
+    return f'{desde or ""}:{hasta or ""}'
+
+
+def _en_rango(queryset, desde, hasta):
+    if desde:
+        queryset = queryset.filter(fecha__gte=desde)
+    if hasta:
+        queryset = queryset.filter(fecha__lt=hasta)
+    return queryset
@@ -0,0 +1,50 @@
+from django.utils import timezone
+from .models import Pedido, marcar_resumenes
+
+
+def cambiar_estado_en_bloque(pedido_ids, nuevo_estado):
+    """Mueve varios pedidos a `nuevo_estado` validando Pedido.TRANSICIONES.
+
+    Una consulta para leer los estados actuales y un único UPDATE para todos
+    los movimientos válidos (incluye fecha_entrega o
+    fecha_preparacion si corresponde). Devuelve
+    {pedido_id: (ok, mensaje)} con el resultado de cada pedido.
+    """
+    etiquetas = dict(Pedido.ESTADOS)
+    if nuevo_estado not in etiquetas:
+        return {pedido_id: (False, 'Estado no válido') for pedido_id in pedido_ids}
+
+    actuales = dict(Pedido.objects.filter(id__in=pedido_ids).values_list('id', 'estado'))
+    resultados = {}
+    validos = []
+    for pedido_id in pedido_ids:
+        estado = actuales.get(pedido_id)
+        if estado is None:
+            resultados[pedido_id] = (False, 'No existe')
+        elif nuevo_estado not in Pedido.TRANSICIONES.get(estado, ()):
+            resultados[pedido_id] = (False, f'No se puede pasar de {etiquetas[estado]} a {etiquetas[nuevo_estado]}')
+        else:
+            validos.append(pedido_id)
+
+    if validos:
+        ahora = timezone.now()
+        cambios = {'estado': nuevo_estado, 'fecha_actualizacion': ahora}
+        if nuevo_estado == 'entregado':
+            cambios['fecha_entrega'] = ahora
+        elif nuevo_estado == 'en_preparacion':
+            cambios['fecha_preparacion'] = ahora
+        origenes = [estado for estado, destinos in Pedido.TRANSICIONES.items() if nuevo_estado in destinos]
+        actualizados = Pedido.objects.filter(id__in=validos, estado__in=origenes).update(**cambios)
+        movidos = set(validos)
+        if actualizados != len(validos):
+            # Otro usuario cambió alguno entre la lectura y el UPDATE
+            movidos = set(Pedido.objects.filter(
+                id__in=validos, estado=nuevo_estado, fecha_actualizacion=ahora
+            ).values_list('id', flat=True))
+        marcar_resumenes(pedido_ids=movidos)
+        for pedido_id in validos:
+            if pedido_id in movidos:
+                resultados[pedido_id] = (True, f'Actualizado a {etiquetas[nuevo_estado]}')
+            else:
+                resultados[pedido_id] = (False, 'Cambió mientras se actualizaba')
+    return resultados
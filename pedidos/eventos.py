@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Pedido
+from .paginacion import codificar_cursor, leer_cursor
+from .sincronizacion import SOLAPE
+
+
+LIMITE_POR_CONSULTA = 100
+
+
+def cursor_inicial():
+    return timezone.now(), 0
+
+
+def _cambios_desde(cursor):
+    """Pedidos modificados después del cursor, en orden (fecha_actualizacion, id)"""
+    fecha, pedido_id = cursor
+    return Pedido.objects.exclude(estado='pendiente').filter(
+        Q(fecha_actualizacion__gt=fecha) | Q(fecha_actualizacion=fecha, id__gt=pedido_id)
+    ).order_by('fecha_actualizacion', 'id').values(
+        'id', 'estado', 'total', 'fecha_creacion', 'fecha_actualizacion', 'cliente__username'
+    )[:LIMITE_POR_CONSULTA]
+
+
+def _evento(pedido, cursor):
+    estados = dict(Pedido.ESTADOS)
+    datos = {
+        'id': pedido['id'],
+        'estado': pedido['estado'],
+        'estado_display': estados.get(pedido['estado'], pedido['estado']),
+        'total': str(pedido['total']),
+        'cliente': pedido['cliente__username'],
+        'fecha': timezone.localtime(pedido['fecha_creacion']).strftime('%d/%m/%Y %H:%M'),
+    }
+    return f'id: {codificar_cursor(*cursor)}\nevent: pedido\ndata: {json.dumps(datos)}\n\n'
+
+
+async def _pendientes(cursor, enviados):
+    """Pedidos por emitir: relee SOLAPE hacia atrás del cursor y salta los ya enviados.
+
+    fecha_actualizacion se fija al guardar, no al confirmar la transacción: un
+    pedido que confirma tarde puede quedar con fecha anterior al cursor. Se
+    recorren todas las páginas del margen, así los repetidos no frenan el avance.
+    """
+    desde = (cursor[0] - SOLAPE, 0)
+    while True:
+        pagina = [pedido async for pedido in _cambios_desde(desde)]
+        for pedido in pagina:
+            desde = (pedido['fecha_actualizacion'], pedido['id'])
+            if enviados.get(pedido['id']) != pedido['fecha_actualizacion']:
+                yield pedido
+        if len(pagina) < LIMITE_POR_CONSULTA:
+            break
+
+
+async def stream_cambios(cursor, continuo=True):
+    """Generador SSE: emite solo los pedidos que cambiaron desde el cursor.
+
+    Con `continuo` consulta cada PEDIDOS_SSE_INTERVALO segundos hasta
+    PEDIDOS_SSE_DURACION; el navegador reconecta solo y retoma desde el
+    último `id` recibido (cabecera Last-Event-ID). Dentro de una conexión cada
+    versión de un pedido se emite una vez; al reconectar puede repetirse alguna
+    del margen de solape, y el navegador aplica los cambios por id.
+    """
+    intervalo = getattr(settings, 'PEDIDOS_SSE_INTERVALO', 2)
+    duracion = getattr(settings, 'PEDIDOS_SSE_DURACION', 300)
+    limite = time.monotonic() + duracion
+    ultimo_envio = time.monotonic()
+    # El id inicial deja registrado el cursor aunque todavía no haya cambios
+    yield f'retry: {int(intervalo * 1000)}\nid: {codificar_cursor(*cursor)}\n\n'
+    enviados = {}  # id -> fecha_actualizacion emitida, dentro del margen de solape
+    while True:
+        cambios = [pedido async for pedido in _pendientes(cursor, enviados)]
+        for pedido in cambios:
+            enviados[pedido['id']] = pedido['fecha_actualizacion']
+            cursor = max(cursor, (pedido['fecha_actualizacion'], pedido['id']))
+            yield _evento(pedido, cursor)
+        enviados = {pedido_id: fecha for pedido_id, fecha in enviados.items() if fecha >= cursor[0] - SOLAPE}
+        if cambios:
+            ultimo_envio = time.monotonic()
+        elif time.monotonic() - ultimo_envio > 15:
+            # Comentario keep-alive para proxies con timeout de inactividad
+            yield ': ping\n\n'
+            ultimo_envio = time.monotonic()
+        if not continuo or time.monotonic() >= limite:
+            break
+        await asyncio.sleep(intervalo)
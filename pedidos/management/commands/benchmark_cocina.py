@@ -0,0 +1,39 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from pedidos.cocina import ColaCocina, simular_cola
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de la simulación de la cola de cocina con pedidos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=500, help='Pedidos abiertos en la cola')
+        parser.add_argument('--estaciones', type=int, default=4, help='Estaciones en paralelo')
+        parser.add_argument('--repeticiones', type=int, default=50, help='Repeticiones por medición')
+
+    def _medir(self, funcion, repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        return (time.perf_counter() - inicio) / repeticiones * 1000
+
+    def handle(self, *args, **options):
+        n, estaciones, repeticiones = options['pedidos'], options['estaciones'], options['repeticiones']
+        azar = random.Random(0)
+        ordenes = [(i, float(azar.choice([10, 15, 20, 30, 45]))) for i in range(n)]
+
+        completa = self._medir(lambda: simular_cola(ordenes, estaciones), repeticiones)
+
+        def agregar_uno():
+            cola = ColaCocina()
+            cola.estimar(ordenes, estaciones, 'base')
+            inicio = time.perf_counter()
+            cola.estimar(ordenes + [(n, 20.0)], estaciones, 'base')
+            return time.perf_counter() - inicio
+
+        incremental = sum(agregar_uno() for _ in range(repeticiones)) / repeticiones * 1000
+
+        self.stdout.write(f'{n} pedidos, {estaciones} estaciones')
+        self.stdout.write(f'Simulación completa: {completa:.3f} ms')
+        self.stdout.write(f'Un pedido nuevo (incremental): {incremental:.3f} ms')
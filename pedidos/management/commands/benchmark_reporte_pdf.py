@@ -0,0 +1,32 @@
+import os
+import resource
+import tempfile
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from pedidos.reportes_pdf import dibujar_pdf_pedidos
+
+
+class Command(BaseCommand):
+    help = 'Mide páginas por segundo y memoria máxima (RSS) del reporte PDF con pedidos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=100000, help='Filas del reporte')
+
+    def handle(self, *args, **options):
+        n = options['pedidos']
+        filas = (
+            (i, f'cliente{i % 500}', '01/01/2025', 'Entregado', f'${Decimal(i % 97) + Decimal("0.50")}')
+            for i in range(1, n + 1)
+        )
+        rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with tempfile.TemporaryFile() as archivo:
+            inicio = time.perf_counter()
+            paginas = dibujar_pdf_pedidos(archivo, filas, n, Decimal('0.00'))
+            segundos = time.perf_counter() - inicio
+            tamano = archivo.seek(0, os.SEEK_END)
+        rss_final = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB en Linux
+
+        self.stdout.write(f'{n} pedidos -> {paginas} páginas en {segundos:.2f} s ({paginas / segundos:.0f} páginas/s)')
+        self.stdout.write(f'Archivo: {tamano / 1024 / 1024:.1f} MB')
+        self.stdout.write(f'RSS máximo: {rss_final / 1024:.0f} MB (antes del reporte: {rss_inicial / 1024:.0f} MB)')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from pedidos.models import Pedido
+
+
+class Command(BaseCommand):
+    help = 'Verifica que los totales guardados de cada pedido coinciden con calcular_total'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Recalcula los pedidos con diferencias')
+
+    def handle(self, *args, **options):
+        diferencias = 0
+        pedidos = Pedido.objects.prefetch_related('items').iterator(chunk_size=500)
+        for pedido in pedidos:
+            if pedido.totales_conciliados():
+                continue
+            diferencias += 1
+            self.stdout.write(f'Pedido #{pedido.id}: total guardado ${pedido.total} no coincide')
+            if options['corregir']:
+                pedido.recalcular_total()
+        if diferencias:
+            self.stdout.write(self.style.WARNING(f'{diferencias} pedido(s) con diferencias'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todos los totales coinciden'))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from pedidos.trabajos import procesar_siguiente
+
+
+class Command(BaseCommand):
+    help = 'Genera los reportes PDF/Excel pendientes de la cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--continuo', action='store_true', help='Sigue ejecutándose y revisa la cola periódicamente')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera cuando la cola está vacía')
+
+    def handle(self, *args, **options):
+        while True:
+            trabajo = procesar_siguiente()
+            if trabajo is not None:
+                self.stdout.write(f'{trabajo}: {trabajo.error or trabajo.archivo}')
+                continue
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from pedidos.sincronizacion import purgar_eliminaciones, retencion
+
+
+class Command(BaseCommand):
+    help = 'Borra las eliminaciones de sincronización más viejas que SYNC_RETENCION_DIAS'
+
+    def handle(self, *args, **options):
+        borradas = purgar_eliminaciones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Eliminaciones borradas: {borradas} (retención {retencion().days} días)'
+        ))
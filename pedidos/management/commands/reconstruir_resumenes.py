@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from pedidos.dashboard import invalidar_dashboard
+from pedidos.resumenes import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Regenera desde cero los resúmenes diarios de ventas y platos vendidos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote al insertar')
+
+    def handle(self, *args, **options):
+        ventas, platos = reconstruir_resumenes(options['lote'])
+        invalidar_dashboard()
+        self.stdout.write(self.style.SUCCESS(
+            f'Resúmenes reconstruidos: {ventas} filas de ventas, {platos} filas de platos'
+        ))
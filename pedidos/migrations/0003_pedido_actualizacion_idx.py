@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='pedido_actualizacion_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0003_pedido_actualizacion_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='pedido_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['cliente', 'estado'], name='pedido_cliente_estado_idx'),
+        ),
+    ]
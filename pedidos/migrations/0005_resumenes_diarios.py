@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0001_initial'),
+        ('pedidos', '0004_indices_paginacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmado', 'Confirmado'), ('en_preparacion', 'En Preparación'), ('listo', 'Listo'), ('entregado', 'Entregado'), ('cancelado', 'Cancelado')], max_length=20)),
+                ('metodo_pago', models.CharField(blank=True, default='', max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'ordering': ['-fecha'],
+                'unique_together': {('fecha', 'estado', 'metodo_pago')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatoVendidoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('plato', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='menu.plato')),
+            ],
+            options={
+                'verbose_name': 'Plato Vendido por Día',
+                'verbose_name_plural': 'Platos Vendidos por Día',
+                'ordering': ['-fecha'],
+                'unique_together': {('fecha', 'plato')},
+            },
+        ),
+    ]
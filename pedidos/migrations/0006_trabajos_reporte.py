@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0005_resumenes_diarios'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('formato', models.CharField(choices=[('pdf', 'PDF'), ('excel', 'Excel')], max_length=10)),
+                ('desde', models.DateField(blank=True, null=True)),
+                ('hasta', models.DateField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('fallido', 'Fallido'), ('reemplazado', 'Reemplazado')], default='pendiente', max_length=20)),
+                ('huella', models.CharField(blank=True, help_text='Pedidos del rango al generar (cantidad y última actualización)', max_length=100)),
+                ('archivo', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reportes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['formato', 'desde', 'hasta', 'estado'], name='reporte_rango_idx'), models.Index(fields=['estado', 'fecha_creacion'], name='reporte_estado_idx')],
+            },
+        ),
+    ]
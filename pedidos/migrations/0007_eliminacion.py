@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0006_trabajos_reporte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('categoria', 'Categoría'), ('plato', 'Plato'), ('mesa', 'Mesa'), ('pedido', 'Pedido')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('mesero', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+                'ordering': ['fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='eliminacion_fecha_idx')],
+            },
+        ),
+    ]
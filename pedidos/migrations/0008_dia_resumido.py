@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0007_eliminacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiaResumido',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Día Resumido',
+                'verbose_name_plural': 'Días Resumidos',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:56
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+ESTADOS_CON_VENTA = ('confirmado', 'en_preparacion', 'listo', 'entregado')
+
+
+def llenar_pedidos_resumidos(apps, schema_editor):
+    """Lo que suma hoy cada pedido no pendiente, igual que los resúmenes ya guardados"""
+    Pedido = apps.get_model('pedidos', 'Pedido')
+    ItemPedido = apps.get_model('pedidos', 'ItemPedido')
+    PedidoResumido = apps.get_model('pedidos', 'PedidoResumido')
+    pedidos = Pedido.objects.exclude(estado='pendiente').order_by('id').values_list(
+        'id', 'fecha_creacion', 'estado', 'metodo_pago', 'total'
+    )
+    lote = {}
+    for pedido_id, creado, estado, metodo_pago, total in pedidos.iterator(chunk_size=1000):
+        lote[pedido_id] = PedidoResumido(
+            pedido_id=pedido_id, fecha=timezone.localdate(creado), estado=estado,
+            metodo_pago=metodo_pago or '', total=total, platos={},
+        )
+        if len(lote) == 1000:
+            _guardar(ItemPedido, PedidoResumido, lote)
+            lote = {}
+    if lote:
+        _guardar(ItemPedido, PedidoResumido, lote)
+
+
+def _guardar(ItemPedido, PedidoResumido, lote):
+    for fila in ItemPedido.objects.filter(
+        pedido_id__in=list(lote), pedido__estado__in=ESTADOS_CON_VENTA
+    ).order_by().values('pedido_id', 'plato').annotate(unidades=Sum('cantidad')):
+        lote[fila['pedido_id']].platos[str(fila['plato'])] = fila['unidades']
+    PedidoResumido.objects.bulk_create(lote.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0008_dia_resumido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoResumido',
+            fields=[
+                ('pedido_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField(blank=True, null=True)),
+                ('estado', models.CharField(blank=True, default='', max_length=20)),
+                ('metodo_pago', models.CharField(blank=True, default='', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10)),
+                ('platos', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'Pedido Resumido',
+                'verbose_name_plural': 'Pedidos Resumidos',
+            },
+        ),
+        migrations.DeleteModel(
+            name='DiaResumido',
+        ),
+        migrations.RunPython(llenar_pedidos_resumidos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0009_resumen_por_pedido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='fecha_preparacion',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
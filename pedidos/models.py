@@ -1,10 +1,100 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum, Value, DecimalField
+from django.db.models.functions import Round, Coalesce
 from django.core.validators import MinValueValidator
-from decimal import Decimal
+from django.utils import timezone
+from contextlib import contextmanager
+from decimal import Decimal, ROUND_HALF_UP
+import threading
 from usuarios.models import Usuario
 from menu.models import Plato
 
 
+TASA_IVA = Decimal('0.19')  # IVA 19%
+
+_pedidos_diferidos = threading.local()
+
+
+def calcular_impuesto(subtotal):
+    """IVA redondeado a centavos (mitad hacia arriba, igual que ROUND en la base de datos)"""
+    return (subtotal * TASA_IVA).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _expresiones_totales(subtotal):
+    """Expresiones SQL de subtotal, impuesto y total a partir de una expresión de subtotal"""
+    campo = DecimalField(max_digits=10, decimal_places=2)
+    impuesto = Round(subtotal * Value(TASA_IVA, output_field=campo), 2, output_field=campo)
+    return {
+        'subtotal': subtotal,
+        'impuesto': impuesto,
+        'total': subtotal + impuesto,
+        'fecha_actualizacion': timezone.now(),
+    }
+
+
+@contextmanager
+def totales_diferidos(pedido):
+    """Modo masivo: los items guardados dentro del bloque no tocan el pedido;
+    al salir se recalcula el total una sola vez con un agregado en la base de datos."""
+    pendientes = getattr(_pedidos_diferidos, 'ids', None)
+    if pendientes is None:
+        pendientes = _pedidos_diferidos.ids = set()
+    anidado = pedido.pk in pendientes
+    pendientes.add(pedido.pk)
+    try:
+        yield pedido
+    finally:
+        if not anidado:
+            pendientes.discard(pedido.pk)
+    if not anidado:
+        pedido.recalcular_total()
+
+
+def _totales_diferidos_para(pedido_id):
+    return pedido_id in getattr(_pedidos_diferidos, 'ids', ())
+
+
+_resumenes_pendientes = threading.local()
+
+
+def marcar_resumenes(pedido_ids=()):
+    """Anota pedidos creados, modificados o borrados cuyos resúmenes diarios hay que ajustar.
+
+    El ajuste se hace una sola vez al confirmar la transacción, así un
+    checkout con muchos items toca los resúmenes una vez y solo si se guardó.
+    """
+    if not hasattr(_resumenes_pendientes, 'ids'):
+        _resumenes_pendientes.ids = set()
+    _resumenes_pendientes.ids.update(pedido_ids)
+    transaction.on_commit(_actualizar_resumenes, robust=True)
+
+
+def _actualizar_resumenes():
+    ids = _resumenes_pendientes.ids
+    if not ids:
+        return
+    _resumenes_pendientes.ids = set()
+    from .resumenes import actualizar_resumenes
+    from .dashboard import invalidar_dashboard
+    actualizar_resumenes(ids)
+    invalidar_dashboard()
+
+
+def _construir_transiciones(estados):
+    """Máquina de estados a partir de Pedido.ESTADOS: se avanza en el orden
+    declarado (se pueden saltar pasos) y se cancela desde cualquier estado
+    abierto; 'entregado' y 'cancelado' son finales."""
+    flujo = [estado for estado, _ in estados if estado != 'cancelado']
+    transiciones = {}
+    for i, estado in enumerate(flujo):
+        siguientes = set(flujo[i + 1:])
+        if siguientes:
+            siguientes.add('cancelado')
+        transiciones[estado] = siguientes
+    transiciones['cancelado'] = set()
+    return transiciones
+
+
 class Pedido(models.Model):
     """Pedidos realizados por los clientes"""
     ESTADOS = [
@@ -15,6 +105,7 @@ class Pedido(models.Model):
         ('entregado', 'Entregado'),
         ('cancelado', 'Cancelado'),
     ]
+    TRANSICIONES = _construir_transiciones(ESTADOS)
     
     METODOS_PAGO = [
         ('efectivo', 'Efectivo'),
@@ -40,20 +131,36 @@ class Pedido(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     fecha_entrega = models.DateTimeField(blank=True, null=True)
+    fecha_preparacion = models.DateTimeField(blank=True, null=True)  # entrada a cocina (cocina.py)
     
     class Meta:
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['fecha_actualizacion', 'id'], name='pedido_actualizacion_idx'),
+            models.Index(fields=['fecha_creacion', 'id'], name='pedido_creacion_idx'),
+            models.Index(fields=['estado', 'fecha_creacion'], name='pedido_estado_fecha_idx'),
+            models.Index(fields=['cliente', 'estado'], name='pedido_cliente_estado_idx'),
+        ]
     
     def __str__(self):
         return f"Pedido #{self.id} - {self.cliente.username} - ${self.total}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado persistido, para saber si un cambio afecta los resúmenes (signals.py)
+        instance._estado_guardado = instance.__dict__.get('estado')
+        # Mesero persistido, para avisar a su dispositivo si deja de atenderlo (sincronizacion.py)
+        instance._mesero_guardado = instance.__dict__.get('mesero_id')
+        return instance
+    
     def calcular_total(self):
         """Calcula el total del pedido sumando los items"""
         items = self.items.all()
-        subtotal = sum(item.subtotal for item in items)
-        impuesto = subtotal * Decimal('0.19')  # IVA 19%
+        subtotal = sum((item.subtotal for item in items), Decimal('0.00'))
+        impuesto = calcular_impuesto(subtotal)
         total = subtotal + impuesto
         
         self.subtotal = subtotal
@@ -61,6 +168,39 @@ class Pedido(models.Model):
         self.total = total
         self.save()
         return total
+    
+    def recalcular_total(self):
+        """Recalcula los totales con un agregado SQL y un único UPDATE (sin cargar los items)"""
+        campo = DecimalField(max_digits=10, decimal_places=2)
+        subtotal = self.items.aggregate(
+            subtotal=Coalesce(Sum('subtotal'), Value(Decimal('0.00'), output_field=campo))
+        )['subtotal']
+        self.subtotal = subtotal
+        self.impuesto = calcular_impuesto(subtotal)
+        self.total = subtotal + self.impuesto
+        self.fecha_actualizacion = timezone.now()
+        Pedido.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal,
+            impuesto=self.impuesto,
+            total=self.total,
+            fecha_actualizacion=self.fecha_actualizacion,
+        )
+        if self.estado != 'pendiente':
+            marcar_resumenes(pedido_ids=[self.pk])
+        return self.total
+    
+    def puede_cambiar_a(self, nuevo_estado):
+        return nuevo_estado in self.TRANSICIONES.get(self.estado, ())
+    
+    def estados_siguientes(self):
+        """(valor, etiqueta) del estado actual y los alcanzables desde él, para el formulario de estado"""
+        return [(valor, etiqueta) for valor, etiqueta in self.ESTADOS if valor == self.estado or self.puede_cambiar_a(valor)]
+    
+    def totales_conciliados(self):
+        """Verifica que los totales guardados coinciden con los que daría calcular_total"""
+        subtotal = sum((item.subtotal for item in self.items.all()), Decimal('0.00'))
+        impuesto = calcular_impuesto(subtotal)
+        return (self.subtotal, self.impuesto, self.total) == (subtotal, impuesto, subtotal + impuesto)
 
 
 class ItemPedido(models.Model):
@@ -79,9 +219,168 @@ class ItemPedido(models.Model):
     def __str__(self):
         return f"{self.plato.nombre} x{self.cantidad} - ${self.subtotal}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Subtotal persistido, para aplicar solo la diferencia al guardar
+        instance._subtotal_guardado = instance.__dict__.get('subtotal')
+        return instance
+    
     def save(self, *args, **kwargs):
         """Calcula el subtotal automáticamente"""
         self.subtotal = self.precio_unitario * Decimal(self.cantidad)
+        anterior = getattr(self, '_subtotal_guardado', None)
+        if anterior is None and self._state.adding:
+            anterior = Decimal('0.00')
         super().save(*args, **kwargs)
-        # Recalcula el total del pedido
-        self.pedido.calcular_total()
+        self._subtotal_guardado = self.subtotal
+        if _totales_diferidos_para(self.pedido_id):
+            return
+        if anterior is None:
+            # Instancia sin subtotal previo conocido: recalcula con un agregado
+            self.pedido.recalcular_total()
+        else:
+            self._aplicar_diferencia(self.subtotal - anterior)
+    
+    def delete(self, *args, **kwargs):
+        subtotal = getattr(self, '_subtotal_guardado', None) or self.subtotal or Decimal('0.00')
+        resultado = super().delete(*args, **kwargs)
+        if not _totales_diferidos_para(self.pedido_id):
+            self._aplicar_diferencia(-subtotal)
+        return resultado
+    
+    def _aplicar_diferencia(self, diferencia):
+        """Aplica el cambio de subtotal de la línea al pedido en un único UPDATE atómico"""
+        if not diferencia:
+            return
+        Pedido.objects.filter(pk=self.pedido_id).update(**_expresiones_totales(F('subtotal') + diferencia))
+        if not (ItemPedido.pedido.is_cached(self) and self.pedido.estado == 'pendiente'):
+            marcar_resumenes(pedido_ids=[self.pedido_id])
+        if ItemPedido.pedido.is_cached(self):
+            pedido = self.pedido
+            pedido.subtotal += diferencia
+            pedido.impuesto = calcular_impuesto(pedido.subtotal)
+            pedido.total = pedido.subtotal + pedido.impuesto
+
+
+class VentaDiaria(models.Model):
+    """Resumen por día (hora local) de pedidos y ventas por estado y método de pago"""
+    fecha = models.DateField()
+    estado = models.CharField(max_length=20, choices=Pedido.ESTADOS)
+    metodo_pago = models.CharField(max_length=20, blank=True, default='')
+    cantidad = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Venta Diaria'
+        verbose_name_plural = 'Ventas Diarias'
+        ordering = ['-fecha']
+        unique_together = ['fecha', 'estado', 'metodo_pago']
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.estado} - {self.cantidad} (${self.total})"
+
+
+class PedidoResumido(models.Model):
+    """Lo que cada pedido suma hoy a los resúmenes diarios.
+
+    Al cambiar el pedido se resta esto y se suma lo nuevo, así los resúmenes
+    se mantienen por diferencias sin volver a agregar el día. Sin FK: la fila
+    tiene que sobrevivir al borrado del pedido para poder restarlo.
+    """
+    pedido_id = models.BigIntegerField(primary_key=True)
+    fecha = models.DateField(null=True, blank=True)
+    estado = models.CharField(max_length=20, blank=True, default='')  # vacío: no suma nada
+    metodo_pago = models.CharField(max_length=20, blank=True, default='')
+    total = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))
+    platos = models.JSONField(default=dict, blank=True)  # {plato_id: unidades} si cuenta como venta
+    
+    class Meta:
+        verbose_name = 'Pedido Resumido'
+        verbose_name_plural = 'Pedidos Resumidos'
+    
+    def __str__(self):
+        return f"Pedido #{self.pedido_id} - {self.fecha} - {self.estado or '-'}"
+
+
+class PlatoVendidoDiario(models.Model):
+    """Unidades vendidas de cada plato por día (pedidos confirmados en adelante)"""
+    fecha = models.DateField()
+    plato = models.ForeignKey(Plato, on_delete=models.CASCADE, related_name='ventas_diarias')
+    cantidad = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Plato Vendido por Día'
+        verbose_name_plural = 'Platos Vendidos por Día'
+        ordering = ['-fecha']
+        unique_together = ['fecha', 'plato']
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.plato.nombre} x{self.cantidad}"
+
+
+class TrabajoReporte(models.Model):
+    """Reporte PDF/Excel generado en segundo plano y guardado en disco para reutilizarlo"""
+    FORMATOS = [
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+    ]
+    ESTADOS = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('fallido', 'Fallido'),
+        ('reemplazado', 'Reemplazado'),
+    ]
+    
+    formato = models.CharField(max_length=10, choices=FORMATOS)
+    desde = models.DateField(blank=True, null=True)
+    hasta = models.DateField(blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente')
+    huella = models.CharField(max_length=100, blank=True, help_text="Pedidos del rango al generar (cantidad y última actualización)")
+    archivo = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True, null=True)
+    solicitado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='reportes')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Trabajo de Reporte'
+        verbose_name_plural = 'Trabajos de Reportes'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['formato', 'desde', 'hasta', 'estado'], name='reporte_rango_idx'),
+            models.Index(fields=['estado', 'fecha_creacion'], name='reporte_estado_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Reporte {self.get_formato_display()} {self.desde or '...'} - {self.hasta or '...'} ({self.estado})"
+
+
+class Eliminacion(models.Model):
+    """Registro (tombstone) de una fila que salió del conjunto sincronizado por los dispositivos"""
+    MODELOS = [
+        ('categoria', 'Categoría'),
+        ('plato', 'Plato'),
+        ('mesa', 'Mesa'),
+        ('pedido', 'Pedido'),
+    ]
+    
+    modelo = models.CharField(max_length=20, choices=MODELOS)
+    objeto_id = models.BigIntegerField()
+    # Para pedidos: mesero que lo tenía, así solo su dispositivo recibe la eliminación
+    mesero = models.ForeignKey(Usuario, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    fecha = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Eliminación'
+        verbose_name_plural = 'Eliminaciones'
+        ordering = ['fecha']
+        indexes = [
+            models.Index(fields=['fecha'], name='eliminacion_fecha_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_modelo_display()} #{self.objeto_id} ({self.fecha:%Y-%m-%d %H:%M})"
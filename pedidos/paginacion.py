@@ -0,0 +1,75 @@
+from datetime import datetime
+from django.db.models import Q
+from django.utils import timezone
+
+
+def codificar_cursor(fecha, objeto_id):
+    return f'{fecha.isoformat()}|{objeto_id}'
+
+
+def leer_cursor(valor):
+    """Devuelve (fecha, id) o None si el cursor no es válido"""
+    try:
+        fecha, objeto_id = valor.rsplit('|', 1)
+        fecha = datetime.fromisoformat(fecha)
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha, int(objeto_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+class PaginaCursor:
+    """Página de resultados con enlaces por cursor a la siguiente y anterior"""
+
+    def __init__(self, objetos, siguiente=None, anterior=None):
+        self.objetos = objetos
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+    def __bool__(self):
+        return bool(self.objetos)
+
+
+def paginar_por_cursor(queryset, despues=None, antes=None, tamano=25, campo='fecha_creacion'):
+    """Paginación keyset sobre (campo, id) descendente.
+
+    A diferencia de OFFSET, cada página es una consulta por rango sobre el
+    índice, así que el costo no depende de cuántas filas haya antes.
+    """
+    despues = leer_cursor(despues) if despues else None
+    antes = leer_cursor(antes) if antes else None
+
+    if antes:
+        fecha, objeto_id = antes
+        filas = list(queryset.filter(
+            Q(**{f'{campo}__gt': fecha}) | Q(**{campo: fecha, 'id__gt': objeto_id})
+        ).order_by(campo, 'id')[:tamano + 1])
+        hay_anterior = len(filas) > tamano
+        objetos = list(reversed(filas[:tamano]))
+        hay_siguiente = True
+    else:
+        if despues:
+            fecha, objeto_id = despues
+            queryset = queryset.filter(
+                Q(**{f'{campo}__lt': fecha}) | Q(**{campo: fecha, 'id__lt': objeto_id})
+            )
+        filas = list(queryset.order_by(f'-{campo}', '-id')[:tamano + 1])
+        hay_siguiente = len(filas) > tamano
+        objetos = filas[:tamano]
+        hay_anterior = despues is not None
+
+    if not objetos:
+        return PaginaCursor([])
+    primero, ultimo = objetos[0], objetos[-1]
+    return PaginaCursor(
+        objetos,
+        siguiente=codificar_cursor(getattr(ultimo, campo), ultimo.id) if hay_siguiente else None,
+        anterior=codificar_cursor(getattr(primero, campo), primero.id) if hay_anterior else None,
+    )
@@ -0,0 +1,43 @@
+"""Reporte Excel con openpyxl; se importa solo cuando el worker genera un Excel"""
+from decimal import Decimal
+from openpyxl import Workbook
+from .models import Pedido
+from .agregados import agregar_rango, nombres_platos
+from .reportes import COLUMNAS_REPORTE, filas_reporte, pedidos_del_reporte
+
+
+def escribir_reporte_excel(archivo, fecha_inicio=None, fecha_fin=None):
+    """Escribe el reporte Excel con openpyxl en modo write-only en un archivo binario abierto.
+
+    Las filas se escriben a medida que llegan de la base de datos y el resumen
+    se calcula durante el recorrido, sin una segunda consulta.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('Pedidos')
+    hoja.append(COLUMNAS_REPORTE)
+    cantidad, ventas = 0, Decimal('0.00')
+    for fila in filas_reporte(pedidos_del_reporte(fecha_inicio, fecha_fin)):
+        cantidad += 1
+        ventas += fila[-1]
+        hoja.append(fila)
+
+    resumen = libro.create_sheet('Resumen')
+    resumen.append(['Métrica', 'Valor'])
+    resumen.append(['Total Pedidos', cantidad])
+    resumen.append(['Total Ventas', ventas])
+
+    # Desgloses calculados por meses en paralelo (agregados.py)
+    desglose = agregar_rango(fecha_inicio, fecha_fin)
+    metodos = dict(Pedido.METODOS_PAGO)
+    platos = nombres_platos(desglose['por_plato'])
+    hojas = [
+        ('Por Día', ['Fecha', 'Pedidos', 'Ventas'], sorted(desglose['por_dia'].items()), lambda dia: dia),
+        ('Por Método de Pago', ['Método de Pago', 'Pedidos', 'Ventas'], sorted(desglose['por_metodo'].items()), lambda m: metodos.get(m, '-')),
+        ('Por Plato', ['Plato', 'Unidades', 'Importe'], sorted(desglose['por_plato'].items(), key=lambda p: -p[1][0]), lambda plato_id: platos.get(plato_id, '-')),
+    ]
+    for titulo, columnas, filas, etiqueta in hojas:
+        hoja = libro.create_sheet(titulo)
+        hoja.append(columnas)
+        for llave, (numero, importe) in filas:
+            hoja.append([etiqueta(llave), numero, importe])
+    libro.save(archivo)
@@ -0,0 +1,137 @@
+"""Reporte PDF con ReportLab; se importa solo cuando el worker genera un PDF"""
+from decimal import Decimal
+from django.db.models import Sum, Count
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+from .reportes import filas_reporte, pedidos_del_reporte
+
+
+# Diseño del PDF (puntos)
+MARGEN = 0.75 * inch
+ALTO_FILA = 14
+COLUMNAS_PDF = [('#', 0.7 * inch), ('Cliente', 2.2 * inch), ('Fecha', 1.5 * inch), ('Estado', 1.5 * inch), ('Total', 1.1 * inch)]
+FONDO_ENCABEZADO = colors.grey
+FONDO_FILAS = colors.beige
+
+
+class _PaginasPDF:
+    """Dibuja el reporte directamente en el canvas, un bloque fijo de filas por página.
+
+    Cada página repite el encabezado de la tabla y se dibuja completa de una
+    vez (fondo, líneas y un solo objeto de texto); no se arma ningún Table ni
+    lista de flowables, así que la memoria no depende del número de pedidos
+    más allá del contenido comprimido de cada página.
+    """
+
+    def __init__(self, destino, titulo):
+        self.canvas = canvas.Canvas(destino, pagesize=letter, pageCompression=1)
+        self.canvas.setTitle(titulo)
+        self.ancho, self.alto = letter
+        self.titulo = titulo
+        self.paginas = 0
+        self.y = None
+
+    def nueva_pagina(self):
+        if self.paginas:
+            self.canvas.showPage()
+        self.paginas += 1
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawRightString(self.ancho - MARGEN, MARGEN / 2, f'Página {self.paginas}')
+        self.y = self.alto - MARGEN
+        if self.paginas == 1:
+            self.canvas.setFont('Helvetica-Bold', 18)
+            self.canvas.drawCentredString(self.ancho / 2, self.y - 18, self.titulo)
+            self.y -= 36
+
+    def resumen(self, filas):
+        for etiqueta, valor in filas:
+            self.canvas.setFont('Helvetica-Bold', 10)
+            self.canvas.drawString(MARGEN, self.y - 12, etiqueta)
+            self.canvas.setFont('Helvetica', 10)
+            self.canvas.drawString(MARGEN + 3 * inch, self.y - 12, str(valor))
+            self.y -= 16
+        self.y -= 0.2 * inch
+
+    def _capacidad(self):
+        """Filas que caben en lo que queda de la página, descontando el encabezado"""
+        return int((self.y - MARGEN) // ALTO_FILA) - 1
+
+    def _bloque(self, filas):
+        c = self.canvas
+        ancho_total = sum(ancho for _, ancho in COLUMNAS_PDF)
+        arriba = self.y
+        abajo = arriba - ALTO_FILA * (len(filas) + 1)
+
+        c.setFillColor(FONDO_ENCABEZADO)
+        c.rect(MARGEN, arriba - ALTO_FILA, ancho_total, ALTO_FILA, stroke=0, fill=1)
+        c.setFillColor(FONDO_FILAS)
+        c.rect(MARGEN, abajo, ancho_total, arriba - ALTO_FILA - abajo, stroke=0, fill=1)
+
+        lineas = [(MARGEN, y, MARGEN + ancho_total, y) for y in range(int(arriba), int(abajo) - 1, -ALTO_FILA)]
+        x = MARGEN
+        for _, ancho in COLUMNAS_PDF:
+            lineas.append((x, arriba, x, abajo))
+            x += ancho
+        lineas.append((x, arriba, x, abajo))
+        c.setStrokeColor(colors.black)
+        c.lines(lineas)
+
+        texto = c.beginText()
+        for i, valores in enumerate([[nombre for nombre, _ in COLUMNAS_PDF]] + filas):
+            fuente, tamano = ('Helvetica-Bold', 9) if i == 0 else ('Helvetica', 8)
+            texto.setFillColor(colors.whitesmoke if i == 0 else colors.black)
+            texto.setFont(fuente, tamano)
+            base = arriba - ALTO_FILA * (i + 1) + 4
+            x = MARGEN
+            for valor, (_, ancho) in zip(valores, COLUMNAS_PDF):
+                valor = str(valor)[:40]
+                texto.setTextOrigin(x + (ancho - c.stringWidth(valor, fuente, tamano)) / 2, base)
+                texto.textOut(valor)
+                x += ancho
+        c.drawText(texto)
+        self.y = abajo
+
+    def tabla(self, filas):
+        bloque = []
+        capacidad = self._capacidad()
+        for fila in filas:
+            if len(bloque) == capacidad:
+                self._bloque(bloque)
+                self.nueva_pagina()
+                bloque, capacidad = [], self._capacidad()
+            bloque.append(fila)
+        self._bloque(bloque)
+
+    def guardar(self):
+        self.canvas.save()
+        return self.paginas
+
+
+def dibujar_pdf_pedidos(destino, filas, total_pedidos, total_ventas, titulo='Reporte de Pedidos'):
+    """Escribe el PDF en `destino` (ruta o archivo) a partir de filas
+    (id, cliente, fecha, estado, total). Devuelve el número de páginas."""
+    pdf = _PaginasPDF(destino, titulo)
+    pdf.nueva_pagina()
+    pdf.resumen([('Total de Pedidos', total_pedidos), ('Total de Ventas', f'${total_ventas}')])
+    pdf.tabla(filas)
+    return pdf.guardar()
+
+
+def filas_pdf(pedidos):
+    """Columnas del PDF a partir de la misma proyección del reporte Excel/CSV"""
+    for pedido_id, cliente, fecha, estado, _, _, _, total in filas_reporte(pedidos):
+        yield pedido_id, cliente, fecha[:10], estado, f'${total}'
+
+
+def escribir_reporte_pdf(archivo, fecha_inicio=None, fecha_fin=None):
+    """Escribe el reporte PDF completo (todas las filas) en un archivo binario abierto"""
+    pedidos = pedidos_del_reporte(fecha_inicio, fecha_fin)
+    resumen = pedidos.aggregate(cantidad=Count('id'), ventas=Sum('total'))
+    return dibujar_pdf_pedidos(
+        archivo,
+        filas_pdf(pedidos),
+        resumen['cantidad'],
+        resumen['ventas'] or Decimal('0.00'),
+    )
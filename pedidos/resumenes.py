@@ -0,0 +1,192 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from .models import Pedido, PedidoResumido, ItemPedido, VentaDiaria, PlatoVendidoDiario
+
+
+# Estados que suman ingresos y estados en los que los platos cuentan como vendidos
+ESTADOS_CON_INGRESO = ('entregado', 'listo')
+ESTADOS_CON_VENTA = ('confirmado', 'en_preparacion', 'listo', 'entregado')
+
+
+def rango_dia(fecha):
+    """Inicio y fin (aware) del día local, para filtrar por rango sobre el índice"""
+    inicio = timezone.make_aware(datetime.combine(fecha, time.min))
+    fin = timezone.make_aware(datetime.combine(fecha + timedelta(days=1), time.min))
+    return inicio, fin
+
+
+TRUNCAR_PERIODO = {'dia': TruncDay, 'semana': TruncWeek, 'mes': TruncMonth}
+
+
+def inicio_periodo(fecha, periodo):
+    """Primer día del período (día, semana que empieza el lunes, o mes) que contiene la fecha"""
+    if periodo == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_periodo(fecha, periodo):
+    if periodo == 'semana':
+        return fecha + timedelta(days=7)
+    if periodo == 'mes':
+        return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return fecha + timedelta(days=1)
+
+
+def serie_temporal(queryset, campo_fecha, campo_valor, inicio, fin, periodo='mes'):
+    """Suma de `campo_valor` por período entre las fechas `inicio` y `fin` (sin incluir).
+
+    Una sola consulta agrupada: filtra por un rango simple sobre `campo_fecha`
+    (usa el índice) y trunca en TIME_ZONE. Devuelve [(inicio_del_periodo,
+    total)] con todos los períodos del rango, en cero los que no tienen datos.
+    """
+    inicio = inicio_periodo(inicio, periodo)
+    campo = queryset.model._meta.get_field(campo_fecha)
+    if isinstance(campo, models.DateTimeField):
+        desde, hasta = rango_dia(inicio)[0], rango_dia(fin)[0]
+    else:
+        desde, hasta = inicio, fin
+    filas = queryset.filter(**{f'{campo_fecha}__gte': desde, f'{campo_fecha}__lt': hasta}).order_by().annotate(
+        periodo=TRUNCAR_PERIODO[periodo](campo_fecha, output_field=models.DateField())
+    ).values('periodo').annotate(suma=Sum(campo_valor))
+    totales = {fila['periodo']: fila['suma'] for fila in filas}
+
+    serie = []
+    fecha = inicio
+    while fecha < fin:
+        serie.append((fecha, totales.get(fecha) or Decimal('0.00')))
+        fecha = siguiente_periodo(fecha, periodo)
+    return serie
+
+
+def _ventas(pedidos, *agrupar):
+    return pedidos.exclude(estado='pendiente').order_by().values(*agrupar, 'estado', 'metodo_pago').annotate(
+        num=Count('id'), suma=Sum('total')
+    )
+
+
+def _platos(items, *agrupar):
+    return items.filter(pedido__estado__in=ESTADOS_CON_VENTA).order_by().values(*agrupar, 'plato').annotate(
+        unidades=Sum('cantidad')
+    )
+
+
+def aportes(pedido_ids):
+    """Lo que suma hoy cada pedido a los resúmenes, en dos consultas.
+
+    Devuelve {pedido_id: PedidoResumido sin guardar}; los pendientes, borrados
+    o inexistentes no aparecen porque no suman nada.
+    """
+    resultado = {}
+    for pedido_id, creado, estado, metodo_pago, total in Pedido.objects.filter(id__in=pedido_ids).exclude(
+        estado='pendiente'
+    ).values_list('id', 'fecha_creacion', 'estado', 'metodo_pago', 'total'):
+        resultado[pedido_id] = PedidoResumido(
+            pedido_id=pedido_id, fecha=timezone.localdate(creado), estado=estado,
+            metodo_pago=metodo_pago or '', total=total, platos={},
+        )
+    for fila in _platos(ItemPedido.objects.filter(pedido_id__in=list(resultado)), 'pedido_id'):
+        resultado[fila['pedido_id']].platos[str(fila['plato'])] = fila['unidades']
+    return resultado
+
+
+def _sumar(modelo, campos_clave, deltas):
+    """Suma `deltas` ({clave: {campo: diferencia}}) a las filas del resumen con F().
+
+    Crea en cero las filas que faltan (ignorando las que ya existen), aplica
+    todas las diferencias en un único UPDATE y borra las que quedaron en cero.
+    """
+    deltas = {clave: cambios for clave, cambios in deltas.items() if any(cambios.values())}
+    if not deltas:
+        return
+    condiciones = {clave: Q(**dict(zip(campos_clave, clave))) for clave in deltas}
+    filas = modelo.objects.filter(reduce(or_, condiciones.values()))
+    modelo.objects.bulk_create(
+        [modelo(**dict(zip(campos_clave, clave))) for clave in deltas], ignore_conflicts=True,
+    )
+    campos = next(iter(deltas.values())).keys()
+    filas.update(fecha_actualizacion=timezone.now(), **{
+        campo: F(campo) + Case(
+            *[When(condicion, then=Value(deltas[clave][campo])) for clave, condicion in condiciones.items()],
+            default=Value(0), output_field=modelo._meta.get_field(campo),
+        )
+        for campo in campos
+    })
+    filas.filter(cantidad=0).delete()
+
+
+def actualizar_resumenes(pedido_ids):
+    """Ajusta los resúmenes diarios con la diferencia de lo que suman estos pedidos.
+
+    El costo depende de los pedidos y platos tocados, no de cuántos pedidos
+    tiene el día. Las filas de PedidoResumido de estos pedidos quedan
+    bloqueadas hasta el final de la transacción: dos ajustes del mismo pedido
+    se aplican uno detrás del otro y el segundo parte de lo que guardó el primero.
+    """
+    pedido_ids = set(pedido_ids)
+    with transaction.atomic():
+        PedidoResumido.objects.bulk_create(
+            [PedidoResumido(pedido_id=pedido_id) for pedido_id in pedido_ids], ignore_conflicts=True,
+        )
+        anteriores = PedidoResumido.objects.select_for_update().filter(pedido_id__in=pedido_ids).in_bulk()
+        actuales = aportes(pedido_ids)
+
+        ventas = defaultdict(lambda: {'cantidad': 0, 'total': Decimal('0.00')})
+        platos = defaultdict(lambda: {'cantidad': 0})
+        for signo, resumidos in ((-1, anteriores.values()), (1, actuales.values())):
+            for resumido in resumidos:
+                if not resumido.estado:
+                    continue
+                venta = ventas[(resumido.fecha, resumido.estado, resumido.metodo_pago)]
+                venta['cantidad'] += signo
+                venta['total'] += signo * resumido.total
+                for plato_id, unidades in resumido.platos.items():
+                    platos[(resumido.fecha, int(plato_id))]['cantidad'] += signo * unidades
+        _sumar(VentaDiaria, ('fecha', 'estado', 'metodo_pago'), ventas)
+        _sumar(PlatoVendidoDiario, ('fecha', 'plato_id'), platos)
+
+        PedidoResumido.objects.filter(pedido_id__in=pedido_ids - set(actuales)).delete()
+        if actuales:
+            PedidoResumido.objects.bulk_update(
+                actuales.values(), ['fecha', 'estado', 'metodo_pago', 'total', 'platos'],
+            )
+
+
+def reconstruir_resumenes(tamano_lote=1000):
+    """Borra y vuelve a generar todos los resúmenes desde Pedido e ItemPedido"""
+    ventas = _ventas(Pedido.objects.annotate(dia=TruncDate('fecha_creacion')), 'dia')
+    platos = _platos(ItemPedido.objects.annotate(dia=TruncDate('pedido__fecha_creacion')), 'dia')
+    pedido_ids = Pedido.objects.exclude(estado='pendiente').order_by('id').values_list('id', flat=True)
+    with transaction.atomic():
+        # Los ajustes de pedidos ya resumidos esperan a que termine la reconstrucción
+        list(PedidoResumido.objects.select_for_update().values_list('pedido_id', flat=True))
+        PedidoResumido.objects.all().delete()
+        VentaDiaria.objects.all().delete()
+        PlatoVendidoDiario.objects.all().delete()
+        lote = []
+        for pedido_id in pedido_ids.iterator(chunk_size=tamano_lote):
+            lote.append(pedido_id)
+            if len(lote) == tamano_lote:
+                PedidoResumido.objects.bulk_create(aportes(lote).values())
+                lote = []
+        if lote:
+            PedidoResumido.objects.bulk_create(aportes(lote).values())
+        VentaDiaria.objects.bulk_create((
+            VentaDiaria(fecha=fila['dia'], estado=fila['estado'], metodo_pago=fila['metodo_pago'] or '',
+                        cantidad=fila['num'], total=fila['suma'] or 0)
+            for fila in ventas.iterator(chunk_size=tamano_lote)
+        ), batch_size=tamano_lote)
+        PlatoVendidoDiario.objects.bulk_create((
+            PlatoVendidoDiario(fecha=fila['dia'], plato_id=fila['plato'], cantidad=fila['unidades'])
+            for fila in platos.iterator(chunk_size=tamano_lote)
+        ), batch_size=tamano_lote)
+    return VentaDiaria.objects.count(), PlatoVendidoDiario.objects.count()
@@ -0,0 +1,65 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from menu.models import Categoria, Plato
+from reservas.models import Mesa
+from .carrito import get_almacen
+from .models import Eliminacion, Pedido, ItemPedido, marcar_resumenes
+
+
+# Los cambios se anotan y al confirmar la transacción se aplica a los
+# resúmenes diarios la diferencia de cada pedido y se invalidan los widgets
+# del dashboard. Las
+# actualizaciones en bloque (QuerySet.update) no disparan señales y llaman a
+# marcar_resumenes directamente.
+
+@receiver(post_save, sender=Pedido)
+def pedido_guardado(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_estado_guardado', None)
+    instance._estado_guardado = instance.estado
+    if instance.estado == 'pendiente' and (created or anterior == 'pendiente'):
+        return  # los pedidos pendientes no cuentan en los resúmenes
+    marcar_resumenes(pedido_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Pedido)
+def pedido_eliminado(sender, instance, **kwargs):
+    # Se resta lo que sumaba según PedidoResumido
+    marcar_resumenes(pedido_ids=[instance.pk])
+
+
+@receiver(post_save, sender=ItemPedido)
+@receiver(post_delete, sender=ItemPedido)
+def item_cambiado(sender, instance, **kwargs):
+    if ItemPedido.pedido.is_cached(instance) and instance.pedido.estado == 'pendiente':
+        return
+    marcar_resumenes(pedido_ids=[instance.pedido_id])
+
+
+# Eliminaciones para la sincronización de dispositivos (sincronizacion.py)
+
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Plato)
+@receiver(post_delete, sender=Mesa)
+def catalogo_eliminado(sender, instance, **kwargs):
+    Eliminacion.objects.create(modelo=sender._meta.model_name, objeto_id=instance.pk)
+
+
+@receiver(post_delete, sender=Pedido)
+def pedido_eliminado_sincronizacion(sender, instance, **kwargs):
+    Eliminacion.objects.create(modelo='pedido', objeto_id=instance.pk, mesero_id=instance.mesero_id)
+
+
+@receiver(post_save, sender=Pedido)
+def pedido_reasignado(sender, instance, created, **kwargs):
+    anterior = getattr(instance, '_mesero_guardado', None)
+    instance._mesero_guardado = instance.mesero_id
+    if not created and anterior is not None and anterior != instance.mesero_id:
+        Eliminacion.objects.create(modelo='pedido', objeto_id=instance.pk, mesero_id=anterior)
+
+
+@receiver(user_logged_in)
+def fusionar_carrito(sender, request, user, **kwargs):
+    """El carrito armado antes de iniciar sesión pasa al del usuario"""
+    if request is not None and hasattr(request, 'session'):
+        get_almacen(request).fusionar_anonimo(user)
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from menu.models import Categoria, Plato
+from reservas.models import Mesa
+from .models import Eliminacion, ItemPedido, Pedido
+
+
+# Margen hacia atrás al leer cambios: una transacción que empezó antes del
+# cursor pero confirmó después tiene fecha_actualizacion anterior a él. Los
+# dispositivos aplican los cambios por id, así que repetir filas no molesta.
+SOLAPE = timedelta(seconds=5)
+ESTADOS_ABIERTOS = ('confirmado', 'en_preparacion', 'listo')
+
+CATALOGO = {
+    'categorias': ('categoria', Categoria, ('id', 'nombre', 'descripcion', 'activa')),
+    'platos': ('plato', Plato, (
+        'id', 'nombre', 'descripcion', 'categoria_id', 'precio', 'disponible', 'tiempo_preparacion',
+        'disponibilidad__porciones',
+    )),
+    'mesas': ('mesa', Mesa, ('id', 'numero', 'capacidad', 'disponible', 'ubicacion')),
+}
+
+# Un plato también cambia cuando se agota o vuelve a tener stock (inventario.DisponibilidadPlato)
+ACTUALIZACION = {
+    'platos': Greatest(F('fecha_actualizacion'), Coalesce(F('disponibilidad__fecha_actualizacion'), F('fecha_actualizacion'))),
+}
+
+
+def codificar_cursor(fecha):
+    return fecha.isoformat()
+
+
+def leer_cursor(valor):
+    """Fecha del cursor o None si no es válido"""
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+def retencion():
+    """Tiempo que se guardan las eliminaciones; un cursor más viejo obliga a sincronizar todo"""
+    return timedelta(days=getattr(settings, 'SYNC_RETENCION_DIAS', 7))
+
+
+def _pedidos_del_usuario(usuario):
+    pedidos = Pedido.objects.exclude(estado='pendiente')
+    if usuario.es_administrador():
+        return pedidos
+    return pedidos.filter(mesero=usuario)
+
+
+def _pedidos(queryset):
+    pedidos = list(queryset.order_by('id').values(
+        'id', 'estado', 'cliente__username', 'metodo_pago', 'subtotal', 'impuesto', 'total', 'notas',
+        'fecha_creacion', 'fecha_actualizacion',
+    ))
+    items = {}
+    for item in ItemPedido.objects.filter(pedido_id__in=[p['id'] for p in pedidos]).order_by('id').values(
+        'pedido_id', 'plato_id', 'cantidad', 'precio_unitario', 'subtotal',
+    ):
+        items.setdefault(item.pop('pedido_id'), []).append(item)
+    for pedido in pedidos:
+        pedido['cliente'] = pedido.pop('cliente__username')
+        pedido['items'] = items.get(pedido['id'], [])
+    return pedidos
+
+
+def cambios_desde(usuario, cursor=None):
+    """Filas creadas, modificadas o eliminadas desde `cursor` para el dispositivo del usuario.
+
+    Sin cursor (o con uno anterior a la retención de eliminaciones) devuelve
+    una copia completa con `completo: True`: el dispositivo debe reemplazar
+    sus datos. El nuevo cursor se toma antes de leer, así que nada que cambie
+    durante la consulta queda afuera de la siguiente.
+    """
+    ahora = timezone.now()
+    completo = cursor is None or cursor < ahora - retencion()
+    desde = None if completo else cursor - SOLAPE
+
+    cambios, eliminados = {}, {}
+    for nombre, (modelo, clase, campos) in CATALOGO.items():
+        filas = clase.objects.all()
+        if desde:
+            filas = filas.alias(actualizado=ACTUALIZACION.get(nombre, F('fecha_actualizacion'))).filter(actualizado__gt=desde)
+        cambios[nombre] = list(filas.order_by('id').values(*campos))
+
+    pedidos = _pedidos_del_usuario(usuario)
+    if desde:
+        pedidos = pedidos.filter(fecha_actualizacion__gt=desde)
+    else:
+        pedidos = pedidos.filter(estado__in=ESTADOS_ABIERTOS)
+    cambios['pedidos'] = _pedidos(pedidos)
+
+    if not completo:
+        registros = Eliminacion.objects.filter(fecha__gt=desde)
+        if not usuario.es_administrador():
+            registros = registros.filter(~Q(modelo='pedido') | Q(mesero=usuario))
+        nombres = {modelo: nombre for nombre, (modelo, _, _) in CATALOGO.items()}
+        nombres['pedido'] = 'pedidos'
+        for modelo, objeto_id in registros.values_list('modelo', 'objeto_id'):
+            eliminados.setdefault(nombres[modelo], set()).add(objeto_id)
+    # Si una fila salió y volvió a entrar en el intervalo, vale su estado actual
+    for nombre in list(eliminados):
+        vigentes = {fila['id'] for fila in cambios[nombre]}
+        eliminados[nombre] = sorted(eliminados[nombre] - vigentes)
+
+    return {
+        'cursor': codificar_cursor(ahora),
+        'completo': completo,
+        'cambios': cambios,
+        'eliminados': {nombre: eliminados.get(nombre, []) for nombre in [*CATALOGO, 'pedidos']},
+    }
+
+
+def purgar_eliminaciones():
+    """Borra las eliminaciones más viejas que la retención. Devuelve cuántas borró"""
+    borradas, _ = Eliminacion.objects.filter(fecha__lt=timezone.now() - retencion()).delete()
+    return borradas
@@ -1,3 +1,929 @@
-from django.test import TestCase
+import json
+import time
+from unittest import mock
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from asgiref.sync import async_to_sync
+import io
+import tempfile
+import os
+import subprocess
+import sys
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from menu.models import Categoria, Ingrediente, Plato, PlatoIngrediente
+from inventario.models import DisponibilidadPlato, StockInventario
+from reservas.models import Mesa
+from usuarios.models import Usuario
+from .models import Pedido, ItemPedido, totales_diferidos
+from .estados import cambiar_estado_en_bloque
+from .eventos import cursor_inicial, stream_cambios
+from .paginacion import codificar_cursor
+from .cocina import ColaCocina, estimar_entrega, estimar_entregas, simular_cola
+from .models import PedidoResumido, VentaDiaria, PlatoVendidoDiario
+from .resumenes import reconstruir_resumenes, serie_temporal
+from .reportes_excel import escribir_reporte_excel
+from .reportes_pdf import escribir_reporte_pdf
+from .trabajos import GRACIA, procesar_siguiente, ruta_artefacto
+from .agregados import agregar_rango, nombres_platos, particiones_mensuales
+from .models import TrabajoReporte
 
-# Create your tests here.
+
+class TotalesIncrementalesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        precios = ['10.50', '3.33', '12.50', '0.99', '7.25', '20.00']
+        cls.platos = [
+            Plato.objects.create(nombre=f'Plato {i}', descripcion='-', categoria=categoria, precio=Decimal(p))
+            for i, p in enumerate(precios)
+        ]
+
+    def _assert_conciliado(self, pedido):
+        pedido.refresh_from_db()
+        esperado = (pedido.subtotal, pedido.impuesto, pedido.total)
+        pedido.calcular_total()
+        self.assertEqual(esperado, (pedido.subtotal, pedido.impuesto, pedido.total))
+
+    def test_diferencias_coinciden_con_calcular_total(self):
+        pedido = Pedido.objects.create(cliente=self.cliente)
+        items = [
+            ItemPedido.objects.create(pedido=pedido, plato=plato, cantidad=i + 1, precio_unitario=plato.precio)
+            for i, plato in enumerate(self.platos)
+        ]
+        self._assert_conciliado(pedido)
+
+        item = ItemPedido.objects.get(pk=items[2].pk)
+        item.cantidad = 7
+        item.save()
+        self._assert_conciliado(pedido)
+
+        ItemPedido.objects.get(pk=items[0].pk).delete()
+        self._assert_conciliado(pedido)
+        self.assertTrue(pedido.totales_conciliados())
+
+    def test_guardar_item_usa_un_solo_update_del_pedido(self):
+        pedido = Pedido.objects.create(cliente=self.cliente)
+        for plato in self.platos:
+            ItemPedido.objects.create(pedido=pedido, plato=plato, cantidad=1, precio_unitario=plato.precio)
+        item = ItemPedido.objects.filter(pedido=pedido).first()
+        item.cantidad = 3
+        with CaptureQueriesContext(connection) as ctx:
+            item.save()
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_modo_masivo_recalcula_una_vez(self):
+        pedido = Pedido.objects.create(cliente=self.cliente)
+        with totales_diferidos(pedido):
+            for plato in self.platos:
+                ItemPedido.objects.create(pedido=pedido, plato=plato, cantidad=2, precio_unitario=plato.precio)
+            self.assertEqual(Pedido.objects.get(pk=pedido.pk).total, Decimal('0.00'))
+        self._assert_conciliado(pedido)
+
+
+class CarritoSesionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x', email='c@example.com')
+        categoria = Categoria.objects.create(nombre='Principales')
+        cls.plato = Plato.objects.create(nombre='Bandeja', descripcion='-', categoria=categoria, precio=Decimal('12.50'))
+        cls.otro = Plato.objects.create(nombre='Ajiaco', descripcion='-', categoria=categoria, precio=Decimal('9.90'))
+
+    def test_editar_carrito_no_escribe_pedidos(self):
+        self.client.post(reverse('menu:agregar_carrito', args=[self.plato.id]), {'cantidad': 2})
+        self.client.post(reverse('menu:agregar_carrito', args=[self.otro.id]), {'cantidad': 1})
+        self.client.post(reverse('pedidos:actualizar_carrito', args=[self.plato.id]), {'cantidad': 3})
+        self.client.get(reverse('pedidos:eliminar_item', args=[self.otro.id]))
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(ItemPedido.objects.exists())
+
+        respuesta = self.client.get(reverse('pedidos:carrito'))
+        self.assertEqual(respuesta.context['carrito_count'], 1)
+        self.assertEqual(respuesta.context['pedido'].subtotal, Decimal('37.50'))
+
+    def test_checkout_crea_el_pedido_confirmado(self):
+        self.client.post(reverse('menu:agregar_carrito', args=[self.plato.id]), {'cantidad': 2})
+        self.client.force_login(self.cliente)  # el carrito anónimo se conserva al iniciar sesión
+        self.client.post(reverse('pedidos:checkout'), {'metodo_pago': 'efectivo'})
+
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.estado, 'confirmado')
+        self.assertEqual(pedido.cliente, self.cliente)
+        self.assertEqual(pedido.items.get().cantidad, 2)
+        self.assertTrue(pedido.totales_conciliados())
+        self.assertEqual(len(self.client.session.get('carrito', {})), 0)
+
+    @override_settings(CARRITO_ALMACEN='pedidos.carrito.AlmacenCache')
+    def test_carrito_en_cache_se_fusiona_al_iniciar_sesion(self):
+        cache.clear()
+        self.client.force_login(self.cliente)
+        self.client.post(reverse('menu:agregar_carrito', args=[self.plato.id]), {'cantidad': 1})
+        self.client.logout()
+
+        self.client.post(reverse('menu:agregar_carrito', args=[self.plato.id]), {'cantidad': 2})
+        self.client.post(reverse('menu:agregar_carrito', args=[self.otro.id]), {'cantidad': 1})
+        self.client.force_login(self.cliente)
+
+        respuesta = self.client.get(reverse('pedidos:carrito'))
+        self.assertEqual(respuesta.context['carrito_count'], 2)
+        self.assertEqual(respuesta.context['pedido'].subtotal, Decimal('47.40'))
+        self.assertNotIn('carrito_anonimo', self.client.session)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('pedidos:carrito')).context['carrito_count'], 0)
+
+
+class EventosPedidosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mesero = Usuario.objects.create_user(username='mesero', password='x', rol='mesero')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+
+    @staticmethod
+    async def _leer(respuesta):
+        return [parte async for parte in respuesta.streaming_content]
+
+    def _eventos(self, **params):
+        respuesta = self.client.get(reverse('pedidos:eventos_pedidos'), params)
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        contenido = b''.join(async_to_sync(self._leer)(respuesta)).decode()
+        ids = [linea[4:] for linea in contenido.splitlines() if linea.startswith('id: ')]
+        datos = [linea[6:] for linea in contenido.splitlines() if linea.startswith('data: ')]
+        return ids, datos
+
+    def test_emite_solo_cambios_desde_el_cursor(self):
+        self.client.force_login(self.mesero)
+        ids, datos = self._eventos()
+        self.assertEqual(datos, [])
+        cursor = ids[-1]
+
+        pedido = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        Pedido.objects.create(cliente=self.cliente)  # pendiente: no se emite
+        ids, datos = self._eventos(cursor=cursor)
+        self.assertEqual(len(datos), 1)
+        self.assertIn('"estado": "confirmado"', datos[0])
+
+        pedido.estado = 'listo'
+        pedido.save()
+        _, datos = self._eventos(cursor=ids[-1])
+        self.assertEqual(len(datos), 1)
+        self.assertIn('"estado": "listo"', datos[0])
+
+    def test_pedido_confirmado_tarde_se_emite_igual(self):
+        self.client.force_login(self.mesero)
+        posterior = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        ids, _ = self._eventos(cursor=codificar_cursor(posterior.fecha_actualizacion - timedelta(microseconds=1), 0))
+        # Transacción que guardó antes que `posterior` pero confirmó después de emitirlo
+        tardio = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        Pedido.objects.filter(pk=tardio.pk).update(fecha_actualizacion=posterior.fecha_actualizacion - timedelta(seconds=1))
+        _, datos = self._eventos(cursor=ids[-1])
+        self.assertEqual([json.loads(d)['id'] for d in datos], [tardio.id, posterior.id])
+
+    @override_settings(PEDIDOS_SSE_INTERVALO=0.01, PEDIDOS_SSE_DURACION=0.1)
+    def test_no_repite_pedidos_dentro_de_la_conexion(self):
+        pedido = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+
+        async def leer():
+            return [parte async for parte in stream_cambios(cursor_inicial(), continuo=True)]
+
+        eventos = [parte for parte in async_to_sync(leer)() if parte.startswith('id: ') and 'data: ' in parte]
+        self.assertEqual(len(eventos), 1)
+        self.assertIn(f'"id": {pedido.id}', eventos[0])
+
+    def test_requiere_mesero_o_administrador(self):
+        self.client.force_login(self.cliente)
+        respuesta = self.client.get(reverse('pedidos:eventos_pedidos'))
+        self.assertEqual(respuesta.status_code, 302)
+
+
+class PaginacionCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        Pedido.objects.bulk_create([Pedido(cliente=cls.cliente, estado='confirmado') for _ in range(60)])
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        self.client.force_login(self.admin)
+        vistos, despues = [], None
+        while True:
+            params = {'despues': despues} if despues else {}
+            with CaptureQueriesContext(connection) as ctx:
+                respuesta = self.client.get(reverse('pedidos:lista_pedidos'), params)
+            pagina = respuesta.context['pagina']
+            vistos.extend(p.id for p in pagina)
+            # sesión + usuario + una consulta de pedidos (con cliente y mesero en JOIN)
+            self.assertLessEqual(len(ctx.captured_queries), 3)
+            despues = pagina.siguiente
+            if not despues:
+                break
+        self.assertEqual(sorted(vistos, reverse=True), vistos)
+        self.assertEqual(len(set(vistos)), 60)
+
+        anterior = self.client.get(reverse('pedidos:lista_pedidos'), {'antes': pagina.anterior}).context['pagina']
+        self.assertEqual([p.id for p in anterior], vistos[25:50])
+
+
+class EstadosEnBloqueTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mesero = Usuario.objects.create_user(username='mesero', password='x', rol='mesero')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+
+    def test_transiciones_declaradas(self):
+        self.assertEqual(Pedido.TRANSICIONES['cancelado'], set())
+        self.assertEqual(Pedido.TRANSICIONES['entregado'], set())
+        self.assertIn('listo', Pedido.TRANSICIONES['confirmado'])
+        self.assertIn('cancelado', Pedido.TRANSICIONES['en_preparacion'])
+        self.assertNotIn('confirmado', Pedido.TRANSICIONES['listo'])
+
+    def test_lote_en_dos_consultas_con_resultado_por_pedido(self):
+        listos = Pedido.objects.bulk_create([Pedido(cliente=self.cliente, estado='listo') for _ in range(20)])
+        cancelado = Pedido.objects.create(cliente=self.cliente, estado='cancelado')
+        ids = [p.id for p in listos] + [cancelado.id, 999999]
+
+        with CaptureQueriesContext(connection) as ctx:
+            resultados = cambiar_estado_en_bloque(ids, 'entregado')
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertTrue(all(resultados[p.id][0] for p in listos))
+        self.assertFalse(resultados[cancelado.id][0])
+        self.assertFalse(resultados[999999][0])
+        self.assertEqual(
+            Pedido.objects.filter(estado='entregado', fecha_entrega__isnull=False).count(), 20
+        )
+
+    def test_vista_responde_json(self):
+        pedido = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        self.client.force_login(self.mesero)
+        respuesta = self.client.post(
+            reverse('pedidos:actualizar_estado_en_bloque'),
+            {'pedidos': [pedido.id], 'estado': 'en_preparacion'},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(respuesta.json()['resultados'], [
+            {'id': pedido.id, 'ok': True, 'mensaje': 'Actualizado a En Preparación'}
+        ])
+
+    def test_vista_de_un_pedido_valida_la_transicion(self):
+        entregado = Pedido.objects.create(cliente=self.cliente, estado='entregado')
+        confirmado = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        self.client.force_login(self.mesero)
+
+        self.client.post(reverse('pedidos:actualizar_estado', args=[entregado.id]), {'estado': 'confirmado'})
+        self.client.post(reverse('pedidos:actualizar_estado', args=[confirmado.id]), {'estado': 'en_preparacion'})
+        entregado.refresh_from_db()
+        confirmado.refresh_from_db()
+        self.assertEqual(entregado.estado, 'entregado')
+        self.assertEqual(confirmado.estado, 'en_preparacion')
+        self.assertIsNotNone(confirmado.fecha_preparacion)
+        self.assertEqual(
+            [valor for valor, _ in confirmado.estados_siguientes()], ['en_preparacion', 'listo', 'entregado', 'cancelado']
+        )
+
+
+class ColaCocinaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        cls.rapido = Plato.objects.create(nombre='Rápido', descripcion='-', categoria=categoria, precio=1, tiempo_preparacion=10)
+        cls.lento = Plato.objects.create(nombre='Lento', descripcion='-', categoria=categoria, precio=1, tiempo_preparacion=40)
+
+    def test_simulacion_reparte_entre_estaciones(self):
+        listos, _ = simular_cola([(1, 30), (2, 10), (3, 10), (4, 5)], estaciones=2)
+        self.assertEqual(listos, {1: 30, 2: 10, 3: 20, 4: 25})
+
+    def test_incremental_igual_a_simulacion_completa(self):
+        ordenes = [(i, float(5 + i % 7)) for i in range(300)]
+        cola = ColaCocina()
+        cola.estimar(ordenes[:250], 3, 'base')
+        cambiadas = ordenes[:100] + [(100, 60.0)] + ordenes[101:]
+        self.assertEqual(cola.estimar(cambiadas, 3, 'base'), simular_cola(cambiadas, 3)[0])
+
+    def test_estima_con_el_plato_mas_lento(self):
+        con_items = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        ItemPedido.objects.create(pedido=con_items, plato=self.rapido, cantidad=1, precio_unitario=1)
+        ItemPedido.objects.create(pedido=con_items, plato=self.lento, cantidad=1, precio_unitario=1)
+        segundo = Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        ItemPedido.objects.create(pedido=segundo, plato=self.rapido, cantidad=2, precio_unitario=1)
+        Pedido.objects.create(cliente=self.cliente, estado='entregado')
+
+        estimaciones = estimar_entregas(estaciones=1)
+        self.assertEqual(set(estimaciones), {con_items.id, segundo.id})
+        diferencia = estimaciones[segundo.id] - estimaciones[con_items.id]
+        self.assertEqual(diferencia.total_seconds(), 10 * 60)
+
+    def test_cientos_de_pedidos_en_una_consulta(self):
+        Pedido.objects.bulk_create([Pedido(cliente=self.cliente, estado='confirmado') for _ in range(300)])
+        with self.assertNumQueries(1):
+            estimaciones = estimar_entregas(estaciones=4)
+        self.assertEqual(len(estimaciones), 300)
+
+    def test_pedido_nuevo_solo_simula_esa_orden(self):
+        ordenes = [(i, float(10 + i % 30)) for i in range(500)]
+        cola = ColaCocina()
+        cola.estimar(ordenes, 4, 'base')
+        ordenes.append((500, 12.0))
+        with mock.patch('pedidos.cocina.simular_cola', wraps=simular_cola) as simular:
+            listos = cola.estimar(ordenes, 4, 'base')
+        self.assertEqual(simular.call_count, 1)
+        self.assertEqual(listos, simular_cola(ordenes, 4)[0])
+
+    def test_guardar_el_pedido_no_reinicia_su_preparacion(self):
+        pedido = Pedido.objects.create(
+            cliente=self.cliente, estado='en_preparacion', fecha_preparacion=timezone.now() - timedelta(minutes=25)
+        )
+        ItemPedido.objects.create(pedido=pedido, plato=self.lento, cantidad=1, precio_unitario=1)
+        pedido.notas = 'Sin cebolla'
+        pedido.save()
+
+        restante = estimar_entregas(estaciones=1)[pedido.id] - timezone.now()
+        self.assertAlmostEqual(restante.total_seconds(), 15 * 60, delta=60)
+
+    def test_detalle_simula_solo_las_ordenes_anteriores(self):
+        pedidos = [Pedido.objects.create(cliente=self.cliente, estado='confirmado') for _ in range(3)]
+        with mock.patch('pedidos.cocina._cola', ColaCocina()), \
+                mock.patch('pedidos.cocina.simular_cola', wraps=simular_cola) as simular:
+            hora = estimar_entrega(pedidos[1], estaciones=1)
+            self.assertEqual([pedido_id for pedido_id, _ in simular.call_args.args[0]], [pedidos[0].id, pedidos[1].id])
+            self.assertEqual(hora, estimar_entregas(estaciones=1)[pedidos[1].id])
+            # Con la simulación del minuto ya hecha no vuelve a consultar
+            with self.assertNumQueries(0):
+                self.assertEqual(estimar_entrega(pedidos[1], estaciones=1), hora)
+
+
+class ResumenesDiariosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        cls.plato = Plato.objects.create(nombre='Sopa', descripcion='-', categoria=categoria, precio=Decimal('10.00'))
+
+    def setUp(self):
+        cache.clear()
+
+    def _pedido(self, estado, cantidad=1, metodo_pago='efectivo'):
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = Pedido.objects.create(cliente=self.cliente, estado=estado, metodo_pago=metodo_pago)
+            ItemPedido.objects.create(pedido=pedido, plato=self.plato, cantidad=cantidad, precio_unitario=self.plato.precio)
+        return pedido
+
+    def _resumen(self):
+        ventas = {
+            (v.estado, v.metodo_pago): (v.cantidad, v.total)
+            for v in VentaDiaria.objects.all()
+        }
+        platos = {p.plato_id: p.cantidad for p in PlatoVendidoDiario.objects.all()}
+        return ventas, platos
+
+    def test_se_mantienen_al_cambiar_de_estado(self):
+        pedido = self._pedido('confirmado', cantidad=2)
+        self._pedido('listo', cantidad=1, metodo_pago='tarjeta')
+        self._pedido('pendiente', cantidad=5)
+        ventas, platos = self._resumen()
+        self.assertEqual(ventas[('confirmado', 'efectivo')], (1, Decimal('23.80')))
+        self.assertEqual(platos, {self.plato.id: 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cambiar_estado_en_bloque([pedido.id], 'cancelado')
+        ventas, platos = self._resumen()
+        self.assertNotIn(('confirmado', 'efectivo'), ventas)
+        self.assertEqual(ventas[('cancelado', 'efectivo')][0], 1)
+        self.assertEqual(platos, {self.plato.id: 1})
+
+        incremental = self._resumen()
+        reconstruir_resumenes()
+        self.assertEqual(self._resumen(), incremental)
+
+    def test_ajuste_al_confirmar_con_costo_constante(self):
+        consultas = []
+        for pedidos_del_dia in (1, 20):
+            for _ in range(pedidos_del_dia - 1):
+                self._pedido('entregado')
+            pedido = self._pedido('confirmado')
+            with CaptureQueriesContext(connection) as ctx:
+                with self.captureOnCommitCallbacks(execute=True):
+                    cambiar_estado_en_bloque([pedido.id], 'listo')
+            consultas.append(len(ctx.captured_queries))
+        self.assertEqual(consultas[0], consultas[1])
+        # cambio de estado + ajuste del pedido: bloqueo de su fila, 2 consultas de lo
+        # que suma, filas de ventas (crear, sumar, borrar vacías) y guardar lo que suma
+        self.assertLessEqual(consultas[1], 12)
+        self.assertEqual(PedidoResumido.objects.get(pedido_id=pedido.id).estado, 'listo')
+        self.assertEqual(self._resumen()[0][('listo', 'efectivo')][0], 2)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('SUM("pedidos_pedido"."total")', sql)  # no vuelve a agregar el día
+
+    def test_diferencias_de_items_y_borrados(self):
+        pedido = self._pedido('confirmado', cantidad=2)
+        otro = self._pedido('entregado', cantidad=1)
+        item = pedido.items.get()
+        item.cantidad = 5
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        ventas, platos = self._resumen()
+        self.assertEqual(platos, {self.plato.id: 6})
+        self.assertEqual(ventas[('confirmado', 'efectivo')], (1, Decimal('59.50')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.delete()
+        ventas, platos = self._resumen()
+        self.assertNotIn(('confirmado', 'efectivo'), ventas)
+        self.assertEqual(platos, {self.plato.id: 1})
+        self.assertFalse(PedidoResumido.objects.filter(pedido_id=pedido.id).exists())
+
+        incremental = self._resumen()
+        reconstruir_resumenes()
+        self.assertEqual(self._resumen(), incremental)
+        self.assertEqual(list(PedidoResumido.objects.values_list('pedido_id', flat=True)), [otro.id])
+
+    def test_dashboard_lee_solo_los_resumenes(self):
+        self._pedido('entregado', cantidad=3)
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('pedidos:dashboard'))
+        tablas = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('"pedidos_pedido"', tablas)
+        self.assertNotIn('"pedidos_itempedido"', tablas)
+        self.assertEqual(respuesta.context['total_pedidos'], 1)
+        self.assertEqual(respuesta.context['ventas_hoy'], Decimal('35.70'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.client.get(reverse('pedidos:datos_grafico', args=['platos'])).json()['datos']
+        tablas = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('"pedidos_itempedido"', tablas)
+        self.assertEqual(datos, [{'plato__nombre': 'Sopa', 'total_vendido': 3}])
+
+
+class SerieTemporalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Usuario.objects.create_user(username='cliente', password='x')
+        tz = timezone.get_current_timezone()
+        fechas = [
+            datetime(2025, 1, 31, 23, 30, tzinfo=tz),  # ya es 1 de febrero en UTC
+            datetime(2025, 3, 1, 0, 15, tzinfo=tz),
+            datetime(2025, 3, 20, 12, 0, tzinfo=tz),
+        ]
+        for fecha in fechas:
+            pedido = Pedido.objects.create(cliente=cliente, estado='entregado', total=Decimal('10.00'))
+            Pedido.objects.filter(pk=pedido.pk).update(fecha_creacion=fecha)
+
+    def test_meses_calendario_con_ceros_en_una_consulta(self):
+        with CaptureQueriesContext(connection) as ctx:
+            serie = serie_temporal(
+                Pedido.objects.all(), 'fecha_creacion', 'total', date(2024, 12, 1), date(2025, 5, 1)
+            )
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(serie, [
+            (date(2024, 12, 1), Decimal('0.00')),
+            (date(2025, 1, 1), Decimal('10.00')),
+            (date(2025, 2, 1), Decimal('0.00')),
+            (date(2025, 3, 1), Decimal('20.00')),
+            (date(2025, 4, 1), Decimal('0.00')),
+        ])
+
+    def test_mismo_helper_por_dia_y_semana(self):
+        semanas = serie_temporal(Pedido.objects.all(), 'fecha_creacion', 'total', date(2025, 1, 27), date(2025, 2, 10), 'semana')
+        self.assertEqual(semanas, [(date(2025, 1, 27), Decimal('10.00')), (date(2025, 2, 3), Decimal('0.00'))])
+        dias = serie_temporal(Pedido.objects.all(), 'fecha_creacion', 'total', date(2025, 2, 28), date(2025, 3, 2), 'dia')
+        self.assertEqual(dias, [(date(2025, 2, 28), Decimal('0.00')), (date(2025, 3, 1), Decimal('10.00'))])
+
+
+class CacheDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def _cargar(self):
+        respuesta = self.client.get(reverse('pedidos:dashboard'))
+        return respuesta, (int(respuesta['X-Cache-Hits']), int(respuesta['X-Cache-Misses']))
+
+    def _comprobar_invalidacion(self):
+        self.assertEqual(self._cargar()[1], (0, 1))
+        self.assertEqual(self._cargar()[1], (1, 0))
+
+        # Un pedido pendiente no afecta los widgets
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido = Pedido.objects.create(cliente=self.cliente)
+        self.assertEqual(self._cargar()[1], (1, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.estado = 'entregado'
+            pedido.save()
+        respuesta, contadores = self._cargar()
+        self.assertEqual(contadores, (0, 1))
+        self.assertEqual(respuesta.context['total_pedidos'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pedido.objects.filter(pk=pedido.pk).delete()
+        respuesta, contadores = self._cargar()
+        self.assertEqual(contadores, (0, 1))
+        self.assertEqual(respuesta.context['total_pedidos'], 0)
+
+    def test_invalidacion_con_locmem(self):
+        self._comprobar_invalidacion()
+
+    def test_invalidacion_con_cache_en_archivos(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directorio,
+            }}):
+                self._comprobar_invalidacion()
+
+
+class DatosGraficoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            Pedido.objects.create(cliente=self.cliente, estado='entregado', total=Decimal('50.00'))
+
+    def test_etag_y_last_modified(self):
+        url = reverse('pedidos:datos_grafico', args=['estados'])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.json()['datos'], [{'estado': 'entregado', 'cantidad': 1, 'etiqueta': 'Entregado'}])
+        self.assertIn('Last-Modified', respuesta)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Pedido.objects.create(cliente=self.cliente, estado='cancelado')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+    def test_rango_y_periodo(self):
+        hoy = timezone.localdate()
+        url = reverse('pedidos:datos_grafico', args=['ingresos'])
+        datos = self.client.get(url, {'desde': hoy.isoformat(), 'hasta': hoy.isoformat(), 'periodo': 'dia'}).json()['datos']
+        self.assertEqual(datos, [{'periodo': hoy.isoformat(), 'total': 50.0}])
+        self.assertEqual(len(self.client.get(url).json()['datos']), 12)
+        # Con un solo límite se respeta y se completa el otro
+        ayer = hoy - timedelta(days=1)
+        datos = self.client.get(url, {'desde': ayer.isoformat(), 'periodo': 'dia'}).json()['datos']
+        self.assertEqual(datos, [{'periodo': ayer.isoformat(), 'total': 0.0}, {'periodo': hoy.isoformat(), 'total': 50.0}])
+        datos = self.client.get(url, {'hasta': ayer.isoformat()}).json()['datos']
+        self.assertEqual(len(datos), 12)
+        self.assertEqual(datos[-1]['periodo'], ayer.replace(day=1).isoformat())
+        self.assertEqual(self.client.get(url, {'desde': 'ayer'}).status_code, 400)
+
+
+class ReporteStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        clientes = [Usuario.objects.create_user(username=f'cliente{i}', password='x') for i in range(3)]
+        Pedido.objects.bulk_create([
+            Pedido(cliente=clientes[i % 3], estado='entregado', metodo_pago='efectivo', total=Decimal('10.50'))
+            for i in range(30)
+        ] + [Pedido(cliente=clientes[0])])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_csv_en_streaming_sin_consultas_por_fila(self):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse('pedidos:generar_reporte', args=['csv']))
+            contenido = b''.join(respuesta.streaming_content).decode('utf-8-sig')
+        self.assertTrue(respuesta.streaming)
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        lineas = contenido.splitlines()
+        self.assertEqual(lineas[0].split(',')[:2], ['ID', 'Cliente'])
+        self.assertEqual(len(lineas), 1 + 30 + 3)
+        self.assertEqual(lineas[-1], 'Total Ventas,315.00')
+
+    def test_excel_con_hoja_de_resumen(self):
+        from openpyxl import load_workbook
+        archivo = io.BytesIO()
+        escribir_reporte_excel(archivo)
+        libro = load_workbook(archivo, read_only=True)
+        self.assertEqual(libro.sheetnames, ['Pedidos', 'Resumen', 'Por Día', 'Por Método de Pago', 'Por Plato'])
+        self.assertEqual(len(list(libro['Pedidos'].values)), 31)
+        resumen = list(libro['Resumen'].values)
+        self.assertEqual(resumen[1], ('Total Pedidos', 30))
+        self.assertEqual(resumen[2][1], 315)
+
+
+class ReportePdfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        clientes = [Usuario.objects.create_user(username=f'cliente{i}', password='x') for i in range(5)]
+        Pedido.objects.bulk_create([
+            Pedido(cliente=clientes[i % 5], estado='entregado', total=Decimal('12.00')) for i in range(120)
+        ])
+
+    def test_pdf_completo_sin_tope_ni_consultas_por_fila(self):
+        archivo = io.BytesIO()
+        with CaptureQueriesContext(connection) as ctx:
+            escribir_reporte_pdf(archivo)
+        # resumen + una consulta con el cliente en JOIN
+        self.assertEqual(len(ctx.captured_queries), 2)
+        contenido = archivo.getvalue()
+        self.assertTrue(contenido.startswith(b'%PDF'))
+        self.assertEqual(contenido.count(b'/Type /Page\n'), 3)
+
+    def test_paginas_en_bloques_fijos(self):
+        from .reportes_pdf import dibujar_pdf_pedidos
+        archivo = io.BytesIO()
+        filas = ((i, 'cliente', '01/01/2025', 'Entregado', '$1.00') for i in range(500))
+        paginas = dibujar_pdf_pedidos(archivo, filas, 500, Decimal('500.00'))
+        self.assertEqual(paginas, 11)
+        self.assertEqual(archivo.getvalue().count(b'/Type /Page\n'), paginas)
+
+
+class ColaReportesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin', password='x', rol='administrador')
+        cls.cliente = Usuario.objects.create_user(username='cliente', password='x')
+        Pedido.objects.create(cliente=cls.cliente, estado='entregado', total=Decimal('20.00'))
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(REPORTES_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.client.force_login(self.admin)
+
+    def _pedir(self):
+        hoy = timezone.localdate().isoformat()
+        return self.client.get(reverse('pedidos:generar_reporte', args=['pdf']), {'fecha_inicio': hoy, 'fecha_fin': hoy})
+
+    def test_encola_reutiliza_e_invalida(self):
+        respuesta = self._pedir()
+        trabajo = TrabajoReporte.objects.get()
+        self.assertRedirects(respuesta, reverse('pedidos:estado_reporte', args=[trabajo.id]))
+        # Un segundo pedido igual se une al mismo trabajo
+        self._pedir()
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+        self.assertEqual(procesar_siguiente().estado, 'listo')
+        self.assertIsNone(procesar_siguiente())
+        trabajo.refresh_from_db()
+        self.assertRedirects(self._pedir(), reverse('pedidos:descargar_reporte', args=[trabajo.id]), fetch_redirect_response=False)
+        descarga = self.client.get(reverse('pedidos:descargar_reporte', args=[trabajo.id]))
+        self.assertTrue(b''.join(descarga.streaming_content).startswith(b'%PDF'))
+        descarga.close()
+
+        # Un pedido nuevo en el rango invalida el archivo
+        Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        self._pedir()
+        self.assertEqual(TrabajoReporte.objects.count(), 2)
+        procesar_siguiente()
+        anterior = ruta_artefacto(trabajo)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'reemplazado')
+        # Durante la gracia el enlace anterior sigue descargando
+        self.assertTrue(anterior.exists())
+        descarga = self.client.get(reverse('pedidos:descargar_reporte', args=[trabajo.id]))
+        self.assertEqual(descarga.status_code, 200)
+        descarga.close()
+
+        TrabajoReporte.objects.filter(pk=trabajo.pk).update(fecha_actualizacion=timezone.now() - GRACIA)
+        Pedido.objects.create(cliente=self.cliente, estado='confirmado')
+        self._pedir()
+        procesar_siguiente()
+        self.assertFalse(anterior.exists())
+        self.assertEqual(self.client.get(reverse('pedidos:descargar_reporte', args=[trabajo.id])).status_code, 404)
+
+    def test_renueva_la_reserva_mientras_genera(self):
+        self._pedir()
+
+        def escribir(archivo, desde, hasta):
+            time.sleep(0.2)
+
+        with mock.patch('pedidos.trabajos.LATIDO', timedelta(seconds=0.02)), \
+                mock.patch('pedidos.trabajos._renovar_reserva') as renovar, \
+                mock.patch('pedidos.trabajos.cargar_escritor', return_value=escribir):
+            trabajo = procesar_siguiente()
+        self.assertEqual(trabajo.estado, 'listo')
+        self.assertGreater(renovar.call_count, 2)
+        renovar.assert_called_with(trabajo.pk)
+
+
+def _pedidos_en_meses(cliente, plato):
+    """Un pedido por mes de enero a abril de 2024 (hora local) y uno pendiente que no cuenta"""
+    tz = timezone.get_current_timezone()
+    for mes in range(1, 5):
+        pedido = Pedido.objects.create(cliente=cliente, estado='entregado', metodo_pago='tarjeta')
+        ItemPedido.objects.create(pedido=pedido, plato=plato, cantidad=mes, precio_unitario=Decimal('10.00'))
+        Pedido.objects.filter(pk=pedido.pk).update(fecha_creacion=datetime(2024, mes, 28, 22, 0, tzinfo=tz))
+    Pedido.objects.create(cliente=cliente)
+
+
+class AgregadosParticionadosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        cls.plato = Plato.objects.create(nombre='Sopa', descripcion='-', categoria=categoria, precio=Decimal('10.00'))
+        _pedidos_en_meses(cliente, cls.plato)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_particiones_por_mes_calendario(self):
+        self.assertEqual(particiones_mensuales(date(2024, 1, 15), date(2024, 3, 2)), [
+            (date(2024, 1, 15), date(2024, 2, 1)),
+            (date(2024, 2, 1), date(2024, 3, 1)),
+            (date(2024, 3, 1), date(2024, 3, 2)),
+        ])
+
+    @override_settings(REPORTES_PARALELO='serie')
+    def test_combina_desgloses_y_guarda_meses_cerrados(self):
+        resultado = agregar_rango(date(2024, 1, 1), date(2024, 4, 30))
+        self.assertEqual(resultado['pedidos'], 4)
+        self.assertEqual(resultado['ventas'], sum((p.total for p in Pedido.objects.exclude(estado='pendiente')), Decimal('0.00')))
+        self.assertEqual(resultado['por_plato'], {self.plato.id: (10, Decimal('100.00'))})
+        self.assertEqual(resultado['por_metodo']['tarjeta'][0], 4)
+        self.assertIn(date(2024, 2, 28), resultado['por_dia'])
+
+        # Los cuatro meses están cerrados: la segunda vez solo consulta sus huellas
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(agregar_rango(date(2024, 1, 1), date(2024, 4, 30)), resultado)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    @override_settings(REPORTES_PARALELO='serie')
+    def test_mes_corregido_en_otro_proceso_no_se_lee_de_cache(self):
+        antes = agregar_rango(date(2024, 1, 1), date(2024, 4, 30))
+        # Otro proceso cambia un pedido de febrero sin pasar por las señales de este
+        pedido = Pedido.objects.get(fecha_creacion__month=2, estado='entregado')
+        Pedido.objects.filter(pk=pedido.pk).update(
+            metodo_pago='efectivo', fecha_actualizacion=timezone.now() + timedelta(seconds=1)
+        )
+        despues = agregar_rango(date(2024, 1, 1), date(2024, 4, 30))
+        self.assertEqual(antes['por_metodo']['tarjeta'][0], 4)
+        self.assertEqual(despues['por_metodo']['tarjeta'][0], 3)
+        self.assertEqual(despues['por_metodo']['efectivo'][0], 1)
+
+    @override_settings(REPORTES_PARALELO='serie')
+    def test_platos_con_el_mismo_nombre_no_se_mezclan(self):
+        otra = Categoria.objects.create(nombre='Entradas')
+        sopa_entrada = Plato.objects.create(nombre='Sopa', descripcion='-', categoria=otra, precio=Decimal('5.00'))
+        pedido = Pedido.objects.get(fecha_creacion__month=3, estado='entregado')
+        ItemPedido.objects.create(pedido=pedido, plato=sopa_entrada, cantidad=2, precio_unitario=Decimal('5.00'))
+        resultado = agregar_rango(date(2024, 1, 1), date(2024, 4, 30))
+        self.assertEqual(resultado['por_plato'][self.plato.id], (10, Decimal('100.00')))
+        self.assertEqual(resultado['por_plato'][sopa_entrada.id], (2, Decimal('10.00')))
+        self.assertEqual(nombres_platos(resultado['por_plato']), {
+            self.plato.id: 'Sopa (Principales)', sopa_entrada.id: 'Sopa (Entradas)',
+        })
+
+
+@override_settings(REPORTES_PARALELO='hilos', REPORTES_WORKERS=4)
+class AgregadosEnHilosTests(TransactionTestCase):
+    def test_hilos_igual_que_en_serie(self):
+        cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        _pedidos_en_meses(cliente, Plato.objects.create(nombre='Sopa', descripcion='-', categoria=categoria, precio=1))
+        cache.clear()
+        en_hilos = agregar_rango(date(2024, 1, 1), date(2024, 4, 30))
+        cache.clear()
+        with override_settings(REPORTES_PARALELO='serie'):
+            self.assertEqual(agregar_rango(date(2024, 1, 1), date(2024, 4, 30)), en_hilos)
+        self.assertEqual(en_hilos['pedidos'], 4)
+
+
+# Se carga la aplicación como lo hace un worker de gunicorn: WSGI, middleware
+# y todas las URLs (que importan las vistas de cada app)
+ARRANQUE_WORKER = """
+import django
+django.setup()
+from django.core.wsgi import get_wsgi_application
+from django.urls import get_resolver
+get_wsgi_application()
+get_resolver().reverse_dict
+"""
+MODULOS_PESADOS = {'reportlab', 'openpyxl', 'pandas', 'numpy'}
+
+
+class ArranqueLivianoTests(SimpleTestCase):
+    def _tiempos_de_importacion(self, codigo):
+        """Ejecuta `codigo` con -X importtime y devuelve {paquete: microsegundos acumulados}"""
+        entorno = dict(os.environ, DJANGO_SETTINGS_MODULE='restaurante.settings')
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            capture_output=True, text=True, env=entorno, check=True,
+        )
+        tiempos = {}
+        for linea in proceso.stderr.splitlines():
+            if not linea.startswith('import time:') or '|' not in linea:
+                continue
+            _, acumulado, modulo = linea.split('|')
+            if acumulado.strip().isdigit():
+                tiempos[modulo.strip()] = int(acumulado)
+        return tiempos
+
+    def test_vistas_no_importan_motores_de_reportes(self):
+        tiempos = self._tiempos_de_importacion(ARRANQUE_WORKER)
+        self.assertIn('pedidos.views', tiempos)
+        cargados = {modulo: tiempos[modulo] // 1000 for modulo in MODULOS_PESADOS if modulo in tiempos}
+        self.assertEqual(cargados, {}, f'Importados al arrancar (ms): {cargados}')
+
+    def test_motor_se_carga_al_generar(self):
+        tiempos = self._tiempos_de_importacion(
+            ARRANQUE_WORKER + "from pedidos.reportes import cargar_escritor\ncargar_escritor('excel')\n"
+        )
+        self.assertIn('openpyxl', tiempos)
+        self.assertNotIn('reportlab', tiempos)
+
+
+class SincronizacionTests(TestCase):
+    def setUp(self):
+        self.mesero = Usuario.objects.create_user(username='mesero', password='x', rol='mesero')
+        self.otro = Usuario.objects.create_user(username='otro', password='x', rol='mesero')
+        cliente = Usuario.objects.create_user(username='cliente', password='x')
+        categoria = Categoria.objects.create(nombre='Principales')
+        self.plato = Plato.objects.create(nombre='Sopa', descripcion='-', categoria=categoria, precio=10)
+        Plato.objects.create(nombre='Arroz', descripcion='-', categoria=categoria, precio=12)
+        self.mesa = Mesa.objects.create(numero=1, capacidad=4)
+        self.mio = Pedido.objects.create(cliente=cliente, mesero=self.mesero, estado='confirmado')
+        Pedido.objects.create(cliente=cliente, mesero=self.mesero, estado='entregado')
+        Pedido.objects.create(cliente=cliente, mesero=self.otro, estado='confirmado')
+        self.client.force_login(self.mesero)
+
+    def _sincronizar(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        response = self.client.get(reverse('pedidos:sincronizar'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_copia_completa_solo_con_pedidos_abiertos_del_mesero(self):
+        datos = self._sincronizar()
+        self.assertTrue(datos['completo'])
+        self.assertEqual(len(datos['cambios']['platos']), 2)
+        self.assertEqual([m['numero'] for m in datos['cambios']['mesas']], [1])
+        self.assertEqual([p['id'] for p in datos['cambios']['pedidos']], [self.mio.id])
+
+    def test_solo_cambios_y_eliminaciones_desde_el_cursor(self):
+        cursor = self._sincronizar()['cursor']
+        # Lo anterior queda fuera del margen de solape del cursor
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        for modelo in (Categoria, Plato, Mesa, Pedido):
+            modelo.objects.update(fecha_actualizacion=hace_una_hora)
+
+        self.plato.disponible = False
+        self.plato.save()
+        mesa_id = self.mesa.id
+        self.mesa.delete()
+        pedido = Pedido.objects.get(pk=self.mio.pk)
+        pedido.mesero = self.otro
+        pedido.save()
+
+        with self.assertNumQueries(7):  # sesión, usuario, 3 catálogos, pedidos (sin items), eliminaciones
+            datos = self._sincronizar(cursor)
+        self.assertFalse(datos['completo'])
+        self.assertEqual([p['nombre'] for p in datos['cambios']['platos']], ['Sopa'])
+        self.assertFalse(datos['cambios']['platos'][0]['disponible'])
+        self.assertEqual(datos['cambios']['categorias'], [])
+        self.assertEqual(datos['cambios']['pedidos'], [])
+        self.assertEqual(datos['eliminados']['mesas'], [mesa_id])
+        self.assertEqual(datos['eliminados']['pedidos'], [self.mio.id])
+
+        self.client.force_login(self.otro)
+        datos = self._sincronizar(cursor)
+        self.assertEqual([p['id'] for p in datos['cambios']['pedidos']], [self.mio.id])
+        self.assertEqual(datos['eliminados']['pedidos'], [])
+
+    def test_plato_agotado_llega_en_los_cambios(self):
+        ingrediente = Ingrediente.objects.create(nombre='Papa', unidad_medida='kg')
+        stock = StockInventario.objects.create(ingrediente=ingrediente, cantidad_actual=Decimal('3'))
+        with self.captureOnCommitCallbacks(execute=True):
+            PlatoIngrediente.objects.create(plato=self.plato, ingrediente=ingrediente, cantidad=Decimal('1'))
+        datos = self._sincronizar()
+        porciones = {p['nombre']: p['disponibilidad__porciones'] for p in datos['cambios']['platos']}
+        self.assertEqual(porciones, {'Sopa': 3, 'Arroz': None})
+
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Plato.objects.update(fecha_actualizacion=hace_una_hora)
+        DisponibilidadPlato.objects.update(fecha_actualizacion=hace_una_hora)
+        cursor = self._sincronizar()['cursor']
+        # Solo cambia el stock: el plato no se guarda pero la tablet debe enterarse
+        stock.cantidad_actual = Decimal('0')
+        with self.captureOnCommitCallbacks(execute=True):
+            stock.save()
+        datos = self._sincronizar(cursor)
+        self.assertEqual(
+            [(p['nombre'], p['disponibilidad__porciones']) for p in datos['cambios']['platos']], [('Sopa', 0)]
+        )
+
+    def test_cursor_viejo_o_invalido(self):
+        viejo = (timezone.now() - timedelta(days=30)).isoformat()
+        self.assertTrue(self._sincronizar(viejo)['completo'])
+        response = self.client.get(reverse('pedidos:sincronizar'), {'cursor': 'ayer'})
+        self.assertEqual(response.status_code, 400)
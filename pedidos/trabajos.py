@@ -0,0 +1,162 @@
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import TrabajoReporte
+from .reportes import ESCRITORES, cargar_escritor, pedidos_del_reporte
+
+
+# Tiempo tras el cual un trabajo 'procesando' se considera abandonado por su worker
+RESERVA = timedelta(minutes=30)
+# Cada cuánto renueva el worker la reserva mientras genera el archivo
+LATIDO = RESERVA / 3
+# Tiempo que un archivo reemplazado se conserva (descargas en curso, enlaces ya mostrados)
+GRACIA = timedelta(minutes=15)
+
+
+def directorio_reportes():
+    directorio = Path(getattr(settings, 'REPORTES_DIR', settings.BASE_DIR / 'reportes'))
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def huella_rango(desde, hasta):
+    """Cambia cuando se crea, modifica o elimina un pedido del rango"""
+    datos = pedidos_del_reporte(desde, hasta).aggregate(cantidad=Count('id'), ultima=Max('fecha_actualizacion'))
+    ultima = datos['ultima'].isoformat() if datos['ultima'] else '-'
+    return f"{datos['cantidad']}|{ultima}"
+
+
+def ruta_artefacto(trabajo):
+    return directorio_reportes() / trabajo.archivo if trabajo.archivo else None
+
+
+def _disponible(trabajo):
+    ruta = ruta_artefacto(trabajo)
+    return ruta is not None and ruta.exists()
+
+
+def solicitar_reporte(formato, desde=None, hasta=None, usuario=None):
+    """Devuelve el trabajo que atiende el pedido de reporte.
+
+    Si ya hay un archivo generado (o en cola) para el mismo formato y rango y
+    ningún pedido del rango cambió desde entonces, se reutiliza; si no, se
+    encola uno nuevo para el worker.
+    """
+    huella = huella_rango(desde, hasta)
+    existentes = TrabajoReporte.objects.filter(
+        formato=formato, desde=desde, hasta=hasta, huella=huella,
+        estado__in=['pendiente', 'procesando', 'listo'],
+    ).order_by('-fecha_creacion')
+    for trabajo in existentes[:5]:
+        if trabajo.estado != 'listo' or _disponible(trabajo):
+            return trabajo
+    return TrabajoReporte.objects.create(
+        formato=formato, desde=desde, hasta=hasta, huella=huella, solicitado_por=usuario,
+    )
+
+
+def _reservar_trabajo():
+    """Toma el trabajo pendiente más antiguo (o uno abandonado) para este worker"""
+    abandonado = timezone.now() - RESERVA
+    with transaction.atomic():
+        trabajo = (
+            TrabajoReporte.objects.select_for_update(skip_locked=True)
+            .filter(estado='pendiente')
+            .order_by('fecha_creacion')
+            .first()
+        ) or (
+            TrabajoReporte.objects.select_for_update(skip_locked=True)
+            .filter(estado='procesando', fecha_actualizacion__lt=abandonado)
+            .order_by('fecha_creacion')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        trabajo.estado = 'procesando'
+        trabajo.save(update_fields=['estado', 'fecha_actualizacion'])
+    return trabajo
+
+
+def _renovar_reserva(trabajo_id):
+    TrabajoReporte.objects.filter(pk=trabajo_id, estado='procesando').update(fecha_actualizacion=timezone.now())
+
+
+@contextmanager
+def _manteniendo_reserva(trabajo):
+    """Renueva la reserva cada LATIDO desde otro hilo, así una generación más
+    larga que RESERVA no se toma como abandonada por otro worker"""
+    detener = threading.Event()
+
+    def latir():
+        try:
+            while not detener.wait(LATIDO.total_seconds()):
+                try:
+                    _renovar_reserva(trabajo.pk)
+                except DatabaseError:
+                    pass  # se reintenta en el próximo latido
+        finally:
+            connections.close_all()  # las conexiones de este hilo
+
+    hilo = threading.Thread(target=latir, name=f'reserva-reporte-{trabajo.pk}', daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def _limpiar_anteriores(trabajo):
+    """Marca como reemplazados los archivos anteriores del mismo formato y rango.
+
+    Los archivos se borran recién GRACIA después de reemplazados: una descarga
+    ya empezada o un enlace que el usuario acaba de recibir siguen sirviendo.
+    """
+    ahora = timezone.now()
+    TrabajoReporte.objects.filter(
+        formato=trabajo.formato, desde=trabajo.desde, hasta=trabajo.hasta, estado='listo',
+    ).exclude(pk=trabajo.pk).exclude(archivo=trabajo.archivo).update(estado='reemplazado', fecha_actualizacion=ahora)
+    vencidos = []
+    for anterior in TrabajoReporte.objects.filter(estado='reemplazado', fecha_actualizacion__lt=ahora - GRACIA).exclude(archivo=''):
+        ruta = ruta_artefacto(anterior)
+        if ruta is not None:
+            ruta.unlink(missing_ok=True)
+        vencidos.append(anterior.pk)
+    TrabajoReporte.objects.filter(pk__in=vencidos).update(archivo='')
+
+
+def procesar_siguiente():
+    """Genera el siguiente reporte de la cola. Devuelve el trabajo o None si no había"""
+    trabajo = _reservar_trabajo()
+    if trabajo is None:
+        return None
+    escribir = cargar_escritor(trabajo.formato)
+    extension = ESCRITORES[trabajo.formato][1]
+    # La huella se toma antes de leer los pedidos: si cambian durante la
+    # generación, el próximo pedido de reporte no reutilizará este archivo
+    trabajo.huella = huella_rango(trabajo.desde, trabajo.hasta)
+    nombre = f'pedidos_{trabajo.formato}_{trabajo.desde or "inicio"}_{trabajo.hasta or "hoy"}_{trabajo.pk}.{extension}'
+    destino = directorio_reportes() / nombre
+    temporal = destino.with_suffix(destino.suffix + '.tmp')
+    try:
+        with _manteniendo_reserva(trabajo), open(temporal, 'wb') as archivo:
+            escribir(archivo, trabajo.desde, trabajo.hasta)
+        os.replace(temporal, destino)
+    except Exception as e:
+        temporal.unlink(missing_ok=True)
+        trabajo.estado = 'fallido'
+        trabajo.error = str(e)
+        trabajo.save(update_fields=['estado', 'error', 'huella', 'fecha_actualizacion'])
+        return trabajo
+    trabajo.estado = 'listo'
+    trabajo.archivo = nombre
+    trabajo.error = None
+    trabajo.save(update_fields=['estado', 'archivo', 'error', 'huella', 'fecha_actualizacion'])
+    _limpiar_anteriores(trabajo)
+    return trabajo
@@ -5,14 +5,21 @@ app_name = 'pedidos'
 
 urlpatterns = [
     path('carrito/', views.carrito, name='carrito'),
-    path('actualizar-carrito/<int:item_id>/', views.actualizar_carrito, name='actualizar_carrito'),
-    path('eliminar-item/<int:item_id>/', views.eliminar_item_carrito, name='eliminar_item'),
+    path('actualizar-carrito/<int:plato_id>/', views.actualizar_carrito, name='actualizar_carrito'),
+    path('eliminar-item/<int:plato_id>/', views.eliminar_item_carrito, name='eliminar_item'),
     path('checkout/', views.checkout, name='checkout'),
     path('historial/', views.historial_pedidos, name='historial'),
     path('pedido/<int:pedido_id>/', views.detalle_pedido, name='detalle_pedido'),
     path('lista/', views.lista_pedidos, name='lista_pedidos'),
+    path('lista/estimaciones/', views.estimaciones_cocina, name='estimaciones_cocina'),
+    path('sincronizar/', views.sincronizar, name='sincronizar'),
+    path('lista/eventos/', views.eventos_pedidos, name='eventos_pedidos'),
     path('actualizar-estado/<int:pedido_id>/', views.actualizar_estado_pedido, name='actualizar_estado'),
+    path('actualizar-estado/lote/', views.actualizar_estado_en_bloque, name='actualizar_estado_en_bloque'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/datos/<str:grafico>/', views.datos_grafico, name='datos_grafico'),
     path('reporte/<str:formato>/', views.generar_reporte, name='generar_reporte'),
+    path('reporte/trabajo/<int:trabajo_id>/', views.estado_reporte, name='estado_reporte'),
+    path('reporte/trabajo/<int:trabajo_id>/descargar/', views.descargar_reporte, name='descargar_reporte'),
 ]
 
@@ -5,60 +5,76 @@ from menu.decorators import staff_or_mesero_required, admin_role_required
 from django.contrib import messages
 from django.db.models import Sum, Count, Q
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, StreamingHttpResponse, HttpResponse, FileResponse
+from django.urls import reverse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from asgiref.sync import sync_to_async
+import hashlib
+import json
+from django.core.handlers.asgi import ASGIRequest
 from datetime import datetime, timedelta
 from decimal import Decimal
-from .models import Pedido, ItemPedido
-from .reportes import generar_reporte_pdf_pedidos, generar_reporte_excel_pedidos
+from .models import Pedido, ItemPedido, TrabajoReporte
+from .dashboard import WidgetsDashboard, ultimos_doce_meses
+from .carrito import Carrito
+from .eventos import stream_cambios, cursor_inicial
+from .paginacion import paginar_por_cursor, leer_cursor
+from .estados import cambiar_estado_en_bloque
+from . import sincronizacion
+from .cocina import estimar_entrega, estimar_entregas
+from .reportes import generar_reporte_csv_pedidos, nombre_reporte, ESCRITORES
+from .trabajos import solicitar_reporte, ruta_artefacto
 from menu.models import Plato
-from inventario.models import MovimientoInventario, StockInventario
-from menu.models import PlatoIngrediente
-from django.core.mail import send_mail
+from inventario.descuentos import descontar_ingredientes_pedido
+from django.db import transaction
+from notificaciones.correo import encolar_correo
 from django.conf import settings
 
 
-@login_required
+PEDIDOS_POR_PAGINA = 25
+
+
 def carrito(request):
     """Vista del carrito de compras"""
-    if not request.user.es_cliente():
+    if request.user.is_authenticated and not request.user.es_cliente():
         messages.error(request, 'Solo los clientes pueden ver el carrito')
         return redirect('menu:index')
     
-    pedido = Pedido.objects.filter(cliente=request.user, estado='pendiente').first()
+    carrito_actual = Carrito(request)
+    items = carrito_actual.items()
     context = {
-        'pedido': pedido,
-        'items': pedido.items.all() if pedido else [],
+        'pedido': carrito_actual.resumen(items) if items else None,
+        'items': items,
     }
     return render(request, 'pedidos/carrito.html', context)
 
 
-@login_required
-def actualizar_carrito(request, item_id):
-    """Actualiza la cantidad de un item en el carrito"""
-    if not request.user.es_cliente():
+def actualizar_carrito(request, plato_id):
+    """Actualiza la cantidad de un plato en el carrito"""
+    if request.user.is_authenticated and not request.user.es_cliente():
         return JsonResponse({'error': 'No autorizado'}, status=403)
     
-    item = get_object_or_404(ItemPedido, id=item_id, pedido__cliente=request.user, pedido__estado='pendiente')
-    cantidad = int(request.POST.get('cantidad', 1))
+    try:
+        cantidad = int(request.POST.get('cantidad', 1))
+    except ValueError:
+        cantidad = 1
     
-    if cantidad < 1:
-        item.delete()
-    else:
-        item.cantidad = cantidad
-        item.save()
+    if not Carrito(request).actualizar(plato_id, cantidad):
+        raise Http404('El plato no está en el carrito')
     
     return redirect('pedidos:carrito')
 
 
-@login_required
-def eliminar_item_carrito(request, item_id):
-    """Elimina un item del carrito"""
-    if not request.user.es_cliente():
+def eliminar_item_carrito(request, plato_id):
+    """Elimina un plato del carrito"""
+    if request.user.is_authenticated and not request.user.es_cliente():
         messages.error(request, 'No autorizado')
         return redirect('menu:index')
     
-    item = get_object_or_404(ItemPedido, id=item_id, pedido__cliente=request.user, pedido__estado='pendiente')
-    item.delete()
+    if not Carrito(request).eliminar(plato_id):
+        raise Http404('El plato no está en el carrito')
     messages.success(request, 'Item eliminado del carrito')
     return redirect('pedidos:carrito')
 
@@ -70,9 +86,10 @@ def checkout(request):
         messages.error(request, 'Solo los clientes pueden realizar pedidos')
         return redirect('menu:index')
     
-    pedido = Pedido.objects.filter(cliente=request.user, estado='pendiente').first()
+    carrito_actual = Carrito(request)
+    items = carrito_actual.items()
     
-    if not pedido or not pedido.items.exists():
+    if not items:
         messages.error(request, 'El carrito está vacío')
         return redirect('menu:index')
     
@@ -80,43 +97,19 @@ def checkout(request):
         metodo_pago = request.POST.get('metodo_pago')
         notas = request.POST.get('notas', '')
         
-        pedido.estado = 'confirmado'
-        pedido.metodo_pago = metodo_pago
-        pedido.notas = notas
-        pedido.save()
-        
-        # Actualizar inventario
-        for item in pedido.items.all():
-            plato = item.plato
-            ingredientes_plato = PlatoIngrediente.objects.filter(plato=plato)
+        with transaction.atomic():
+            # El pedido solo se crea aquí, ya confirmado
+            pedido = carrito_actual.crear_pedido(request.user, metodo_pago, notas, items=items)
             
-            for plato_ingrediente in ingredientes_plato:
-                ingrediente = plato_ingrediente.ingrediente
-                cantidad_necesaria = plato_ingrediente.cantidad * Decimal(item.cantidad)
-                
-                # Obtener o crear stock
-                stock, _ = StockInventario.objects.get_or_create(ingrediente=ingrediente)
-                
-                # Crear movimiento de salida
-                MovimientoInventario.objects.create(
-                    ingrediente=ingrediente,
-                    tipo_movimiento='salida',
-                    cantidad=cantidad_necesaria,
-                    motivo=f'Pedido #{pedido.id} - {plato.nombre}',
-                    usuario=request.user
-                )
-                
-                # Actualizar stock
-                stock.cantidad_actual -= cantidad_necesaria
-                if stock.cantidad_actual < 0:
-                    stock.cantidad_actual = Decimal('0.00')
-                stock.save()
-        
-        # Enviar correo de confirmación
-        try:
-            send_mail(
-                subject=f'Confirmación de Pedido #{pedido.id}',
-                message=f'''
+            # Actualizar inventario
+            descontar_ingredientes_pedido(pedido, usuario=request.user)
+            
+            # Correo de confirmación a la bandeja de salida (lo envía el worker)
+            if request.user.email:
+                encolar_correo(
+                    destinatario=request.user.email,
+                    asunto=f'Confirmación de Pedido #{pedido.id}',
+                    texto=f'''
                 Hola {request.user.username},
                 
                 Tu pedido ha sido confirmado exitosamente.
@@ -129,18 +122,15 @@ def checkout(request):
                 
                 Gracias por tu compra!
                 ''',
-                from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@restaurante.com',
-                recipient_list=[request.user.email],
-                fail_silently=True,
-            )
-        except Exception as e:
-            print(f"Error enviando correo: {e}")
+                )
+        carrito_actual.vaciar()
         
         messages.success(request, f'¡Pedido confirmado! Número de pedido: #{pedido.id}')
         return redirect('pedidos:historial')
     
     context = {
-        'pedido': pedido,
+        'pedido': carrito_actual.resumen(items),
+        'items': items,
     }
     return render(request, 'pedidos/checkout.html', context)
 
@@ -149,14 +139,21 @@ def checkout(request):
 def historial_pedidos(request):
     """Historial de pedidos del usuario"""
     if request.user.es_cliente():
-        pedidos = Pedido.objects.filter(cliente=request.user).exclude(estado='pendiente').order_by('-fecha_creacion')
+        pedidos = Pedido.objects.filter(cliente=request.user).exclude(estado='pendiente')
     elif request.user.es_mesero():
-        pedidos = Pedido.objects.filter(mesero=request.user).order_by('-fecha_creacion')
+        pedidos = Pedido.objects.filter(mesero=request.user)
     else:
-        pedidos = Pedido.objects.all().order_by('-fecha_creacion')
+        pedidos = Pedido.objects.all()
     
+    pagina = paginar_por_cursor(
+        pedidos.select_related('cliente', 'mesero'),
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=PEDIDOS_POR_PAGINA,
+    )
     context = {
-        'pedidos': pedidos,
+        'pedidos': pagina,
+        'pagina': pagina,
     }
     return render(request, 'pedidos/historial.html', context)
 
@@ -177,6 +174,7 @@ def detalle_pedido(request, pedido_id):
     context = {
         'pedido': pedido,
         'items': pedido.items.all(),
+        'hora_estimada': estimar_entrega(pedido),
     }
     return render(request, 'pedidos/detalle_pedido.html', context)
 
@@ -185,94 +183,189 @@ def detalle_pedido(request, pedido_id):
 def lista_pedidos(request):
     """Lista de pedidos para meseros y administradores"""
     estado = request.GET.get('estado', '')
-    pedidos = Pedido.objects.exclude(estado='pendiente').order_by('-fecha_creacion')
+    pedidos = Pedido.objects.exclude(estado='pendiente').select_related('cliente', 'mesero')
     
     if estado:
         pedidos = pedidos.filter(estado=estado)
     
+    pagina = paginar_por_cursor(
+        pedidos,
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=PEDIDOS_POR_PAGINA,
+    )
     context = {
-        'pedidos': pedidos,
+        'pedidos': pagina,
+        'pagina': pagina,
         'estado_actual': estado,
+        'primera_pagina': not (request.GET.get('despues') or request.GET.get('antes')),
     }
     return render(request, 'pedidos/lista_pedidos.html', context)
 
 
+@staff_or_mesero_required
+def estimaciones_cocina(request):
+    """Hora estimada de listo de cada pedido en cocina (la lista la consulta por JS)"""
+    estimaciones = estimar_entregas()
+    return JsonResponse({
+        'estimaciones': {
+            str(pedido_id): timezone.localtime(hora).strftime('%H:%M')
+            for pedido_id, hora in estimaciones.items()
+        }
+    })
+
+
+@staff_or_mesero_required
+def sincronizar(request):
+    """Cambios para el dispositivo del mesero desde ?cursor= (sin cursor: copia completa)"""
+    valor = request.GET.get('cursor')
+    cursor = sincronizacion.leer_cursor(valor) if valor else None
+    if valor and cursor is None:
+        return JsonResponse({'error': 'Cursor inválido'}, status=400)
+    return JsonResponse(sincronizacion.cambios_desde(request.user, cursor))
+
+
+@staff_or_mesero_required
+async def eventos_pedidos(request):
+    """Server-Sent Events con los pedidos que cambiaron (para cocina y meseros)"""
+    cursor = leer_cursor(request.headers.get('Last-Event-ID') or request.GET.get('cursor')) or cursor_inicial()
+    # Bajo WSGI no se puede mantener el stream abierto: se responde una vez y el
+    # navegador reconecta con Last-Event-ID (equivale a long polling)
+    continuo = isinstance(request, ASGIRequest)
+    response = StreamingHttpResponse(stream_cambios(cursor, continuo=continuo), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @staff_or_mesero_required
 def actualizar_estado_pedido(request, pedido_id):
-    """Actualiza el estado de un pedido"""
+    """Actualiza el estado de un pedido (solo las transiciones de Pedido.TRANSICIONES)"""
     pedido = get_object_or_404(Pedido, id=pedido_id)
     nuevo_estado = request.POST.get('estado')
     
-    if nuevo_estado in dict(Pedido.ESTADOS):
-        pedido.estado = nuevo_estado
-        if nuevo_estado == 'entregado':
-            pedido.fecha_entrega = timezone.now()
-        pedido.save()
-        messages.success(request, f'Estado del pedido actualizado a: {pedido.get_estado_display()}')
+    if request.method == 'POST' and nuevo_estado != pedido.estado:
+        ok, mensaje = cambiar_estado_en_bloque([pedido.id], nuevo_estado)[pedido.id]
+        if ok:
+            messages.success(request, f'Estado del pedido actualizado a: {dict(Pedido.ESTADOS)[nuevo_estado]}')
+        else:
+            messages.error(request, mensaje)
     
     return redirect('pedidos:detalle_pedido', pedido_id=pedido_id)
 
 
+@staff_or_mesero_required
+def actualizar_estado_en_bloque(request):
+    """Cambia el estado de varios pedidos a la vez (lotes que salen de cocina)"""
+    if request.method != 'POST':
+        return redirect('pedidos:lista_pedidos')
+    pedido_ids = []
+    for valor in request.POST.getlist('pedidos'):
+        try:
+            pedido_ids.append(int(valor))
+        except ValueError:
+            continue
+    nuevo_estado = request.POST.get('estado')
+    resultados = cambiar_estado_en_bloque(pedido_ids, nuevo_estado)
+
+    if request.headers.get('Accept', '').startswith('application/json'):
+        return JsonResponse({
+            'resultados': [
+                {'id': pedido_id, 'ok': ok, 'mensaje': mensaje}
+                for pedido_id, (ok, mensaje) in resultados.items()
+            ]
+        })
+
+    actualizados = [pedido_id for pedido_id, (ok, _) in resultados.items() if ok]
+    if actualizados:
+        messages.success(request, f'{len(actualizados)} pedido(s) actualizados a: {dict(Pedido.ESTADOS)[nuevo_estado]}')
+    for pedido_id, (ok, mensaje) in resultados.items():
+        if not ok:
+            messages.warning(request, f'Pedido #{pedido_id}: {mensaje}')
+    if not resultados:
+        messages.warning(request, 'Selecciona al menos un pedido')
+
+    destino = redirect('pedidos:lista_pedidos')
+    estado_actual = request.POST.get('estado_actual')
+    if estado_actual in dict(Pedido.ESTADOS):
+        destino['Location'] += f'?estado={estado_actual}'
+    return destino
+
+
 @admin_role_required
 def dashboard(request):
-    """Panel de administración con estadísticas y gráficos"""
-    hoy = timezone.now().date()
-    mes_actual = hoy.replace(day=1)
-    
-    # Estadísticas generales
-    total_pedidos = Pedido.objects.exclude(estado='pendiente').count()
-    pedidos_hoy = Pedido.objects.filter(fecha_creacion__date=hoy).exclude(estado='pendiente').count()
-    ventas_hoy = Pedido.objects.filter(fecha_creacion__date=hoy, estado__in=['entregado', 'listo']).aggregate(
-        total=Sum('total')
-    )['total'] or Decimal('0.00')
-    
-    ventas_mes = Pedido.objects.filter(
-        fecha_creacion__date__gte=mes_actual,
-        estado__in=['entregado', 'listo']
-    ).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-    
-    # Platos más vendidos
-    platos_vendidos = ItemPedido.objects.filter(
-        pedido__estado__in=['entregado', 'listo', 'confirmado', 'en_preparacion']
-    ).values('plato__nombre').annotate(
-        total_vendido=Sum('cantidad')
-    ).order_by('-total_vendido')[:10]
+    """Panel de administración: estadísticas generales; los gráficos piden sus datos por JSON"""
+    hoy = timezone.localdate()
+    widgets = WidgetsDashboard()
     
-    # Ingresos mensuales (últimos 12 meses)
-    ingresos_mensuales = []
-    for i in range(11, -1, -1):
-        fecha = mes_actual - timedelta(days=30*i)
-        mes_siguiente = fecha + timedelta(days=30)
-        total = Pedido.objects.filter(
-            fecha_creacion__date__gte=fecha,
-            fecha_creacion__date__lt=mes_siguiente,
-            estado__in=['entregado', 'listo']
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        ingresos_mensuales.append({
-            'mes': fecha.strftime('%Y-%m'),
-            'total': float(total)
-        })
-    
-    # Pedidos por estado
-    pedidos_por_estado = Pedido.objects.exclude(estado='pendiente').values('estado').annotate(
-        cantidad=Count('id')
-    )
-    
-    context = {
-        'total_pedidos': total_pedidos,
-        'pedidos_hoy': pedidos_hoy,
-        'ventas_hoy': ventas_hoy,
-        'ventas_mes': ventas_mes,
-        'platos_vendidos': platos_vendidos,
-        'ingresos_mensuales': ingresos_mensuales,
-        'pedidos_por_estado': list(pedidos_por_estado),
-    }
-    return render(request, 'pedidos/dashboard.html', context)
+    # Los gráficos se cargan aparte desde datos_grafico, en paralelo
+    context = widgets.generales(hoy)
+    response = render(request, 'pedidos/dashboard.html', context)
+    response['X-Cache-Hits'] = widgets.aciertos
+    response['X-Cache-Misses'] = widgets.fallos
+    return response
+
+
+def _leer_fecha(valor):
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+
+def _datos_grafico(grafico, desde, hasta, periodo):
+    widgets = WidgetsDashboard()
+    if grafico == 'platos':
+        datos = widgets.platos_vendidos(desde, hasta)
+    elif grafico == 'estados':
+        etiquetas = dict(Pedido.ESTADOS)
+        datos = [
+            {**fila, 'etiqueta': etiquetas.get(fila['estado'], fila['estado'])}
+            for fila in widgets.pedidos_por_estado(desde, hasta)
+        ]
+    else:
+        # La serie necesita ambos límites: el que falta se completa (hasta hoy,
+        # o los 12 meses que terminan en `hasta`); sin ninguno, los últimos 12 meses
+        if desde and not hasta:
+            hasta = timezone.localdate() + timedelta(days=1)
+        elif hasta and not desde:
+            desde = ultimos_doce_meses((hasta - timedelta(days=1)).replace(day=1))[0]
+        elif not desde:
+            desde, hasta = ultimos_doce_meses(timezone.localdate().replace(day=1))
+        datos = widgets.ingresos(desde, hasta, periodo)
+    return datos, widgets.modificado(desde, hasta)
+
+
+@admin_role_required
+async def datos_grafico(request, grafico):
+    """Datos JSON de un gráfico del dashboard (?desde=AAAA-MM-DD&hasta=AAAA-MM-DD, ambos incluidos)"""
+    periodo = request.GET.get('periodo', 'mes')
+    if grafico not in ('platos', 'ingresos', 'estados') or periodo not in ('dia', 'semana', 'mes'):
+        raise Http404
+    try:
+        desde = _leer_fecha(request.GET.get('desde'))
+        hasta = _leer_fecha(request.GET.get('hasta'))
+    except ValueError:
+        return JsonResponse({'error': 'Fechas inválidas, usa AAAA-MM-DD'}, status=400)
+    if hasta:
+        hasta += timedelta(days=1)
+
+    datos, modificado = await sync_to_async(_datos_grafico)(grafico, desde, hasta, periodo)
+    contenido = json.dumps({'grafico': grafico, 'datos': datos}, cls=DjangoJSONEncoder)
+    etag = quote_etag(hashlib.md5(contenido.encode()).hexdigest())
+    ultima = int(modificado.timestamp()) if modificado else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima)
+    if response is None:
+        response = HttpResponse(contenido, content_type='application/json')
+    response['ETag'] = etag
+    if ultima:
+        response['Last-Modified'] = http_date(ultima)
+    # El navegador guarda la respuesta pero la revalida siempre (responde 304 si no cambió)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @admin_role_required
 def generar_reporte(request, formato='pdf'):
-    """Genera reportes en PDF o Excel"""
+    """Reporte CSV en streaming; PDF y Excel se encolan para el worker y se descargan al terminar"""
     fecha_inicio = request.GET.get('fecha_inicio')
     fecha_fin = request.GET.get('fecha_fin')
     
@@ -281,7 +374,35 @@ def generar_reporte(request, formato='pdf'):
     if fecha_fin:
         fecha_fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
     
-    if formato == 'excel':
-        return generar_reporte_excel_pedidos(request, fecha_inicio, fecha_fin)
-    else:
-        return generar_reporte_pdf_pedidos(request, fecha_inicio, fecha_fin)
+    if formato == 'csv':
+        return generar_reporte_csv_pedidos(request, fecha_inicio, fecha_fin)
+    if formato not in ESCRITORES:
+        raise Http404
+    trabajo = solicitar_reporte(formato, fecha_inicio, fecha_fin, usuario=request.user)
+    if trabajo.estado == 'listo':
+        return redirect('pedidos:descargar_reporte', trabajo_id=trabajo.id)
+    return redirect('pedidos:estado_reporte', trabajo_id=trabajo.id)
+
+
+@admin_role_required
+def estado_reporte(request, trabajo_id):
+    """Estado de un reporte en cola (la página se recarga sola hasta que termina)"""
+    trabajo = get_object_or_404(TrabajoReporte, id=trabajo_id)
+    if request.headers.get('Accept', '').startswith('application/json'):
+        return JsonResponse({
+            'estado': trabajo.estado,
+            'descarga': reverse('pedidos:descargar_reporte', args=[trabajo.id]) if trabajo.estado == 'listo' else None,
+            'error': trabajo.error,
+        })
+    return render(request, 'pedidos/estado_reporte.html', {'trabajo': trabajo})
+
+
+@admin_role_required
+def descargar_reporte(request, trabajo_id):
+    # Un reemplazado se sigue sirviendo hasta que se borra su archivo (trabajos.GRACIA)
+    trabajo = get_object_or_404(TrabajoReporte, id=trabajo_id, estado__in=['listo', 'reemplazado'])
+    ruta = ruta_artefacto(trabajo)
+    if ruta is None or not ruta.exists():
+        raise Http404
+    _, extension, content_type = ESCRITORES[trabajo.formato]
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre_reporte(extension), content_type=content_type)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesa',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -8,6 +8,7 @@ class Mesa(models.Model):
     capacidad = models.IntegerField(help_text="Número de personas que caben")
     disponible = models.BooleanField(default=True)
     ubicacion = models.CharField(max_length=100, blank=True, null=True, help_text="Ej: Interior, Terraza, Ventana")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Mesa'
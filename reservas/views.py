@@ -7,8 +7,8 @@ from django.http import JsonResponse
 from datetime import datetime, date, time, timedelta
 from .models import Reserva, Mesa
 from .forms import ReservaForm
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
+from notificaciones.correo import encolar_correo
 
 
 @login_required
@@ -45,14 +45,15 @@ def crear_reserva(request):
             if conflicto:
                 messages.error(request, 'La mesa no está disponible en ese horario')
             else:
-                reserva.save()
-                messages.success(request, f'Reserva creada exitosamente. Número de reserva: #{reserva.id}')
-                
-                # Enviar correo de confirmación
-                try:
-                    send_mail(
-                        subject=f'Confirmación de Reserva #{reserva.id}',
-                        message=f'''
+                with transaction.atomic():
+                    reserva.save()
+                    
+                    # Correo de confirmación a la bandeja de salida (lo envía el worker)
+                    if request.user.email:
+                        encolar_correo(
+                            destinatario=request.user.email,
+                            asunto=f'Confirmación de Reserva #{reserva.id}',
+                            texto=f'''
                         Hola {request.user.username},
                         
                         Tu reserva ha sido confirmada.
@@ -67,12 +68,8 @@ def crear_reserva(request):
                         
                         ¡Te esperamos!
                         ''',
-                        from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, 'DEFAULT_FROM_EMAIL') else 'noreply@restaurante.com',
-                        recipient_list=[request.user.email],
-                        fail_silently=True,
-                    )
-                except Exception as e:
-                    print(f"Error enviando correo: {e}")
+                        )
+                messages.success(request, f'Reserva creada exitosamente. Número de reserva: #{reserva.id}')
                 
                 return redirect('reservas:mis_reservas')
     else:
@@ -1,13 +1,12 @@
+from pedidos.carrito import Carrito
+
+
 def carrito_context(request):
     """Context processor para agregar información del carrito al contexto global"""
     context = {}
-    if request.user.is_authenticated and hasattr(request.user, 'es_cliente') and request.user.es_cliente():
-        pedido_pendiente = request.user.pedidos.filter(estado='pendiente').first()
-        if pedido_pendiente:
-            context['carrito_count'] = pedido_pendiente.items.count()
-        else:
-            context['carrito_count'] = 0
+    if not request.user.is_authenticated or (hasattr(request.user, 'es_cliente') and request.user.es_cliente()):
+        # El carrito vive en la sesión/caché: no consulta la tabla de pedidos
+        context['carrito_count'] = len(Carrito(request))
     else:
         context['carrito_count'] = 0
     return context
-
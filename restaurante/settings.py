@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'pedidos',
     'reservas',
     'inventario',
+    'notificaciones',
     
 ]
 
@@ -103,6 +104,27 @@ except Exception:
     pass
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Por defecto en memoria del proceso; con CACHE_DIR se usa caché en archivos,
+# compartida entre los workers del mismo servidor.
+
+if os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'restaurante',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -177,5 +199,36 @@ LOGIN_URL = 'usuarios:login'
 LOGIN_REDIRECT_URL = 'menu:index'
 LOGOUT_REDIRECT_URL = 'usuarios:login'
 
+# Almacén del carrito: 'pedidos.carrito.AlmacenSesion' o 'pedidos.carrito.AlmacenCache'
+CARRITO_ALMACEN = os.getenv('CARRITO_ALMACEN', 'pedidos.carrito.AlmacenSesion')
+
+# Stream de cambios de pedidos (SSE): segundos entre consultas y duración de cada conexión
+PEDIDOS_SSE_INTERVALO = float(os.getenv('PEDIDOS_SSE_INTERVALO', '2'))
+PEDIDOS_SSE_DURACION = int(os.getenv('PEDIDOS_SSE_DURACION', '300'))
+
+# Carpeta donde el worker guarda los reportes PDF/Excel generados
+REPORTES_DIR = Path(os.getenv('REPORTES_DIR', BASE_DIR / 'reportes'))
+
+# Agregados de reportes por mes en paralelo: 'procesos', 'hilos' o 'serie'
+# (vacío = hilos en Postgres, procesos en los demás). Workers por defecto: núcleos
+REPORTES_PARALELO = os.getenv('REPORTES_PARALELO', '')
+REPORTES_WORKERS = int(os.getenv('REPORTES_WORKERS', '0')) or None
+# Segundos que se guarda en caché cada mes cerrado (la clave incluye su huella)
+REPORTES_PARTICIONES_TTL = int(os.getenv('REPORTES_PARTICIONES_TTL', str(7 * 24 * 3600)))
+
+# Segundos que se guarda en caché cada widget del dashboard
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', '300'))
+
+# Segundos que se guarda en caché el listado del menú y platos por página
+MENU_CACHE_TTL = int(os.getenv('MENU_CACHE_TTL', '900'))
+MENU_POR_PAGINA = int(os.getenv('MENU_POR_PAGINA', '24'))
+
+# Días que se guardan las eliminaciones para la sincronización de dispositivos;
+# un dispositivo con un cursor más viejo recibe una copia completa
+SYNC_RETENCION_DIAS = int(os.getenv('SYNC_RETENCION_DIAS', '7'))
+
+# Estaciones de cocina trabajando en paralelo (para estimar la hora de entrega)
+COCINA_ESTACIONES = int(os.getenv('COCINA_ESTACIONES', '3'))
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 USE_X_FORWARDED_HOST = True
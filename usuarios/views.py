@@ -9,13 +9,11 @@ from .forms import RegistroForm, LoginForm, PasswordResetRequestForm, SetNewPass
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
+from notificaciones.correo import encolar_correo
 from django.contrib.auth.hashers import make_password
 from django.db import transaction
 from django.db.utils import OperationalError
 import time
-import importlib
 
 
 def login_view(request):
@@ -111,23 +109,24 @@ class RegistroView(CreateView):
     
     def form_valid(self, form):
         data = form.cleaned_data
-        pending = RegistroPendiente.objects.create(
-            username=data['username'],
-            email=data['email'],
-            password_hash=make_password(data['password1']),
-            rol=data.get('rol', 'cliente'),
-            telefono=data.get('telefono', ''),
-            direccion=data.get('direccion', ''),
-        )
-        activation_url = self.request.build_absolute_uri(
-            reverse_lazy('usuarios:activar_pendiente', kwargs={'pid': str(pending.id)})
-        )
-        ok = _send_email(
-            to_email=pending.email,
-            subject='Verifica tu correo',
-            html_content=f"<p>Hola {pending.username},</p><p>Por favor verifica tu correo haciendo clic en el siguiente enlace:</p><p><a href='{activation_url}'>{activation_url}</a></p><p>Si no solicitaste este registro, ignora este mensaje.</p>",
-            plain_text=f"Hola {pending.username},\n\nPor favor verifica tu correo haciendo clic en el siguiente enlace:\n{activation_url}\n\nSi no solicitaste este registro, ignora este mensaje.",
-        )
+        with transaction.atomic():
+            pending = RegistroPendiente.objects.create(
+                username=data['username'],
+                email=data['email'],
+                password_hash=make_password(data['password1']),
+                rol=data.get('rol', 'cliente'),
+                telefono=data.get('telefono', ''),
+                direccion=data.get('direccion', ''),
+            )
+            activation_url = self.request.build_absolute_uri(
+                reverse_lazy('usuarios:activar_pendiente', kwargs={'pid': str(pending.id)})
+            )
+            ok = _send_email(
+                to_email=pending.email,
+                subject='Verifica tu correo',
+                html_content=f"<p>Hola {pending.username},</p><p>Por favor verifica tu correo haciendo clic en el siguiente enlace:</p><p><a href='{activation_url}'>{activation_url}</a></p><p>Si no solicitaste este registro, ignora este mensaje.</p>",
+                plain_text=f"Hola {pending.username},\n\nPor favor verifica tu correo haciendo clic en el siguiente enlace:\n{activation_url}\n\nSi no solicitaste este registro, ignora este mensaje.",
+            )
         if not ok:
             messages.error(self.request, 'No se pudo enviar el correo de verificación. Verifica tu remitente y configuración de correo.')
             return redirect(self.success_url)
@@ -178,32 +177,10 @@ def activar_pendiente(request, pid):
     messages.success(request, 'Tu cuenta ha sido activada. Ahora puedes iniciar sesión.')
     return redirect('usuarios:login')
 def _send_email(to_email, subject, html_content, plain_text):
-    api_key = getattr(settings, 'SENDGRID_API_KEY', None)
-    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@restaurante.com')
-    if api_key:
-        try:
-            sendgrid = importlib.import_module('sendgrid')
-            Mail = importlib.import_module('sendgrid.helpers.mail').Mail
-            message = Mail(
-                from_email=from_email,
-                to_emails=to_email,
-                subject=subject,
-                html_content=html_content,
-            )
-            sg = sendgrid.SendGridAPIClient(api_key=api_key)
-            resp = sg.send(message)
-            if 200 <= int(getattr(resp, 'status_code', 0)) < 300:
-                return True
-        except Exception:
-            pass
+    """Deja el correo en la bandeja de salida; el worker `enviar_correos` lo entrega"""
     try:
-        send_mail(
-            subject=subject,
-            message=plain_text,
-            from_email=from_email,
-            recipient_list=[to_email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            encolar_correo(destinatario=to_email, asunto=subject, texto=plain_text, html=html_content)
         return True
     except Exception:
         return False